@@ -272,6 +272,13 @@ GameManager.prototype.move = function (direction) {
     this.actuate();
   }
 
+  // Lets session-based autoplay report just the new tile, not the whole grid.
+  this.lastSpawnedTile = spawnedTile ? {
+    row: spawnedTile.y,
+    col: spawnedTile.x,
+    value: spawnedTile.value
+  } : null;
+
   if (typeof logEvent === "function") {
     var nextState = this.captureSimpleState();
 
@@ -0,0 +1,312 @@
+"""Production serving mode: an ASGI front end over a process pool.
+
+The Flask service handles one request per thread, and every request runs
+``predict_proba`` and ``valid_moves`` while holding the GIL. Here an async
+Starlette app accepts the connections and hands the CPU work to a pool of
+worker processes. Each worker loads the model once through its own
+``ModelRegistry``. A model directory export (see ``forest_engine.py``) is
+memory-mapped, so all workers share the same pages; a ``.pkl`` or ``.npz``
+model is read into each worker's memory. Throughput then grows with
+``RF_WORKERS`` (default: one per core).
+
+``/predict`` and ``/predict_batch`` accept and return the same JSON as
+``model_server.py``, including ``"search"``, ``include_next_grid`` and
+``include_successors``, and CORS
+follows ``RF_ALLOWED_ORIGINS`` (comma-separated, ``*`` by default).
+
+``/ws`` streams the same predictions over one WebSocket. Each text message is
+``{"grid": [...]}`` or, once a grid has been sent, ``{"spawn": {"row", "col",
+"value"}}`` for the tile that appeared after the last returned move (see
+``sessions.py``). An optional ``"id"`` is echoed in the reply. Replies arrive
+in request order. With ``/ws?pipeline=1`` the server keeps reading while
+earlier boards are still being scored, up to ``RF_WS_MAX_IN_FLIGHT`` at a time,
+so a client can send its next board before it reads the previous reply.
+
+Usage::
+
+    python service/forest_engine.py random_forest_2048.pkl random_forest_2048_model
+    RF_MODEL_PATH=random_forest_2048_model RF_WORKERS=8 python service/asgi_server.py
+    # or: cd service && uvicorn asgi_server:app --port 5050
+"""
+
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from board_rules import analyze_board
+from features import preprocess_board, preprocess_boards, uses_extra_features
+from model_registry import ModelRegistry, read_model
+from prediction import build_prediction, build_predictions, run_search
+from server_config import allowed_origins as parse_allowed_origins, resolve_model_path
+from sessions import GameSession, SpawnMismatch
+
+WS_MAX_IN_FLIGHT = int(os.environ.get("RF_WS_MAX_IN_FLIGHT", "32"))
+
+_worker_registry: Optional[ModelRegistry] = None
+
+
+def _init_worker(model_path: str, watch_seconds: float) -> None:
+    global _worker_registry
+    _worker_registry = ModelRegistry(model_path, read_model)
+    _worker_registry.get()
+    if watch_seconds > 0:
+        _worker_registry.start_watching(watch_seconds)
+
+
+def predict_one(grid: List[List[int]], include_next_grid: bool, search: Any, include_successors: bool = False) -> Dict:
+    """Worker task behind ``/predict``; mirrors the Flask route."""
+
+    assert _worker_registry is not None
+    model, version = _worker_registry.snapshot()
+    features = preprocess_board(grid, extra=uses_extra_features(model))
+    probabilities = np.asarray(model.predict_proba(features[None]))[0]
+    search_move, search_stats = run_search(grid, probabilities, search) if search else (None, None)
+    analysis = analyze_board(grid)
+    response = build_prediction(
+        grid, probabilities, analysis.valid_moves, include_next_grid, search_move, analysis, include_successors
+    )
+    if search_stats is not None:
+        response["search"] = search_stats
+    response["model_version"] = version
+    return response
+
+
+def predict_many(grids: List[List[List[int]]], include_next_grid: bool, include_successors: bool = False) -> Dict:
+    """Worker task behind ``/predict_batch``: one ``predict_proba`` call for all grids."""
+
+    assert _worker_registry is not None
+    model, version = _worker_registry.snapshot()
+    probabilities = np.asarray(model.predict_proba(preprocess_boards(grids, extra=uses_extra_features(model))))
+    predictions = build_predictions(grids, probabilities, include_next_grid, include_successors)
+    return {"predictions": predictions, "model_version": version}
+
+
+def _ping() -> Tuple[int, Optional[str]]:
+    assert _worker_registry is not None
+    return os.getpid(), _worker_registry.version
+
+
+class InferencePool:
+    """A process pool whose workers each hold the model."""
+
+    def __init__(self, model_path: str, workers: Optional[int] = None, watch_seconds: float = 0.0) -> None:
+        self.model_path = model_path
+        self.workers = workers or os.cpu_count() or 1
+        # Spawned rather than forked: the event loop's threads must not leak into workers.
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_path, watch_seconds),
+        )
+
+    async def run(self, fn, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _read_json(request: Request) -> Dict:
+    # Like Flask's get_json(force=True): the Content-Type header is not checked.
+    payload = await request.json()
+    return payload if isinstance(payload, dict) else {}
+
+
+async def predict(request: Request) -> JSONResponse:
+    try:
+        payload = await _read_json(request)
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+    grid = payload.get("grid")
+    if grid is None:
+        return JSONResponse({"error": "Payload must include 'grid' key"}, status_code=400)
+
+    pool: InferencePool = request.app.state.pool
+    try:
+        response = await pool.run(
+            predict_one,
+            grid,
+            payload.get("include_next_grid", False),
+            payload.get("search"),
+            payload.get("include_successors", False),
+        )
+    except (TypeError, ValueError) as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return JSONResponse(response)
+
+
+async def predict_batch(request: Request) -> JSONResponse:
+    try:
+        payload = await _read_json(request)
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+    grids = payload.get("grids")
+    if not isinstance(grids, list) or not grids:
+        return JSONResponse({"error": "Payload must include a non-empty 'grids' list"}, status_code=400)
+
+    pool: InferencePool = request.app.state.pool
+    try:
+        response = await pool.run(
+            predict_many, grids, payload.get("include_next_grid", False), payload.get("include_successors", False)
+        )
+    except (TypeError, ValueError) as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    return JSONResponse(response)
+
+
+async def _stream_reply(
+    pool: InferencePool, session: GameSession, message: Any, previous: Optional["asyncio.Task"]
+) -> Dict:
+    """Score one streamed message; errors become ``{"error": ...}`` replies."""
+
+    request_id = message.get("id") if isinstance(message, dict) else None
+    try:
+        if not isinstance(message, dict):
+            raise ValueError("Messages must be JSON objects")
+        if message.get("grid") is not None:
+            grid = message["grid"]
+        else:
+            if previous is not None:
+                await asyncio.wait([previous])  # the spawn lands on the board the previous reply left
+            if not session.board:
+                raise ValueError("Send a full 'grid' before spawn deltas")
+            grid = session.apply_spawn(message.get("spawn"))
+        response = await pool.run(
+            predict_one, grid, True, message.get("search"), message.get("include_successors", False)
+        )
+    except SpawnMismatch as exc:
+        response = {"error": f"{exc}; resend the full grid"}
+    except (TypeError, ValueError) as exc:
+        response = {"error": str(exc)}
+    except Exception as exc:  # a dead worker or malformed message must not stall later replies
+        response = {"error": f"Prediction failed: {type(exc).__name__}"}
+    else:
+        if previous is not None:
+            await asyncio.wait([previous])  # keep board updates in message order
+        session.board = response["next_grid"]
+        session.moves += 1
+        if not message.get("include_next_grid", False):
+            del response["next_grid"]
+    if request_id is not None:
+        response["id"] = request_id
+    return response
+
+
+async def stream(websocket: WebSocket) -> None:
+    origin = websocket.headers.get("origin")
+    allowed = websocket.app.state.allowed_origins
+    if origin is not None and "*" not in allowed and origin not in allowed:
+        await websocket.close(code=1008)  # policy violation, like a failed CORS check
+        return
+    await websocket.accept()
+
+    pool: InferencePool = websocket.app.state.pool
+    pipelined = websocket.query_params.get("pipeline", "").lower() in ("1", "true", "yes")
+    session = GameSession("websocket", [])
+    replies: "asyncio.Queue[Optional[asyncio.Task]]" = asyncio.Queue(WS_MAX_IN_FLIGHT if pipelined else 1)
+
+    async def send_replies() -> None:
+        failed = False
+        while True:
+            task = await replies.get()
+            if task is None:
+                return
+            if failed:
+                continue  # keep draining so the reader never blocks on a full queue
+            try:
+                await websocket.send_text(json.dumps(await task))
+            except Exception:
+                # Replies after this one would arrive out of order; drop the connection instead.
+                failed = True
+                with contextlib.suppress(Exception):
+                    await websocket.close(code=1011)
+
+    sender = asyncio.create_task(send_replies())
+    previous: Optional[asyncio.Task] = None
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = json.loads(text)
+            except ValueError:
+                message = None
+            previous = asyncio.create_task(_stream_reply(pool, session, message, previous))
+            # A full queue blocks reading, which pushes back on the client.
+            await replies.put(previous)
+            if not pipelined:
+                await asyncio.wait([previous])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        with contextlib.suppress(asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+            await sender
+
+
+async def admin_model(request: Request) -> JSONResponse:
+    pool: InferencePool = request.app.state.pool
+    pid, version = await pool.run(_ping)
+    return JSONResponse({"path": pool.model_path, "version": version, "workers": pool.workers, "worker_pid": pid})
+
+
+def create_app(
+    model_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    allowed_origins: Optional[str] = None,
+) -> Starlette:
+    """Build the ASGI app; the worker pool starts and stops with the app's lifespan."""
+
+    model_path = model_path or resolve_model_path()
+    workers = workers or int(os.environ.get("RF_WORKERS", "0")) or None
+    watch_seconds = float(os.environ.get("RF_MODEL_WATCH_SECONDS", "0"))
+    allowed = parse_allowed_origins(allowed_origins)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette):
+        app.state.pool = InferencePool(model_path, workers, watch_seconds)
+        app.state.allowed_origins = allowed
+        try:
+            yield
+        finally:
+            app.state.pool.close()
+
+    return Starlette(
+        routes=[
+            Route("/predict", predict, methods=["POST"]),
+            Route("/predict_batch", predict_batch, methods=["POST"]),
+            Route("/admin/model", admin_model, methods=["GET"]),
+            WebSocketRoute("/ws", stream),
+        ],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=allowed,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            )
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5050)))
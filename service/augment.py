@@ -0,0 +1,95 @@
+"""Dihedral data augmentation over the packed training dataset.
+
+Every ``(board, direction)`` sample has eight symmetric twins: the board
+rotated or reflected (``board_rules.SYMMETRIES``) together with the direction
+remapped through ``board_rules.SYMMETRY_MOVES``. The transforms are NumPy views
+over the ``uint8`` exponent array (reversed strides and swapped axes), so
+:class:`AugmentedDataset` exposes ``8 * N`` samples while only the batch being
+handed to the learner is ever copied.
+"""
+
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from board_rules import SYMMETRIES, SYMMETRY_MOVES
+from features import exponent_features, feature_count
+
+_MOVE_TABLE = np.array(SYMMETRY_MOVES, dtype=np.int8)
+
+
+def symmetry_view(boards: np.ndarray, symmetry: int) -> np.ndarray:
+    """View a ``(N, 4, 4)`` array under ``SYMMETRIES[symmetry]`` without copying."""
+
+    transpose, rows, columns = SYMMETRIES[symmetry]
+    view = boards
+    if columns:
+        view = view[:, :, ::-1]
+    if rows:
+        view = view[:, ::-1, :]
+    if transpose:
+        view = view.transpose(0, 2, 1)
+    return view
+
+
+def remap_actions(actions: np.ndarray, symmetry: int) -> np.ndarray:
+    return _MOVE_TABLE[symmetry][actions]
+
+
+def dedupe_samples(exponents: np.ndarray, actions: np.ndarray, *extra: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Drop repeated ``(board, action)`` samples, keeping first occurrences in order."""
+
+    if len(actions) == 0:
+        return (exponents, actions, *extra)
+    rows = np.concatenate([exponents.reshape(len(actions), -1), actions.reshape(-1, 1).astype(exponents.dtype)], axis=1)
+    rows = np.ascontiguousarray(rows)
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first = np.unique(keys, return_index=True)
+    keep = np.sort(first)
+    return tuple(array[keep] for array in (exponents, actions, *extra))
+
+
+class AugmentedDataset:
+    """The eight symmetric copies of a dataset, materialized batch by batch.
+
+    Sample ``i`` is row ``i % N`` under symmetry ``i // N``, so a contiguous
+    range of samples is a slice of a single strided view.
+    """
+
+    def __init__(self, exponents: np.ndarray, actions: np.ndarray, extra_features: bool = False) -> None:
+        self.boards = np.asarray(exponents).reshape(-1, 4, 4)
+        self.actions = np.asarray(actions)
+        self.extra_features = extra_features
+        self.views = [symmetry_view(self.boards, symmetry) for symmetry in range(len(SYMMETRIES))]
+
+    def __len__(self) -> int:
+        return len(self.actions) * len(self.views)
+
+    def batch(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(features float32 (B, F), actions int64 (B,))`` for samples ``start:stop``."""
+
+        n = len(self.actions)
+        features = np.empty((max(stop - start, 0), feature_count(self.extra_features)), dtype=np.float32)
+        actions = np.empty(len(features), dtype=np.int64)
+        offset = 0
+        while start < stop:
+            symmetry, row = divmod(start, n)
+            end = min(stop - start, n - row) + row
+            rows = slice(offset, offset + end - row)
+            exponent_features(self.views[symmetry][row:end], out=features[rows], extra=self.extra_features)
+            actions[rows] = remap_actions(self.actions[row:end], symmetry)
+            offset += end - row
+            start += end - row
+        return features, actions
+
+    def iter_batches(self, batch_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        for start in range(0, len(self), batch_size):
+            yield self.batch(start, min(start + batch_size, len(self)))
+
+    def materialize(self) -> Tuple[np.ndarray, np.ndarray]:
+        """All ``8 * N`` samples at once, for learners that need the full matrix."""
+
+        return self.batch(0, len(self))
+
+
+__all__ = ["AugmentedDataset", "dedupe_samples", "remap_actions", "symmetry_view"]
@@ -0,0 +1,319 @@
+"""Reproducible performance benchmarks for the board engine, features and /predict.
+
+Every run uses the same boards, collected from seeded random games on the
+headless engine. Four areas are measured:
+
+* ``board_rules`` - ``simulate_move`` / ``valid_moves`` per board and the
+  batched ``valid_moves_batch``;
+* ``features`` - ``preprocess_board`` per board and ``preprocess_boards``;
+* ``predict_proba`` - p50 latency for a range of batch sizes;
+* ``/predict`` - request rate and latency percentiles through the Flask test
+  client and over a real socket with concurrent clients.
+
+Results are written as JSON. Passing ``--baseline`` compares them with an
+earlier run on the same machine and exits non-zero when a metric regressed by
+more than ``--tolerance``.
+
+Usage::
+
+    python service/benchmarks.py --output bench.json
+    python service/benchmarks.py --baseline bench.json --tolerance 0.15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import pickle
+import platform
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, simulate_move, valid_moves, valid_moves_batch
+from features import preprocess_board, preprocess_boards
+from headless_game import HeadlessGame
+from model_registry import ModelRegistry, read_model
+from selfplay import RandomPolicy
+
+Result = Dict[str, Any]
+
+
+def board_corpus(size: int, seed: int = 0) -> List[List[List[int]]]:
+    """The first ``size`` boards seen in seeded random games, as tile grids."""
+
+    boards: List[List[List[int]]] = []
+    policy = RandomPolicy(seed)
+    game_seed = seed
+    while len(boards) < size:
+        game = HeadlessGame(seed=game_seed)
+        while not game.over and len(boards) < size:
+            boards.append(game.grid)
+            move = policy.choose([game.board])[0]
+            if move is None:
+                break
+            game.move(move)
+        game_seed += 1
+    return boards
+
+
+def _rate(fn: Callable[[Any], Any], items: Sequence[Any], min_seconds: float) -> float:
+    """Calls per second of ``fn`` over ``items``, repeating the corpus for at least ``min_seconds``."""
+
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for item in items:
+            fn(item)
+        calls += len(items)
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def _latencies(fn: Callable[[], Any], repeats: int) -> List[float]:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _percentiles_ms(samples: Sequence[float]) -> Dict[str, float]:
+    ordered = np.sort(np.asarray(samples)) * 1000.0
+    return {f"p{q}_ms": float(np.percentile(ordered, q)) for q in (50, 95, 99)}
+
+
+def _metric(value: float, unit: str, higher_is_better: bool) -> Result:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def bench_board_rules(grids: Sequence, min_seconds: float) -> Dict[str, Result]:
+    directions = [DIRECTION_NAMES[i % 4] for i in range(len(grids))]
+    pairs = list(zip(grids, directions))
+    batch = np.array(grids, dtype=np.int64)
+    return {
+        "board_rules.simulate_move": _metric(
+            _rate(lambda pair: simulate_move(*pair), pairs, min_seconds), "ops/s", True
+        ),
+        "board_rules.valid_moves": _metric(_rate(valid_moves, grids, min_seconds), "ops/s", True),
+        "board_rules.valid_moves_batch": _metric(
+            _rate(valid_moves_batch, [batch], min_seconds) * len(batch), "boards/s", True
+        ),
+    }
+
+
+def bench_features(grids: Sequence, min_seconds: float) -> Dict[str, Result]:
+    return {
+        "features.preprocess_board": _metric(_rate(preprocess_board, grids, min_seconds), "boards/s", True),
+        "features.preprocess_boards": _metric(
+            _rate(preprocess_boards, [grids], min_seconds) * len(grids), "boards/s", True
+        ),
+    }
+
+
+def bench_predict_proba(model: Any, grids: Sequence, batch_sizes: Sequence[int], repeats: int) -> Dict[str, Result]:
+    features = preprocess_boards(grids)
+    results = {}
+    for size in batch_sizes:
+        rows = np.resize(features, (size, features.shape[1]))
+        p50 = _percentiles_ms(_latencies(lambda: model.predict_proba(rows), repeats))["p50_ms"]
+        results[f"predict_proba.batch_{size}.p50_ms"] = _metric(p50, "ms", False)
+        results[f"predict_proba.batch_{size}.boards_per_s"] = _metric(size / (p50 / 1000.0), "boards/s", True)
+    return results
+
+
+def _load_summary(prefix: str, latencies: Sequence[float], elapsed: float) -> Dict[str, Result]:
+    results = {f"{prefix}.requests_per_s": _metric(len(latencies) / elapsed, "req/s", True)}
+    for name, value in _percentiles_ms(latencies).items():
+        results[f"{prefix}.{name}"] = _metric(value, "ms", False)
+    return results
+
+
+def bench_predict_endpoint(
+    model_path: str, grids: Sequence, requests: int, clients: int
+) -> Dict[str, Result]:
+    import model_server
+
+    # Requests through this wrapper use a registry of their own; the module's registry keeps serving everyone else.
+    benchmark_registry = ModelRegistry(model_path, read_model)
+
+    def app(environ: Dict[str, Any], start_response: Callable) -> Any:
+        environ[model_server.REGISTRY_ENVIRON_KEY] = benchmark_registry
+        return model_server.app(environ, start_response)
+
+    return _load_test(app, [json.dumps({"grid": grid}) for grid in grids], requests, clients)
+
+
+def _load_test(app: Any, bodies: Sequence[str], requests: int, clients: int) -> Dict[str, Result]:
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from werkzeug.test import Client
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+    client = Client(app)
+    started = time.perf_counter()
+    latencies = []
+    for i in range(requests):
+        t0 = time.perf_counter()
+        response = client.post("/predict", data=bodies[i % len(bodies)], content_type="application/json")
+        latencies.append(time.perf_counter() - t0)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    results = _load_summary("predict.test_client", latencies, time.perf_counter() - started)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_port
+
+        def worker(indices: range) -> List[float]:
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            samples = []
+            for i in indices:
+                t0 = time.perf_counter()
+                connection.request(
+                    "POST", "/predict", body=bodies[i % len(bodies)], headers={"Content-Type": "application/json"}
+                )
+                response = connection.getresponse()
+                response.read()
+                samples.append(time.perf_counter() - t0)
+                assert response.status == 200
+            connection.close()
+            return samples
+
+        shares = [range(c, requests, clients) for c in range(clients)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            latencies = [sample for samples in pool.map(worker, shares) for sample in samples]
+        results.update(_load_summary(f"predict.socket_{clients}_clients", latencies, time.perf_counter() - started))
+    finally:
+        server.shutdown()
+        thread.join()
+    return results
+
+
+def synthetic_model(grids: Sequence, seed: int) -> Any:
+    """A small forest fitted on the corpus, for runs without a trained model."""
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, len(DIRECTION_NAMES), size=len(grids))
+    return RandomForestClassifier(n_estimators=50, max_depth=12, random_state=seed).fit(preprocess_boards(grids), labels)
+
+
+def compare(current: Dict[str, Result], baseline: Dict[str, Result], tolerance: float) -> List[Dict[str, Any]]:
+    """Metrics in both runs that got worse by more than ``tolerance`` (a fraction)."""
+
+    regressions = []
+    for name, result in sorted(current.items()):
+        before = baseline.get(name)
+        if before is None or not before["value"]:
+            continue
+        change = result["value"] / before["value"] - 1.0
+        worse = -change if result["higher_is_better"] else change
+        if worse > tolerance:
+            regressions.append({"metric": name, "baseline": before["value"], "current": result["value"], "change": change})
+    return regressions
+
+
+def run_benchmarks(
+    corpus_size: int = 2000,
+    seed: int = 0,
+    min_seconds: float = 1.0,
+    batch_sizes: Sequence[int] = (1, 8, 64, 512),
+    repeats: int = 50,
+    requests: int = 500,
+    clients: int = 4,
+    model_path: Optional[str] = None,
+    areas: Sequence[str] = ("board_rules", "features", "predict_proba", "endpoint"),
+) -> Dict[str, Any]:
+    grids = board_corpus(corpus_size, seed)
+    model_label = model_path or "synthetic"
+    results: Dict[str, Result] = {}
+    if "board_rules" in areas:
+        results.update(bench_board_rules(grids, min_seconds))
+    if "features" in areas:
+        results.update(bench_features(grids, min_seconds))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if model_path is None and ("predict_proba" in areas or "endpoint" in areas):
+            model_path = os.path.join(tmp, "benchmark_model.pkl")
+            with open(model_path, "wb") as fh:
+                pickle.dump(synthetic_model(grids, seed), fh)
+        if "predict_proba" in areas:
+            results.update(bench_predict_proba(read_model(model_path), grids, batch_sizes, repeats))
+        if "endpoint" in areas:
+            results.update(bench_predict_endpoint(model_path, grids, requests, clients))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "corpus_size": corpus_size,
+            "seed": seed,
+            "model": model_label,
+        },
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before failing (0.15 = 15%%)")
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum time per throughput benchmark")
+    parser.add_argument("--batch-sizes", default="1,8,64,512")
+    parser.add_argument("--repeats", type=int, default=50, help="predict_proba calls per batch size")
+    parser.add_argument("--requests", type=int, default=500, help="/predict requests per load test")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent clients in the socket load test")
+    parser.add_argument("--model", default=None, help="model artifact (default: a small synthetic forest)")
+    parser.add_argument(
+        "--only", default="board_rules,features,predict_proba,endpoint", help="comma-separated areas to run"
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        corpus_size=args.corpus_size,
+        seed=args.seed,
+        min_seconds=args.min_seconds,
+        batch_sizes=[int(size) for size in args.batch_sizes.split(",")],
+        repeats=args.repeats,
+        requests=args.requests,
+        clients=args.clients,
+        model_path=args.model,
+        areas=args.only.split(","),
+    )
+    for name, result in sorted(report["results"].items()):
+        print(f"{name:48s} {result['value']:14.3f} {result['unit']}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        report["regressions"] = compare(report["results"], baseline["results"], args.tolerance)
+        report["tolerance"] = args.tolerance
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['metric']}: {regression['baseline']:.3f} -> {regression['current']:.3f}")
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
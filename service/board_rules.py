@@ -1,61 +1,82 @@
-"""Core 2048 board mechanics shared by the model server and tests."""
+"""Core 2048 board mechanics shared by the model server and tests.
 
-from typing import Iterable, List, Sequence, Tuple
+Boards are simulated on a 64-bit packed representation: every cell stores the
+tile exponent in 4 bits (``0`` for an empty cell, ``k`` for a ``2**k`` tile) and
+row ``r`` occupies bits ``16 * r`` to ``16 * r + 15`` with column ``c`` in the
+nibble at ``4 * c``. Moving a row is a single lookup into tables precomputed
+for all 65,536 possible rows. Grids that cannot be packed (tiles above
+``2**MAX_PACKED_EXPONENT``, non powers of two or other shapes) are simulated on
+the original array path so results stay identical for every input.
+"""
+
+from typing import Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
 
 DIRECTION_NAMES: Sequence[str] = ("UP", "RIGHT", "DOWN", "LEFT")
 
+# Two tiles of this exponent merge into ``MAX_PACKED_EXPONENT + 1`` which is the
+# largest value a nibble can hold, so every move result stays packable.
+MAX_PACKED_EXPONENT = 14
+
+_ROW_MASK = 0xFFFF
+_BOARD_MASK = 0xFFFFFFFFFFFFFFFF
+
 
 def _compress(line: Iterable[int]) -> List[int]:
     filtered = [v for v in line if v != 0]
     return filtered + [0] * (4 - len(filtered))
 
 
-def _merge(line: List[int]) -> List[int]:
+def _merge(line: List[int]) -> Tuple[List[int], int]:
     merged: List[int] = []
+    score = 0
     skip = False
     for idx, value in enumerate(line):
         if skip:
             skip = False
             continue
-        if idx + 1 < len(line) and line[idx + 1] == value:
+        if value and idx + 1 < len(line) and line[idx + 1] == value:
             merged.append(value * 2)
+            score += value * 2
             skip = True
         else:
             merged.append(value)
-    return merged + [0] * (4 - len(merged))
+    return merged + [0] * (4 - len(merged)), score
 
 
-def _apply_left(board: np.ndarray) -> Tuple[np.ndarray, bool]:
+def _apply_left(board: np.ndarray) -> Tuple[np.ndarray, bool, int]:
     rows = []
     changed_any = False
+    score = 0
     for row in board:
-        new_row = np.array(_merge(_compress(row.tolist())), dtype=int)
+        merged, row_score = _merge(_compress(row.tolist()))
+        new_row = np.array(merged, dtype=int)
         rows.append(new_row)
+        score += row_score
         if not np.array_equal(new_row, row):
             changed_any = True
-    return np.array(rows, dtype=int), changed_any
+    return np.array(rows, dtype=int), changed_any, score
 
 
-def simulate_move(grid: Sequence[Sequence[int]], direction: str) -> Tuple[np.ndarray, bool]:
+def _simulate_move_array_scored(grid: Sequence[Sequence[int]], direction: str) -> Tuple[np.ndarray, bool, int]:
     arr = np.array(grid, dtype=int)
     original = arr.copy()
 
     if direction == "LEFT":
-        next_board, changed = _apply_left(arr)
+        next_board, changed, score = _apply_left(arr)
     elif direction == "RIGHT":
         flipped = np.fliplr(arr)
-        moved, changed = _apply_left(flipped)
+        moved, changed, score = _apply_left(flipped)
         next_board = np.fliplr(moved)
     elif direction == "UP":
         transposed = arr.T
-        moved, changed = _apply_left(transposed)
+        moved, changed, score = _apply_left(transposed)
         next_board = moved.T
     elif direction == "DOWN":
         transposed = arr.T
         flipped = np.fliplr(transposed)
-        moved, changed = _apply_left(flipped)
+        moved, changed, score = _apply_left(flipped)
         next_board = np.fliplr(moved).T
     else:
         raise ValueError(f"Unknown direction: {direction}")
@@ -63,16 +84,488 @@ def simulate_move(grid: Sequence[Sequence[int]], direction: str) -> Tuple[np.nda
     if not changed:
         changed = not np.array_equal(next_board, original)
 
+    return next_board, changed, score
+
+
+def _simulate_move_array(grid: Sequence[Sequence[int]], direction: str) -> Tuple[np.ndarray, bool]:
+    next_board, changed, _ = _simulate_move_array_scored(grid, direction)
     return next_board, changed
 
 
+def _build_row_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Precompute left/right results and merge scores for every 16-bit row."""
+
+    codes = np.arange(1 << 16, dtype=np.uint32)
+    cells = ((codes[:, None] >> (4 * np.arange(4, dtype=np.uint32))) & 0xF).astype(np.int64)
+
+    # Slide non-empty cells to the left, keeping their order, and pad with
+    # empty cells so the merge scan below never reads out of bounds.
+    order = np.argsort(cells == 0, axis=1, kind="stable")
+    compressed = np.zeros((cells.shape[0], 10), dtype=np.int64)
+    compressed[:, :4] = np.take_along_axis(cells, order, axis=1)
+
+    rows = np.arange(cells.shape[0])
+    read = np.zeros(cells.shape[0], dtype=np.int64)
+    merged = np.zeros_like(cells)
+    score = np.zeros(cells.shape[0], dtype=np.int64)
+    for out in range(4):
+        current = compressed[rows, read]
+        following = compressed[rows, read + 1]
+        # A pair of 2**15 tiles would overflow the nibble, so it never merges.
+        merges = (current != 0) & (current == following) & (current < 0xF)
+        merged[:, out] = np.where(merges, current + 1, current)
+        score += np.where(merges, 1 << (current + 1), 0)
+        read += np.where(merges, 2, 1)
+
+    left = (merged << (4 * np.arange(4))).sum(axis=1).astype(np.uint16)
+    reverse = (cells[:, ::-1] << (4 * np.arange(4))).sum(axis=1).astype(np.uint16)
+    right = reverse[left[reverse]]
+    return left, right, score.astype(np.uint32), reverse
+
+
+ROW_LEFT, ROW_RIGHT, ROW_SCORE, ROW_REVERSE = _build_row_tables()
+# Plain lists index faster than NumPy arrays for the scalar single-board path.
+_ROW_LEFT_LIST: List[int] = ROW_LEFT.tolist()
+_ROW_RIGHT_LIST: List[int] = ROW_RIGHT.tolist()
+_ROW_REVERSE_LIST: List[int] = ROW_REVERSE.tolist()
+_ROW_LEFT_SCORE_LIST: List[int] = ROW_SCORE.tolist()
+_ROW_RIGHT_SCORE = ROW_SCORE[ROW_REVERSE]
+_ROW_RIGHT_SCORE_LIST: List[int] = _ROW_RIGHT_SCORE.tolist()
+
+
+def pack_board(grid: Sequence[Sequence[int]]) -> Optional[int]:
+    """Pack a 4x4 grid of tile values into a 64-bit integer.
+
+    Returns ``None`` when the grid cannot be represented: wrong shape, values
+    that are not zero or a power of two, or tiles above ``2**MAX_PACKED_EXPONENT``.
+    """
+
+    if len(grid) != 4:
+        return None
+    packed = 0
+    shift = 0
+    for row in grid:
+        if len(row) != 4:
+            return None
+        for value in row:
+            value = int(value)
+            if value:
+                if value < 0 or value & (value - 1):
+                    return None
+                exponent = value.bit_length() - 1
+                if exponent == 0 or exponent > MAX_PACKED_EXPONENT:
+                    return None
+                packed |= exponent << shift
+            shift += 4
+    return packed
+
+
+def unpack_board(packed: int) -> np.ndarray:
+    """Expand a packed board back into a 4x4 array of tile values."""
+
+    values = [(packed >> (4 * idx)) & 0xF for idx in range(16)]
+    return np.array([1 << e if e else 0 for e in values], dtype=int).reshape(4, 4)
+
+
+def transpose_board(packed: int) -> int:
+    """Swap rows and columns of a packed board with nibble-level bit tricks."""
+
+    a1 = packed & 0xF0F00F0FF0F00F0F
+    a2 = packed & 0x0000F0F00000F0F0
+    a3 = packed & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return (b1 | (b2 >> 24) | (b3 << 24)) & _BOARD_MASK
+
+
+def _move_rows(packed: int, table: List[int]) -> int:
+    return (
+        table[packed & _ROW_MASK]
+        | table[(packed >> 16) & _ROW_MASK] << 16
+        | table[(packed >> 32) & _ROW_MASK] << 32
+        | table[(packed >> 48) & _ROW_MASK] << 48
+    )
+
+
+def mirror_columns(packed: int) -> int:
+    """Reflect a packed board left-to-right."""
+
+    return _move_rows(packed, _ROW_REVERSE_LIST)
+
+
+def mirror_rows(packed: int) -> int:
+    """Reflect a packed board top-to-bottom."""
+
+    return (
+        (packed & _ROW_MASK) << 48
+        | ((packed >> 16) & _ROW_MASK) << 32
+        | ((packed >> 32) & _ROW_MASK) << 16
+        | (packed >> 48) & _ROW_MASK
+    )
+
+
+# The eight symmetries of the square as (transpose, mirror rows, mirror columns)
+# flags, applied columns first. Each maps a move index on the original board to
+# the equivalent move index on the transformed board.
+SYMMETRIES: Sequence[Tuple[bool, bool, bool]] = tuple(
+    (transpose, rows, columns) for transpose in (False, True) for rows in (False, True) for columns in (False, True)
+)
+_COLUMN_MIRROR_MOVES = (0, 3, 2, 1)
+_ROW_MIRROR_MOVES = (2, 1, 0, 3)
+_TRANSPOSE_MOVES = (3, 2, 1, 0)
+
+
+def _symmetry_moves(transpose: bool, rows: bool, columns: bool) -> Tuple[int, ...]:
+    moves = []
+    for move in range(4):
+        if columns:
+            move = _COLUMN_MIRROR_MOVES[move]
+        if rows:
+            move = _ROW_MIRROR_MOVES[move]
+        if transpose:
+            move = _TRANSPOSE_MOVES[move]
+        moves.append(move)
+    return tuple(moves)
+
+
+SYMMETRY_MOVES: Sequence[Tuple[int, ...]] = tuple(_symmetry_moves(*flags) for flags in SYMMETRIES)
+
+
+def apply_symmetry(packed: int, symmetry: int) -> int:
+    """Transform a packed board by ``SYMMETRIES[symmetry]``."""
+
+    transpose, rows, columns = SYMMETRIES[symmetry]
+    if columns:
+        packed = mirror_columns(packed)
+    if rows:
+        packed = mirror_rows(packed)
+    if transpose:
+        packed = transpose_board(packed)
+    return packed
+
+
+def canonical_board(packed: int) -> Tuple[int, int]:
+    """Return the smallest packed board among the eight symmetries and its index.
+
+    A move ``m`` on ``packed`` corresponds to move ``SYMMETRY_MOVES[index][m]`` on
+    the canonical board.
+    """
+
+    best, best_index = packed, 0
+    for index in range(1, len(SYMMETRIES)):
+        candidate = apply_symmetry(packed, index)
+        if candidate < best:
+            best, best_index = candidate, index
+    return best, best_index
+
+
+def move_packed(packed: int, direction: str) -> int:
+    """Apply ``direction`` to a packed board and return the packed result."""
+
+    if direction == "LEFT":
+        return _move_rows(packed, _ROW_LEFT_LIST)
+    if direction == "RIGHT":
+        return _move_rows(packed, _ROW_RIGHT_LIST)
+    if direction == "UP":
+        return transpose_board(_move_rows(transpose_board(packed), _ROW_LEFT_LIST))
+    if direction == "DOWN":
+        return transpose_board(_move_rows(transpose_board(packed), _ROW_RIGHT_LIST))
+    raise ValueError(f"Unknown direction: {direction}")
+
+
+def tile_exponents(boards: np.ndarray) -> np.ndarray:
+    """Convert tile values to ``uint8`` exponents (``0`` for empty cells).
+
+    Raises ``ValueError`` for values the packed engine cannot represent.
+    """
+
+    values = np.asarray(boards, dtype=np.int64)
+    if np.any(values < 0) or np.any(values & (values - 1)) or np.any(values == 1):
+        raise ValueError("Tile values must be 0 or powers of two greater than 1")
+    exponents = np.zeros(values.shape, dtype=np.uint8)
+    occupied = values > 0
+    exponents[occupied] = np.log2(values[occupied]).astype(np.uint8)
+    if exponents.size and exponents.max() > MAX_PACKED_EXPONENT:
+        raise ValueError(f"Tiles above 2**{MAX_PACKED_EXPONENT} are not supported in batch mode")
+    return exponents
+
+
+def _orient(exponents: np.ndarray, direction: str) -> np.ndarray:
+    """View a ``(N, 4, 4)`` batch so that ``direction`` moves tiles along the last axis to index 0."""
+
+    if direction == "LEFT":
+        return exponents
+    if direction == "RIGHT":
+        return exponents[:, :, ::-1]
+    if direction == "UP":
+        return exponents.transpose(0, 2, 1)
+    if direction == "DOWN":
+        return exponents.transpose(0, 2, 1)[:, :, ::-1]
+    raise ValueError(f"Unknown direction: {direction}")
+
+
+def _unorient(exponents: np.ndarray, direction: str) -> np.ndarray:
+    if direction == "DOWN":
+        return exponents[:, :, ::-1].transpose(0, 2, 1)
+    return _orient(exponents, direction)
+
+
+_NIBBLE_SHIFTS = np.array([0, 4, 8, 12], dtype=np.uint32)
+
+
+def _row_codes(exponents: np.ndarray, direction: str) -> np.ndarray:
+    oriented = _orient(exponents, direction).astype(np.uint32)
+    return (oriented << _NIBBLE_SHIFTS).sum(axis=2)
+
+
+def _as_batch(boards: np.ndarray) -> np.ndarray:
+    exponents = tile_exponents(boards)
+    if exponents.ndim != 3 or exponents.shape[1:] != (4, 4):
+        raise ValueError(f"Expected boards of shape (N, 4, 4), received {exponents.shape}")
+    return exponents
+
+
+def simulate_moves_batch(boards: np.ndarray, direction: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Apply ``direction`` to every board of a ``(N, 4, 4)`` batch at once.
+
+    Returns the next boards (tile values), a boolean ``changed`` flag per board
+    and the score gained from merges per board.
+    """
+
+    exponents = _as_batch(boards)
+    codes = _row_codes(exponents, direction)
+    moved = ROW_LEFT[codes]
+    changed = (moved != codes).any(axis=1)
+    scores = ROW_SCORE[codes].sum(axis=1, dtype=np.int64)
+
+    moved_exponents = ((moved[:, :, None] >> _NIBBLE_SHIFTS) & 0xF).astype(np.int64)
+    moved_exponents = _unorient(moved_exponents, direction)
+    next_boards = np.where(moved_exponents > 0, 1 << moved_exponents, 0)
+    return next_boards, changed, scores
+
+
+def valid_moves_batch(boards: np.ndarray) -> np.ndarray:
+    """Return a ``(N, 4)`` boolean mask of legal moves ordered like ``DIRECTION_NAMES``."""
+
+    return valid_moves_exponents(_as_batch(boards))
+
+
+def valid_moves_exponents(exponents: np.ndarray) -> np.ndarray:
+    """Like :func:`valid_moves_batch` for ``(N, 4, 4)`` tile exponents instead of values.
+
+    Boards with tiles above ``2**MAX_PACKED_EXPONENT`` are checked on the array path.
+    """
+
+    large = exponents.reshape(len(exponents), -1).max(axis=1, initial=0) > MAX_PACKED_EXPONENT
+    packable = np.where(large[:, None, None], 0, exponents)
+    mask = np.empty((exponents.shape[0], len(DIRECTION_NAMES)), dtype=bool)
+    for idx, direction in enumerate(DIRECTION_NAMES):
+        codes = _row_codes(packable, direction)
+        mask[:, idx] = (ROW_LEFT[codes] != codes).any(axis=1)
+    for row in np.flatnonzero(large):
+        grid = np.where(exponents[row] > 0, np.left_shift(1, exponents[row].astype(np.int64)), 0)
+        allowed = valid_moves(grid.tolist())
+        mask[row] = [direction in allowed for direction in DIRECTION_NAMES]
+    return mask
+
+
+_ROW_SHIFTS = np.array([0, 16, 32, 48], dtype=np.uint64)
+_TRANSPOSE_MASKS = tuple(
+    np.uint64(mask)
+    for mask in (
+        0xF0F00F0FF0F00F0F, 0x0000F0F00000F0F0, 0x0F0F00000F0F0000,
+        0xFF00FF0000FF00FF, 0x00FF00FF00000000, 0x00000000FF00FF00,
+    )
+)
+
+
+def transpose_boards(boards: np.ndarray) -> np.ndarray:
+    """:func:`transpose_board` for a ``uint64`` array of packed boards."""
+
+    a1, a2, a3, b1, b2, b3 = _TRANSPOSE_MASKS
+    a = (boards & a1) | ((boards & a2) << np.uint64(12)) | ((boards & a3) >> np.uint64(12))
+    return (a & b1) | ((a & b2) >> np.uint64(24)) | ((a & b3) << np.uint64(24))
+
+
+def _row_codes_packed(boards: np.ndarray) -> np.ndarray:
+    return ((boards[:, None] >> _ROW_SHIFTS) & np.uint64(_ROW_MASK)).astype(np.intp)
+
+
+def _join_rows(rows: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(rows.astype(np.uint64) << _ROW_SHIFTS, axis=1)
+
+
+def move_boards(boards: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Apply every move to a ``(N,)`` ``uint64`` array of packed boards.
+
+    Returns the successors ``(N, 4)`` ``uint64`` and the merge scores
+    ``(N, 4)`` ``int64``, both ordered like ``DIRECTION_NAMES``. A move is legal
+    where its successor differs from the board.
+    """
+
+    boards = np.asarray(boards, dtype=np.uint64)
+    rows = _row_codes_packed(boards)
+    columns = _row_codes_packed(transpose_boards(boards))
+    successors = np.stack(
+        [
+            transpose_boards(_join_rows(ROW_LEFT[columns])),
+            _join_rows(ROW_RIGHT[rows]),
+            transpose_boards(_join_rows(ROW_RIGHT[columns])),
+            _join_rows(ROW_LEFT[rows]),
+        ],
+        axis=1,
+    )
+    scores = np.stack(
+        [
+            ROW_SCORE[columns].sum(axis=1, dtype=np.int64),
+            _ROW_RIGHT_SCORE[rows].sum(axis=1, dtype=np.int64),
+            _ROW_RIGHT_SCORE[columns].sum(axis=1, dtype=np.int64),
+            ROW_SCORE[rows].sum(axis=1, dtype=np.int64),
+        ],
+        axis=1,
+    )
+    return successors, scores
+
+
+def _row_scores(packed: int, table: List[int]) -> int:
+    return (
+        table[packed & _ROW_MASK]
+        + table[(packed >> 16) & _ROW_MASK]
+        + table[(packed >> 32) & _ROW_MASK]
+        + table[(packed >> 48) & _ROW_MASK]
+    )
+
+
+def move_packed_with_score(packed: int, direction: str) -> Tuple[int, int]:
+    """Like :func:`move_packed`, also returning the score gained from merges."""
+
+    if direction in ("UP", "DOWN"):
+        columns = transpose_board(packed)
+        if direction == "UP":
+            return transpose_board(_move_rows(columns, _ROW_LEFT_LIST)), _row_scores(columns, _ROW_LEFT_SCORE_LIST)
+        return transpose_board(_move_rows(columns, _ROW_RIGHT_LIST)), _row_scores(columns, _ROW_RIGHT_SCORE_LIST)
+    if direction == "LEFT":
+        return _move_rows(packed, _ROW_LEFT_LIST), _row_scores(packed, _ROW_LEFT_SCORE_LIST)
+    if direction == "RIGHT":
+        return _move_rows(packed, _ROW_RIGHT_LIST), _row_scores(packed, _ROW_RIGHT_SCORE_LIST)
+    raise ValueError(f"Unknown direction: {direction}")
+
+
+def simulate_move(grid: Sequence[Sequence[int]], direction: str) -> Tuple[np.ndarray, bool]:
+    packed = pack_board(grid)
+    if packed is None:
+        return _simulate_move_array(grid, direction)
+
+    moved = move_packed(packed, direction)
+    return unpack_board(moved), moved != packed
+
+
 def valid_moves(grid: Sequence[Sequence[int]]) -> List[str]:
+    packed = pack_board(grid)
     allowed: List[str] = []
     for direction in DIRECTION_NAMES:
-        _, changed = simulate_move(grid, direction)
+        if packed is None:
+            _, changed = _simulate_move_array(grid, direction)
+        else:
+            changed = move_packed(packed, direction) != packed
         if changed:
             allowed.append(direction)
     return allowed
 
 
-__all__ = ["DIRECTION_NAMES", "simulate_move", "valid_moves"]
+class BoardAnalysis:
+    """The outcome of every move on one board, as computed by :func:`analyze_board`.
+
+    ``changed`` and ``scores`` follow ``DIRECTION_NAMES``. Successor boards are
+    kept packed where possible and only expanded into tile values on request.
+    """
+
+    __slots__ = ("changed", "scores", "_packed", "_grids")
+
+    def __init__(
+        self,
+        changed: Sequence[bool],
+        scores: Sequence[int],
+        packed: Optional[Sequence[int]] = None,
+        grids: Optional[Sequence[np.ndarray]] = None,
+    ) -> None:
+        self.changed = tuple(changed)
+        self.scores = tuple(scores)
+        self._packed = packed
+        self._grids = grids
+
+    @property
+    def valid_moves(self) -> List[str]:
+        return [name for name, changed in zip(DIRECTION_NAMES, self.changed) if changed]
+
+    def successor(self, direction: str) -> np.ndarray:
+        """The board after ``direction`` (before a tile spawns), as tile values."""
+
+        index = DIRECTION_NAMES.index(direction)
+        if self._packed is not None:
+            return unpack_board(self._packed[index])
+        assert self._grids is not None
+        return self._grids[index]
+
+
+def analyze_board(grid: Sequence[Sequence[int]]) -> BoardAnalysis:
+    """Simulate all four moves on ``grid`` at once.
+
+    Packable boards are transposed once and every direction is a pair of row
+    table lookups, so this costs about as much as one :func:`valid_moves` call
+    while also yielding each successor and its merge score. Other grids fall
+    back to the array path, as :func:`simulate_move` does.
+    """
+
+    packed = pack_board(grid)
+    if packed is None:
+        results = [_simulate_move_array_scored(grid, direction) for direction in DIRECTION_NAMES]
+        return BoardAnalysis(
+            [changed for _, changed, _ in results],
+            [score for _, _, score in results],
+            grids=[board for board, _, _ in results],
+        )
+
+    columns = transpose_board(packed)
+    successors = (
+        transpose_board(_move_rows(columns, _ROW_LEFT_LIST)),
+        _move_rows(packed, _ROW_RIGHT_LIST),
+        transpose_board(_move_rows(columns, _ROW_RIGHT_LIST)),
+        _move_rows(packed, _ROW_LEFT_LIST),
+    )
+    scores = (
+        _row_scores(columns, _ROW_LEFT_SCORE_LIST),
+        _row_scores(packed, _ROW_RIGHT_SCORE_LIST),
+        _row_scores(columns, _ROW_RIGHT_SCORE_LIST),
+        _row_scores(packed, _ROW_LEFT_SCORE_LIST),
+    )
+    return BoardAnalysis([moved != packed for moved in successors], scores, packed=successors)
+
+
+__all__ = [
+    "BoardAnalysis",
+    "DIRECTION_NAMES",
+    "MAX_PACKED_EXPONENT",
+    "SYMMETRIES",
+    "SYMMETRY_MOVES",
+    "analyze_board",
+    "apply_symmetry",
+    "canonical_board",
+    "mirror_columns",
+    "mirror_rows",
+    "move_boards",
+    "move_packed",
+    "move_packed_with_score",
+    "pack_board",
+    "simulate_move",
+    "simulate_moves_batch",
+    "tile_exponents",
+    "transpose_board",
+    "transpose_boards",
+    "unpack_board",
+    "valid_moves",
+    "valid_moves_batch",
+    "valid_moves_exponents",
+]
@@ -0,0 +1,138 @@
+"""Persistent, incrementally updated cache of preprocessed training moves.
+
+Every source log file gets one shard of three ``.npy`` columns: ``uint8`` tile
+exponents ``(N, 16)``, ``int8`` actions and ``int32`` rewards. ``index.json``
+maps each source path to its shard and to the file's size and modification time
+when it was parsed. ``update`` only re-parses files that are new or changed and
+drops shards whose source disappeared, and shards are read back with
+``np.load(mmap_mode="r")``.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from log_ingest import empty_move_arrays, parse_log_file
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+COLUMNS = ("exponents", "actions", "rewards")
+
+MoveArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def _fingerprint(path: str) -> Dict[str, int]:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class DatasetCache:
+    """Columnar shard cache for parsed log files."""
+
+    def __init__(self, cache_dir: str) -> None:
+        self.cache_dir = cache_dir
+        self.index: Dict[str, Dict] = self._read_index()
+
+    def _read_index(self) -> Dict[str, Dict]:
+        path = os.path.join(self.cache_dir, INDEX_NAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as fh:
+            data = json.load(fh)
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data["files"]
+
+    def _write_index(self) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = os.path.join(self.cache_dir, INDEX_NAME + ".tmp")
+        with open(tmp_path, "w") as fh:
+            json.dump({"version": INDEX_VERSION, "files": self.index}, fh, indent=2)
+        os.replace(tmp_path, os.path.join(self.cache_dir, INDEX_NAME))
+
+    def _shard_path(self, shard: str, column: str) -> str:
+        return os.path.join(self.cache_dir, f"{shard}.{column}.npy")
+
+    def stale_files(self, paths: Sequence[str]) -> List[str]:
+        stale = []
+        for path in paths:
+            entry = self.index.get(os.path.abspath(path))
+            if entry is None or entry["fingerprint"] != _fingerprint(path):
+                stale.append(path)
+        return stale
+
+    def update(self, paths: Sequence[str], processes: Optional[int] = None, verbose: bool = True) -> List[str]:
+        """Parse new or changed files into shards; return the files that were parsed."""
+
+        wanted = {os.path.abspath(path) for path in paths}
+        for source in [source for source in self.index if source not in wanted]:
+            self._remove_shard(self.index.pop(source)["shard"])
+
+        stale = self.stale_files(paths)
+        if verbose:
+            print(f"Dataset cache: {len(paths) - len(stale)} files cached, {len(stale)} to parse")
+
+        fingerprints = {path: _fingerprint(path) for path in stale}
+        if processes == 1 or len(stale) <= 1:
+            parsed = map(parse_log_file, stale)
+            self._store(parsed, fingerprints, verbose)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                self._store(pool.imap_unordered(parse_log_file, stale), fingerprints, verbose)
+        self._write_index()
+        return stale
+
+    def _store(self, parsed, fingerprints: Dict[str, Dict[str, int]], verbose: bool) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for path, arrays, error in parsed:
+            if error is not None:
+                # Left out of the index so the file is retried on the next run.
+                if verbose:
+                    print(f"  - Error reading {path}: {error}")
+                continue
+            assert arrays is not None
+            source = os.path.abspath(path)
+            shard = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+            for column, array in zip(COLUMNS, arrays):
+                np.save(self._shard_path(shard, column), array)
+            self.index[source] = {"shard": shard, "fingerprint": fingerprints[path], "rows": int(len(arrays[1]))}
+            if verbose:
+                print(f"  - Cached {len(arrays[1])} moves from {path}")
+
+    def _remove_shard(self, shard: str) -> None:
+        for column in COLUMNS:
+            try:
+                os.remove(self._shard_path(shard, column))
+            except FileNotFoundError:
+                pass
+
+    def iter_shards(self, paths: Optional[Sequence[str]] = None) -> Iterator[MoveArrays]:
+        """Yield memory-mapped ``(exponents, actions, rewards)`` per cached file."""
+
+        sources = sorted(self.index) if paths is None else [os.path.abspath(p) for p in paths]
+        for source in sources:
+            if source not in self.index:
+                continue  # failed to parse; reported by update()
+            shard = self.index[source]["shard"]
+            yield tuple(  # type: ignore[misc]
+                np.load(self._shard_path(shard, column), mmap_mode="r") for column in COLUMNS
+            )
+
+    def load_arrays(self, paths: Optional[Sequence[str]] = None) -> MoveArrays:
+        """Concatenate the cached shards of ``paths`` (default: every cached file)."""
+
+        shards = list(self.iter_shards(paths))
+        if not shards:
+            return empty_move_arrays()
+        return tuple(np.concatenate(column) for column in zip(*shards))  # type: ignore[return-value]
+
+    @property
+    def total_rows(self) -> int:
+        return sum(entry["rows"] for entry in self.index.values())
+
+
+__all__ = ["COLUMNS", "DatasetCache"]
@@ -0,0 +1,191 @@
+"""Score model artifacts by how well they play, and gate promotion on the result.
+
+Every model plays the same seeded games through ``selfplay.run_selfplay``, so
+the per-game scores can be compared seed by seed. The report has each model's
+mean and median score, score percentiles, max-tile histogram, invalid-prediction
+rate and moves per second. For each candidate it also has the mean score
+difference from the baseline with a 95% confidence interval.
+
+The first model is the baseline unless ``--baseline`` names another one. The
+command exits with status 1 when any candidate fails a gate, so CI can use it
+before a model is promoted.
+
+Usage::
+
+    python service/evaluate_models.py random_forest_2048.pkl candidate.npz \\
+        --games 1000 --max-invalid-rate 0.05 --max-score-drop 0.02 --output eval.json
+"""
+
+import argparse
+import json
+import math
+import statistics
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from selfplay import run_selfplay
+
+# Two-sided 95% normal quantile; game counts used for gating are large enough.
+_Z95 = 1.959963984540054
+
+
+def paired_difference(candidate: Sequence[Dict], baseline: Sequence[Dict]) -> Dict[str, Optional[float]]:
+    """Mean per-seed score difference (candidate minus baseline) and its 95% CI.
+
+    A single paired game has no spread, so its CI bounds are ``None``.
+    """
+
+    baseline_scores = {game["seed"]: game["score"] for game in baseline}
+    deltas = [game["score"] - baseline_scores[game["seed"]] for game in candidate if game["seed"] in baseline_scores]
+    if not deltas:
+        return {"mean": 0.0, "ci95_low": 0.0, "ci95_high": 0.0, "games": 0}
+    mean = statistics.fmean(deltas)
+    if len(deltas) < 2:
+        return {"mean": mean, "ci95_low": None, "ci95_high": None, "games": 1}
+    half_width = _Z95 * statistics.stdev(deltas) / math.sqrt(len(deltas))
+    return {"mean": mean, "ci95_low": mean - half_width, "ci95_high": mean + half_width, "games": len(deltas)}
+
+
+def score_percentiles(games: Sequence[Dict]) -> Dict[str, float]:
+    scores = np.asarray([game["score"] for game in games], dtype=np.float64)
+    if not len(scores):
+        return {}
+    return {f"p{q}": float(np.percentile(scores, q)) for q in (10, 25, 75, 90)}
+
+
+def check_gates(
+    summary: Dict,
+    baseline: Optional[Dict] = None,
+    min_mean_score: Optional[float] = None,
+    max_invalid_rate: Optional[float] = None,
+    max_score_drop: Optional[float] = None,
+    min_win_rate: Optional[float] = None,
+) -> List[str]:
+    """Reasons ``summary`` fails the configured thresholds; empty if it passes.
+
+    ``max_score_drop`` is the largest allowed fall in mean score relative to
+    ``baseline``, as a fraction (``0.02`` allows 2% lower).
+    """
+
+    failures = []
+    if min_mean_score is not None and summary["mean_score"] < min_mean_score:
+        failures.append(f"mean score {summary['mean_score']:.1f} < {min_mean_score:.1f}")
+    if max_invalid_rate is not None and summary["invalid_prediction_rate"] > max_invalid_rate:
+        failures.append(f"invalid prediction rate {summary['invalid_prediction_rate']:.4f} > {max_invalid_rate:.4f}")
+    if min_win_rate is not None and summary["win_rate"] < min_win_rate:
+        failures.append(f"win rate {summary['win_rate']:.4f} < {min_win_rate:.4f}")
+    if max_score_drop is not None and baseline is not None and baseline["mean_score"] > 0:
+        floor = baseline["mean_score"] * (1.0 - max_score_drop)
+        if summary["mean_score"] < floor:
+            failures.append(
+                f"mean score {summary['mean_score']:.1f} is more than {max_score_drop:.1%} "
+                f"below the baseline {baseline['mean_score']:.1f}"
+            )
+    return failures
+
+
+def evaluate_models(
+    model_paths: Sequence[str],
+    games: int,
+    processes: Optional[int] = None,
+    seed: int = 0,
+    max_moves: Optional[int] = None,
+    baseline: Optional[str] = None,
+    **gates: Optional[float],
+) -> Dict:
+    """Play ``games`` seeded games per model and apply ``gates`` to the candidates.
+
+    ``gates`` are the keyword arguments of ``check_gates``. The baseline is
+    reported but only gated on the absolute thresholds.
+    """
+
+    baseline = baseline or model_paths[0]
+    paths = list(dict.fromkeys([baseline, *model_paths]))
+    played: Dict[str, Dict] = {}
+    for path in paths:
+        played[path] = run_selfplay(
+            {"name": "model", "model_path": path}, games=games, processes=processes, seed=seed, max_moves=max_moves
+        )
+
+    baseline_summary = played[baseline]["summary"]
+    models = {}
+    for path in paths:
+        summary = dict(played[path]["summary"], score_percentiles=score_percentiles(played[path]["games"]))
+        entry = {"summary": summary, "baseline": path == baseline}
+        if path == baseline:
+            entry["failures"] = check_gates(summary, **{k: v for k, v in gates.items() if k != "max_score_drop"})
+        else:
+            entry["vs_baseline"] = paired_difference(played[path]["games"], played[baseline]["games"])
+            entry["failures"] = check_gates(summary, baseline_summary, **gates)
+        models[path] = entry
+
+    candidates = [entry for path, entry in models.items() if path != baseline]
+    return {
+        "games": games,
+        "seed": seed,
+        "baseline": baseline,
+        "models": models,
+        "passed": all(not entry["failures"] for entry in candidates or models.values()),
+    }
+
+
+def format_table(report: Dict) -> str:
+    header = f"{'model':40s} {'mean':>9s} {'median':>9s} {'win%':>6s} {'invalid%':>9s} {'moves/s':>9s} {'vs base':>18s}"
+    lines = [header]
+    for path, entry in report["models"].items():
+        summary = entry["summary"]
+        delta = entry.get("vs_baseline")
+        if delta is None:
+            versus = "baseline"
+        elif delta["ci95_low"] is None:
+            versus = f"{delta['mean']:+.0f} [n/a]"
+        else:
+            versus = f"{delta['mean']:+.0f} [{delta['ci95_low']:+.0f},{delta['ci95_high']:+.0f}]"
+        lines.append(
+            f"{path[-40:]:40s} {summary['mean_score']:9.1f} {summary['median_score']:9.1f} "
+            f"{summary['win_rate'] * 100:6.2f} {summary['invalid_prediction_rate'] * 100:9.3f} "
+            f"{summary['moves_per_second']:9.0f} {versus:>18s}"
+        )
+        lines.append(f"    max tiles: {summary['max_tile_counts']}")
+        for failure in entry["failures"]:
+            lines.append(f"    FAIL: {failure}")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("models", nargs="+", help="model artifacts (.pkl, .npz or model directory)")
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--baseline", default=None, help="model to compare candidates against (default: the first)")
+    parser.add_argument("--min-mean-score", type=float, default=None)
+    parser.add_argument("--max-invalid-rate", type=float, default=None, help="for example 0.05 for 5%%")
+    parser.add_argument("--max-score-drop", type=float, default=None, help="allowed fall below the baseline mean score")
+    parser.add_argument("--min-win-rate", type=float, default=None)
+    parser.add_argument("--output", default=None, help="write the full report as JSON here")
+    args = parser.parse_args()
+
+    report = evaluate_models(
+        args.models,
+        games=args.games,
+        processes=args.processes,
+        seed=args.seed,
+        max_moves=args.max_moves,
+        baseline=args.baseline,
+        min_mean_score=args.min_mean_score,
+        max_invalid_rate=args.max_invalid_rate,
+        max_score_drop=args.max_score_drop,
+        min_win_rate=args.min_win_rate,
+    )
+    print(format_table(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, allow_nan=False)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
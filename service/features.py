@@ -0,0 +1,151 @@
+"""Model features shared by training, self-play and the prediction service.
+
+The model sees each cell as ``log2(tile) / 16`` (``0`` for an empty cell).
+Features are computed from ``uint8`` tile exponents via a 17-entry lookup
+table, whether the boards arrive as tile grids (``/predict``), packed 64-bit
+boards (self-play) or cached exponent arrays (training). Every batch function
+accepts an ``out`` buffer so callers that featurize repeatedly can reuse one
+allocation.
+
+``extra=True`` appends three engineered columns, all in ``[0, 1]``:
+
+* ``empty_count`` - share of empty cells;
+* ``monotonicity`` - how consistently rows and columns rise or fall;
+* ``merge_potential`` - equal neighbours once each line is slid together.
+
+Models are trained with or without them, so a model only works with the
+feature width it was fitted on.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+BOARD_CELLS = 16
+FEATURE_SCALE = 16.0
+MAX_EXPONENT = 16
+EXTRA_FEATURE_NAMES = ("empty_count", "monotonicity", "merge_potential")
+
+EXPONENT_FEATURES = np.arange(MAX_EXPONENT + 1, dtype=np.float32) / np.float32(FEATURE_SCALE)
+_TILE_VALUES = np.left_shift(1, np.arange(MAX_EXPONENT + 1, dtype=np.int64))
+_NIBBLE_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+# Largest possible sums of the monotonicity penalty and of merge pairs over the 8 lines.
+_MAX_MONOTONICITY_PENALTY = 8 * 1.5 * MAX_EXPONENT
+_MAX_MERGES = 8 * 3
+
+
+def feature_count(extra: bool = False) -> int:
+    return BOARD_CELLS + (len(EXTRA_FEATURE_NAMES) if extra else 0)
+
+
+def uses_extra_features(model) -> bool:
+    """Whether ``model`` was fitted with the engineered columns appended."""
+
+    return int(getattr(model, "n_features_in_", BOARD_CELLS)) > BOARD_CELLS
+
+
+def _output(rows: int, extra: bool, out: Optional[np.ndarray]) -> np.ndarray:
+    shape = (rows, feature_count(extra))
+    if out is None:
+        return np.empty(shape, dtype=np.float32)
+    if out.shape != shape or out.dtype != np.float32:
+        raise ValueError(f"Output buffer must be float32 with shape {shape}, got {out.dtype} {out.shape}")
+    return out
+
+
+def exponent_features(
+    exponents: np.ndarray, out: Optional[np.ndarray] = None, extra: bool = False
+) -> np.ndarray:
+    """Features ``(N, F)`` for tile exponents shaped ``(N, 16)`` or ``(N, 4, 4)``."""
+
+    exponents = np.asarray(exponents)
+    exponents = exponents.reshape(len(exponents), BOARD_CELLS)
+    if exponents.size and int(exponents.max()) > MAX_EXPONENT:
+        raise ValueError(f"Tile exponents above {MAX_EXPONENT} are not supported")
+    out = _output(len(exponents), extra, out)
+    np.take(EXPONENT_FEATURES, exponents, out=out[:, :BOARD_CELLS], mode="clip")
+    if extra:
+        engineered_features(exponents, out[:, BOARD_CELLS:])
+    return out
+
+
+def engineered_features(exponents: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """The ``EXTRA_FEATURE_NAMES`` columns ``(N, 3)`` for ``(N, 16)`` exponents."""
+
+    boards = np.asarray(exponents).reshape(-1, 4, 4).astype(np.int8)
+    if out is None:
+        out = np.empty((len(boards), len(EXTRA_FEATURE_NAMES)), dtype=np.float32)
+    # Rows and columns as one (N, 8, 4) stack of lines.
+    lines = np.concatenate([boards, boards.transpose(0, 2, 1)], axis=1)
+
+    out[:, 0] = (boards == 0).sum(axis=(1, 2)) / np.float32(BOARD_CELLS)
+
+    steps = np.diff(lines, axis=2)
+    rising = np.where(steps > 0, steps, 0).sum(axis=2)
+    falling = np.where(steps < 0, -steps, 0).sum(axis=2)
+    penalty = np.minimum(rising, falling).sum(axis=1)
+    out[:, 1] = 1.0 - penalty / np.float32(_MAX_MONOTONICITY_PENALTY)
+
+    # Slide every line towards index 0 (stable sort keeps tile order) and count equal neighbours.
+    order = np.argsort(lines == 0, axis=2, kind="stable")
+    slid = np.take_along_axis(lines, order, axis=2)
+    pairs = (slid[:, :, :-1] == slid[:, :, 1:]) & (slid[:, :, :-1] != 0)
+    out[:, 2] = pairs.sum(axis=(1, 2)) / np.float32(_MAX_MERGES)
+    return out
+
+
+def packed_exponents(boards: Sequence[int]) -> np.ndarray:
+    """``uint8`` exponents ``(N, 16)`` of packed boards, in row-major cell order."""
+
+    packed = np.asarray(boards, dtype=np.uint64)
+    return ((packed[:, None] >> _NIBBLE_SHIFTS) & np.uint64(0xF)).astype(np.uint8)
+
+
+def packed_features(
+    boards: Sequence[int], out: Optional[np.ndarray] = None, extra: bool = False
+) -> np.ndarray:
+    """Features ``(N, F)`` for packed boards."""
+
+    return exponent_features(packed_exponents(boards), out=out, extra=extra)
+
+
+def preprocess_boards(
+    grids: Sequence, out: Optional[np.ndarray] = None, extra: bool = False
+) -> np.ndarray:
+    """Features ``(N, F)`` for a batch of 4x4 tile grids."""
+
+    values = np.asarray(grids, dtype=np.int64)
+    if values.ndim != 3 or values.shape[1:] != (4, 4):
+        raise ValueError(f"Expected a list of 4x4 grids, received shape {values.shape}")
+    # Empty cells and 1 both map to exponent 0, as log2 did with zeros replaced by 1.
+    exponents = np.searchsorted(_TILE_VALUES, values)
+    expected = _TILE_VALUES.take(exponents, mode="clip")
+    if values.size and (values.min() < 0 or not np.array_equal(expected, np.maximum(values, 1))):
+        raise ValueError(f"Tile values must be 0 or powers of two up to {1 << MAX_EXPONENT}")
+    return exponent_features(exponents, out=out, extra=extra)
+
+
+def preprocess_board(grid: Sequence, out: Optional[np.ndarray] = None, extra: bool = False) -> np.ndarray:
+    """Features ``(F,)`` for a single 4x4 tile grid."""
+
+    values = np.asarray(grid, dtype=np.int64)
+    if values.shape != (4, 4):
+        raise ValueError(f"Expected 4x4 grid, received shape {values.shape}")
+    return preprocess_boards(values[None], out=None if out is None else out.reshape(1, -1), extra=extra)[0]
+
+
+__all__ = [
+    "EXPONENT_FEATURES",
+    "EXTRA_FEATURE_NAMES",
+    "FEATURE_SCALE",
+    "MAX_EXPONENT",
+    "engineered_features",
+    "exponent_features",
+    "feature_count",
+    "packed_exponents",
+    "packed_features",
+    "preprocess_board",
+    "preprocess_boards",
+    "uses_extra_features",
+]
@@ -0,0 +1,259 @@
+"""Flat, array-based inference for the scikit-learn RandomForest model.
+
+``compile_forest`` copies the node arrays of every ``estimators_[i].tree_`` into
+one set of contiguous NumPy arrays. ``FlatForest.predict_proba`` then walks all
+trees for a whole batch in lockstep with vectorised indexing, which avoids the
+per-call overhead of scikit-learn's estimator machinery.
+
+Leaves point at themselves and compare against ``+inf`` so the traversal is a
+fixed number of branch-free steps (the depth of the deepest tree).
+
+Forests are stored either as a single ``.npz`` archive or as a model directory
+holding a ``manifest.json`` and one ``.npy`` file per array. The directory
+format is opened with ``np.load(mmap_mode="r")``, so loading is near-instant and
+every server process mapping the same directory shares the pages. Exporting
+over a live directory writes each array under a new file name and swaps the
+manifest last, so processes still mapping the previous arrays keep reading
+them unchanged.
+
+Usage::
+
+    python service/forest_engine.py random_forest_2048.pkl random_forest_2048.npz
+    python service/forest_engine.py random_forest_2048.pkl random_forest_2048.model
+"""
+
+import contextlib
+import json
+import os
+import pickle
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+_ARRAY_NAMES = ("feature", "threshold", "children_left", "children_right", "value", "roots", "classes")
+
+
+def _manifest_arrays(path: str) -> List[str]:
+    """Array file names listed by the manifest in ``path``; empty if there is none."""
+
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as fh:
+            return list(json.load(fh).get("arrays", []))
+    except (OSError, ValueError):
+        return []
+
+
+class FlatForest:
+    """A RandomForest flattened into contiguous node arrays."""
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children_left: np.ndarray,
+        children_right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        classes: np.ndarray,
+        max_depth: int,
+    ) -> None:
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_features_in_(self) -> int:
+        """Input columns the trees read (leaves point at column 0)."""
+
+        return int(self.feature.max()) + 1 if len(self.feature) else 0
+
+    def apply(self, X: Any) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape ``(n_samples, n_trees)``."""
+
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children_left": self.children_left,
+            "children_right": self.children_right,
+            "value": self.value,
+            "roots": self.roots,
+            "classes": self.classes_,
+            "max_depth": np.array(self.max_depth),
+            "format_version": np.array(FORMAT_VERSION),
+        }
+
+    def save(self, path: str) -> None:
+        np.savez(path, **self.arrays())
+
+    @classmethod
+    def from_arrays(cls, arrays: Any) -> "FlatForest":
+        version = int(arrays["format_version"])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported flat forest format version {version}")
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children_left=arrays["children_left"],
+            children_right=arrays["children_right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=arrays["classes"],
+            max_depth=int(arrays["max_depth"]),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FlatForest":
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_arrays({key: data[key] for key in data.files})
+
+    def save_directory(self, path: str) -> None:
+        """Write the forest as a model directory of ``.npy`` files.
+
+        Arrays of an earlier export are never written over: a server may have
+        them memory-mapped, and rewriting a mapped file changes (or truncates)
+        the model it is serving. Each export gets fresh file names, and only
+        arrays older than the previous export are removed.
+        """
+
+        os.makedirs(path, exist_ok=True)
+        previous = _manifest_arrays(path)
+        generation = os.urandom(4).hex()
+        files = [f"{name}.{generation}.npy" for name in _ARRAY_NAMES]
+        for name, filename in zip(_ARRAY_NAMES, files):
+            array = self.classes_ if name == "classes" else getattr(self, name)
+            np.save(os.path.join(path, filename), np.ascontiguousarray(array))
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "max_depth": self.max_depth,
+            "n_estimators": self.n_estimators,
+            "n_nodes": int(len(self.feature)),
+            "arrays": files,
+        }
+        # The manifest goes last so readers never see a half-written model.
+        tmp_path = os.path.join(path, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w") as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(tmp_path, os.path.join(path, MANIFEST_NAME))
+
+        # Keep the previous export for readers that opened its manifest just before the swap.
+        keep = set(files) | set(previous)
+        for filename in os.listdir(path):
+            if filename.endswith(".npy") and filename not in keep:
+                # Existing memory maps keep the unlinked file's pages alive.
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(path, filename))
+
+    @classmethod
+    def load_directory(cls, path: str, mmap_mode: Optional[str] = "r") -> "FlatForest":
+        """Open a model directory, memory-mapping the node arrays by default."""
+
+        with open(os.path.join(path, MANIFEST_NAME)) as fh:
+            manifest = json.load(fh)
+        files = manifest.get("arrays") or [f"{name}.npy" for name in _ARRAY_NAMES]
+        arrays: Dict[str, Any] = {
+            name: np.load(os.path.join(path, filename), mmap_mode=mmap_mode, allow_pickle=False)
+            for name, filename in zip(_ARRAY_NAMES, files)
+        }
+        arrays["format_version"] = manifest["format_version"]
+        arrays["max_depth"] = manifest["max_depth"]
+        return cls.from_arrays(arrays)
+
+
+def compile_forest(model: Any) -> FlatForest:
+    """Flatten a fitted ``RandomForestClassifier`` into a :class:`FlatForest`."""
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes, dtype=np.int32)
+        leaf = tree.children_left == -1
+
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(leaf, np.inf, tree.threshold).astype(np.float64))
+        lefts.append((np.where(leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+        rights.append((np.where(leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+
+        # Older scikit-learn releases store class counts, newer ones fractions.
+        counts = tree.value[:, 0, :].astype(np.float64)
+        totals = counts.sum(axis=1, keepdims=True)
+        values.append((counts / np.where(totals == 0, 1, totals)).astype(np.float32))
+
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+
+    return FlatForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds),
+        children_left=np.concatenate(lefts),
+        children_right=np.concatenate(rights),
+        value=np.concatenate(values),
+        roots=np.array(roots, dtype=np.int32),
+        classes=np.asarray(model.classes_),
+        max_depth=max_depth,
+    )
+
+
+def load_forest(path: str) -> FlatForest:
+    """Load a flat forest from either a ``.npz`` archive or a model directory."""
+
+    if os.path.isdir(path):
+        return FlatForest.load_directory(path)
+    return FlatForest.load(path)
+
+
+def export_pickle(pickle_path: str, output_path: str) -> FlatForest:
+    with open(pickle_path, "rb") as fh:
+        model = pickle.load(fh)
+    forest = compile_forest(model)
+    if output_path.endswith(".npz"):
+        forest.save(output_path)
+    else:
+        forest.save_directory(output_path)
+    return forest
+
+
+__all__ = ["FORMAT_VERSION", "FlatForest", "compile_forest", "export_pickle", "load_forest"]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: forest_engine.py MODEL.pkl OUTPUT(.npz|directory)")
+    compiled = export_pickle(sys.argv[1], sys.argv[2])
+    print(
+        f"Exported {compiled.n_estimators} trees ({len(compiled.feature)} nodes, "
+        f"max depth {compiled.max_depth}) to {sys.argv[2]}"
+    )
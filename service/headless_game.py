@@ -0,0 +1,180 @@
+"""Headless 2048 game on packed boards, mirroring ``js/game_manager.js``.
+
+A game starts with two random tiles. Every move that changes the board adds
+the merged tile values to the score and spawns a 2 (90%) or a 4 (10%) on a
+uniformly chosen empty cell. The game is over when no move is left. Reaching
+2048 sets ``won``; play continues as if "keep playing" had been pressed.
+
+With ``record_log`` enabled the game records the same ``move`` and ``gameEnd``
+events the browser logger produces (see ``js/logger.js``), so self-play
+output can be dropped into ``training_data/`` next to recorded games.
+"""
+
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from board_rules import DIRECTION_NAMES, move_packed, move_packed_with_score, unpack_board
+
+WIN_EXPONENT = 11
+
+
+def packed_empty_shifts(packed: int) -> List[int]:
+    return [shift for shift in range(0, 64, 4) if not (packed >> shift) & 0xF]
+
+
+def packed_max_tile(packed: int) -> int:
+    exponent = max((packed >> shift) & 0xF for shift in range(0, 64, 4))
+    return 1 << exponent if exponent else 0
+
+
+def packed_moves_available(packed: int) -> bool:
+    return any(move_packed(packed, direction) != packed for direction in DIRECTION_NAMES)
+
+
+def _line_cells(direction: str, line: int) -> List[Tuple[int, int]]:
+    """(row, col) cells of one line, ordered from the side tiles move towards."""
+
+    if direction == "LEFT":
+        return [(line, col) for col in range(4)]
+    if direction == "RIGHT":
+        return [(line, col) for col in range(3, -1, -1)]
+    if direction == "UP":
+        return [(row, line) for row in range(4)]
+    return [(row, line) for row in range(3, -1, -1)]
+
+
+def merge_events(grid: List[List[int]], direction: str) -> List[Dict]:
+    """Describe the merges of a move the way ``GameManager.move`` logs them."""
+
+    events = []
+    for line in range(4):
+        cells = _line_cells(direction, line)
+        placed: List[List] = []  # [value, merged] per landing position
+        for cell in cells:
+            value = grid[cell[0]][cell[1]]
+            if not value:
+                continue
+            if placed and placed[-1][0] == value and not placed[-1][1]:
+                into = cells[len(placed) - 1]
+                placed[-1] = [value * 2, True]
+                events.append(
+                    {"from": list(cell), "into": list(into), "value": value, "result": value * 2}
+                )
+            else:
+                placed.append([value, False])
+    return events
+
+
+class HeadlessGame:
+    """A single 2048 game driven by direction names."""
+
+    def __init__(self, seed: Optional[int] = None, record_log: bool = False) -> None:
+        self.rng = random.Random(seed)
+        self.record_log = record_log
+        self.reset()
+
+    def reset(self) -> None:
+        self.board = 0
+        self.score = 0
+        self.turn = 0
+        self.over = False
+        self.won = False
+        self.log: List[Dict] = []
+        for _ in range(2):
+            self._add_random_tile()
+
+    @property
+    def grid(self) -> List[List[int]]:
+        return unpack_board(self.board).tolist()
+
+    @property
+    def highest_tile(self) -> int:
+        return packed_max_tile(self.board)
+
+    def valid_moves(self) -> List[str]:
+        return [d for d in DIRECTION_NAMES if move_packed(self.board, d) != self.board]
+
+    def _add_random_tile(self) -> Optional[Dict]:
+        empties = packed_empty_shifts(self.board)
+        if not empties:
+            return None
+        exponent = 1 if self.rng.random() < 0.9 else 2
+        shift = self.rng.choice(empties)
+        self.board |= exponent << shift
+        cell = shift // 4
+        return {"row": cell // 4, "col": cell % 4, "value": 1 << exponent}
+
+    def _state(self) -> Dict:
+        return {"grid": self.grid, "score": self.score}
+
+    def _log(self, entry: Dict) -> None:
+        self.log.append({"ts": int(time.time() * 1000), **entry})
+
+    def move(self, direction: str) -> bool:
+        """Play ``direction``; return whether the board changed."""
+
+        if self.over:
+            return False
+        self.turn += 1
+        prev_state = self._state() if self.record_log else None
+
+        moved_board, gained = move_packed_with_score(self.board, direction)
+        moved = moved_board != self.board
+        spawned = None
+        if moved:
+            merges = merge_events(prev_state["grid"], direction) if prev_state else []
+            self.board = moved_board
+            self.score += gained
+            if packed_max_tile(self.board) >= 1 << WIN_EXPONENT:
+                self.won = True
+            spawned = self._add_random_tile()
+            if not packed_moves_available(self.board):
+                self.over = True
+        else:
+            merges = []
+
+        if self.record_log:
+            next_state = self._state()
+            self._log(
+                {
+                    "type": "move",
+                    "turn": self.turn,
+                    "direction": direction,
+                    "prev": prev_state,
+                    "next": next_state,
+                    "merges": merges,
+                    "spawnedTile": spawned,
+                    "valid": moved,
+                }
+            )
+            if self.over:
+                self._log(
+                    {
+                        "type": "gameEnd",
+                        "turn": self.turn,
+                        "reason": "loss",
+                        "score": self.score,
+                        "highestTile": self.highest_tile,
+                        "state": next_state,
+                        "over": True,
+                        "won": self.won,
+                        "keepPlaying": self.won,
+                    }
+                )
+        return moved
+
+    def export_log(self) -> str:
+        """Serialize the log like ``exportGameLogs`` in ``js/logger.js``."""
+
+        return json.dumps(self.log, indent=2)
+
+
+__all__ = [
+    "HeadlessGame",
+    "merge_events",
+    "packed_empty_shifts",
+    "packed_max_tile",
+    "packed_moves_available",
+]
@@ -0,0 +1,182 @@
+"""Streaming, parallel ingestion of browser game logs into NumPy arrays.
+
+Log files are JSON arrays of events (see ``exportGameLogs`` in ``js/logger.js``).
+``iter_log_events`` decodes them one event at a time from a fixed-size read
+buffer, so a file never has to be held in memory as a whole. ``load_move_arrays``
+parses files on a process pool and keeps only the valid ``move`` events as
+compact arrays: ``uint8`` tile exponents of the board before the move, the
+direction index and the score gained.
+"""
+
+import json
+import multiprocessing
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DIRECTION_MAP: Dict[str, int] = {"UP": 0, "RIGHT": 1, "DOWN": 2, "LEFT": 3}
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# raw_decode stops short of an incomplete fraction or exponent ("." or "e-")
+# without an error, leaving at most this many characters unread.
+_NUMBER_LOOKAHEAD = 2
+
+
+def iter_log_events(path: str, read_size: int = 1 << 16) -> Iterator[Dict]:
+    """Yield the elements of a top-level JSON array without loading the file."""
+
+    with open(path, "r", encoding="utf-8") as fh:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = fh.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        # Find the opening bracket of the array.
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                break
+            if not fill():
+                return
+        if buffer[pos] != "[":
+            raise ValueError(f"{path}: expected a JSON array of log events")
+        pos += 1
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos >= len(buffer):
+                if not fill():
+                    raise ValueError(f"{path}: unexpected end of file inside the log array")
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            if len(buffer) - end <= _NUMBER_LOOKAHEAD and not eof:
+                # A number near the end of the buffer may continue: "3." + "25", "1e" + "-07".
+                if fill():
+                    continue
+            pos = end
+            yield value
+
+
+class ChunkedMoves:
+    """Append moves into fixed-size NumPy chunks instead of Python lists."""
+
+    def __init__(self, chunk_rows: int = 1 << 16) -> None:
+        self.chunk_rows = chunk_rows
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._new_chunk()
+
+    def _new_chunk(self) -> None:
+        self._values = np.zeros((self.chunk_rows, 16), dtype=np.int64)
+        self._actions = np.zeros(self.chunk_rows, dtype=np.int8)
+        self._rewards = np.zeros(self.chunk_rows, dtype=np.int32)
+        self._filled = 0
+
+    def append(self, grid: Sequence[Sequence[int]], action: int, reward: int) -> None:
+        row = self._filled
+        self._values[row] = [value for line in grid for value in line]
+        self._actions[row] = action
+        self._rewards[row] = reward
+        self._filled += 1
+        if self._filled == self.chunk_rows:
+            self._seal()
+
+    def _seal(self) -> None:
+        if not self._filled:
+            return
+        values = self._values[: self._filled]
+        exponents = np.zeros(values.shape, dtype=np.uint8)
+        occupied = values > 0
+        exponents[occupied] = np.log2(values[occupied]).astype(np.uint8)
+        self._chunks.append((exponents, self._actions[: self._filled].copy(), self._rewards[: self._filled].copy()))
+        self._new_chunk()
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(exponents (N, 16) uint8, actions (N,) int8, rewards (N,) int32)``."""
+
+        self._seal()
+        if not self._chunks:
+            return empty_move_arrays()
+        return tuple(np.concatenate(parts) for parts in zip(*self._chunks))  # type: ignore[return-value]
+
+
+def empty_move_arrays() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return np.zeros((0, 16), dtype=np.uint8), np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int32)
+
+
+def parse_log_file(path: str) -> Tuple[str, Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]], Optional[str]]:
+    """Extract valid moves from one log file; errors are returned, not raised."""
+
+    moves = ChunkedMoves()
+    try:
+        for event in iter_log_events(path):
+            if event.get("type") != "move" or not event.get("valid"):
+                continue
+            moves.append(
+                event["prev"]["grid"],
+                DIRECTION_MAP[event["direction"]],
+                event["next"]["score"] - event["prev"]["score"],
+            )
+    except Exception as exc:  # keep going with the other files, like the original loader
+        return path, None, str(exc)
+    return path, moves.arrays(), None
+
+
+def load_move_arrays(
+    paths: Sequence[str], processes: Optional[int] = None, verbose: bool = True
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Parse ``paths`` in parallel and concatenate their move arrays."""
+
+    parts = []
+    if processes == 1 or len(paths) <= 1:
+        parsed = map(parse_log_file, paths)
+        parts = _collect(parsed, verbose)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            parts = _collect(pool.imap(parse_log_file, paths), verbose)
+
+    if not parts:
+        return empty_move_arrays()
+    return tuple(np.concatenate(column) for column in zip(*parts))  # type: ignore[return-value]
+
+
+def _collect(parsed, verbose: bool) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    parts = []
+    for path, arrays, error in parsed:
+        if error is not None:
+            if verbose:
+                print(f"  - Error reading {path}: {error}")
+            continue
+        assert arrays is not None
+        if verbose:
+            print(f"  - Loaded {len(arrays[1])} moves from {path}")
+        parts.append(arrays)
+    return parts
+
+
+__all__ = [
+    "ChunkedMoves",
+    "DIRECTION_MAP",
+    "empty_move_arrays",
+    "iter_log_events",
+    "load_move_arrays",
+    "parse_log_file",
+]
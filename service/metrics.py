@@ -0,0 +1,150 @@
+"""Request counters, latency histograms and a Prometheus text exporter.
+
+``MetricsRegistry`` keeps labelled counters and histograms behind one lock and
+renders them in the Prometheus text exposition format (version 0.0.4), so
+``/metrics`` works without ``prometheus_client``. Values that other objects
+already track (cache hits, batch sizes, model load time) are registered as
+callbacks and read at scrape time. ``stage`` times a block into the
+``<prefix>_stage_seconds`` histogram.
+"""
+
+import bisect
+import contextlib
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; fine-grained at the low end, where most predict stages fall.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * (buckets + 1)  # the last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, histograms and scrape-time callbacks."""
+
+    def __init__(self, prefix: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._help: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collected: Dict[str, Tuple[str, Callable[[], Optional[float]]]] = {}
+
+    def _name(self, name: str) -> str:
+        return f"{self.prefix}_{name}"
+
+    def inc(self, name: str, help_text: str, amount: float = 1.0, **labels: str) -> None:
+        full = self._name(name)
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(full, help_text)
+            series = self._counters.setdefault(full, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, help_text: str, value: float, **labels: str) -> None:
+        full = self._name(name)
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._help.setdefault(full, help_text)
+            series = self._histograms.setdefault(full, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            histogram.counts[slot] += 1
+            histogram.total += value
+            histogram.count += 1
+
+    def collect(
+        self, name: str, help_text: str, read: Callable[[], Optional[float]], kind: str = "gauge"
+    ) -> None:
+        """Register ``read`` to be called at scrape time; ``None`` skips the sample.
+
+        ``kind`` is the Prometheus type, ``"counter"`` for totals kept elsewhere.
+        """
+
+        full = self._name(name)
+        with self._lock:
+            self._help[full] = help_text
+            self._collected[full] = (kind, read)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", "Time spent per request stage.", time.perf_counter() - started, stage=name)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(self._name(name), {}).get(_label_key(labels), 0.0)
+
+    def render(self) -> str:
+        """The Prometheus text exposition of every metric."""
+
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.total, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            collected = dict(self._collected)
+            help_texts = dict(self._help)
+
+        lines: List[str] = []
+        for name in sorted(counters):
+            lines += [f"# HELP {name} {help_texts[name]}", f"# TYPE {name} counter"]
+            for key, value in sorted(counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name in sorted(histograms):
+            lines += [f"# HELP {name} {help_texts[name]}", f"# TYPE {name} histogram"]
+            for key, (counts, total, count) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        for name in sorted(collected):
+            kind, read = collected[name]
+            value = read()
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help_texts[name]}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+__all__ = ["DEFAULT_BUCKETS", "MetricsRegistry"]
@@ -0,0 +1,131 @@
+"""Dynamic micro-batching of single-board inference requests.
+
+Concurrent ``/predict`` requests each hand their feature row to a shared
+:class:`MicroBatcher`. A background thread collects rows until either
+``max_batch_size`` rows are queued or the oldest row has waited ``max_delay``
+seconds, runs one batched ``predict_proba`` call and fans the probability rows
+back out to the waiting requests.
+
+Each row is submitted with the model it was featurized for, and rows are only
+batched with rows for the same model. A hot reload between submit and flush
+therefore never scores a row with a model of a different feature width or
+version than the caller saw.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_Item = Tuple[np.ndarray, Any, float, "Future[np.ndarray]"]
+
+
+class MicroBatcher:
+    """Queue feature rows and score them in batches on a worker thread."""
+
+    def __init__(
+        self,
+        predict_batch: Callable[[Any, np.ndarray], np.ndarray],
+        max_batch_size: int = 64,
+        max_delay: float = 0.002,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[_Item]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, features: np.ndarray, model: Any, timeout: Optional[float] = None) -> np.ndarray:
+        """Block until ``features`` has been scored by ``predict_batch(model, rows)``.
+
+        Raises ``concurrent.futures.TimeoutError`` after ``timeout`` seconds; the
+        row is then dropped from its batch if it has not been scored yet.
+        """
+
+        future: "Future[np.ndarray]" = Future()
+        self._queue.put((features, model, time.monotonic(), future))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            batches, items, largest = self._batches, self._items, self._largest_batch
+        return {
+            "batches": batches,
+            "items": items,
+            "largest_batch": largest,
+            "mean_batch_size": items / batches if batches else 0.0,
+        }
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch: List[_Item] = [first]
+            deadline = first[2] + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stopping:
+                return
+
+    def _flush(self, batch: List[_Item]) -> None:
+        # Normally one group; a reload inside the window splits the batch by model.
+        groups: Dict[int, List[_Item]] = {}
+        for item in batch:
+            groups.setdefault(id(item[1]), []).append(item)
+        for items in groups.values():
+            self._flush_group(items[0][1], items)
+
+    def _flush_group(self, model: Any, batch: List[_Item]) -> None:
+        # Callers that timed out have cancelled their futures; don't score their rows.
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            probabilities = np.asarray(self._predict_batch(model, np.stack([item[0] for item in batch])))
+        except BaseException as exc:  # surface model failures to every waiting request
+            for _, _, _, future in batch:
+                future.set_exception(exc)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+        for (_, _, _, future), row in zip(batch, probabilities):
+            future.set_result(row)
+
+
+__all__ = ["MicroBatcher"]
@@ -0,0 +1,152 @@
+"""Atomic, hot-swappable holder for the model served by model_server.
+
+The registry loads the model lazily on first use. ``reload`` reads a new model
+on a background thread and only then swaps it in with a single reference
+assignment, so requests in flight keep the model they started with and never
+wait on a load. ``start_watching`` polls the model path and reloads whenever
+its modification time changes.
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from forest_engine import load_forest
+
+logger = logging.getLogger(__name__)
+
+
+def read_model(path: str) -> Any:
+    """Load a pickled model, or a compact forest exported by forest_engine.py."""
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model file not found at {path}")
+    if os.path.isdir(path) or path.endswith(".npz"):
+        # Model directories are memory-mapped.
+        return load_forest(path)
+    with open(path, "rb") as fh:
+        return pickle.load(fh)
+
+
+def model_version(path: str, mtime_ns: Optional[int] = None) -> str:
+    """Describe the artifact at ``path`` by file name and modification time in nanoseconds.
+
+    Whole seconds would give a model replaced within the same second the old
+    version, and the prediction cache would keep serving its probabilities.
+    """
+
+    if mtime_ns is None:
+        mtime_ns = _mtime_ns(path)
+    return f"{os.path.basename(os.path.normpath(path))}@{mtime_ns}"
+
+
+def _mtime_ns(path: str) -> int:
+    # Model directories are rewritten manifest-last, so the manifest marks a new version.
+    manifest = os.path.join(path, "manifest.json")
+    return os.stat(manifest if os.path.isdir(path) else path).st_mtime_ns
+
+
+class ModelRegistry:
+    """Hold the active model and its version, swapping both atomically."""
+
+    def __init__(self, path: str, loader: Callable[[str], Any]) -> None:
+        self.path = path
+        self._loader = loader
+        self._active: Optional[Tuple[Any, str, int]] = None
+        self._load_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        self.last_error: Optional[str] = None
+        self.last_load_seconds: Optional[float] = None
+
+    def get(self) -> Any:
+        return self.snapshot()[0]
+
+    def snapshot(self) -> Tuple[Any, str]:
+        """The active model and its version, read together.
+
+        Reading ``get()`` and ``version`` separately can straddle a reload and
+        pair a model with the other model's version.
+        """
+
+        active = self._active
+        if active is None:
+            with self._load_lock:
+                if self._active is None:
+                    self._swap(self.path)
+                active = self._active
+        assert active is not None
+        return active[0], active[1]
+
+    @property
+    def version(self) -> Optional[str]:
+        active = self._active
+        return active[1] if active else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "loaded": self._active is not None,
+            "last_error": self.last_error,
+            "last_load_seconds": self.last_load_seconds,
+        }
+
+    def reload(self, path: Optional[str] = None, background: bool = True) -> None:
+        """Load ``path`` (default: the current path) and swap it in when ready."""
+
+        target = os.path.abspath(path) if path else self.path
+        if not background:
+            self._reload(target)
+            return
+        threading.Thread(target=self._reload, args=(target,), name="model-reload", daemon=True).start()
+
+    def start_watching(self, interval: float) -> None:
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="model-watch", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _reload(self, path: str) -> None:
+        with self._load_lock:
+            try:
+                self._swap(path)
+            except Exception as exc:  # keep serving the previous model
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                logger.exception("Model reload from %s failed", path)
+
+    def _swap(self, path: str) -> None:
+        started = time.perf_counter()
+        # Stat before loading, so a file replaced mid-load is seen as changed by the watcher.
+        mtime_ns = _mtime_ns(path) if os.path.exists(path) else 0
+        model = self._loader(path)
+        self.last_load_seconds = time.perf_counter() - started
+        self._active = (model, model_version(path, mtime_ns), mtime_ns)
+        self.path = path
+        self.last_error = None
+        logger.info("Loaded model %s in %.3fs", self.version, self.last_load_seconds)
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop_watching.wait(interval):
+            active = self._active
+            try:
+                changed = active is not None and _mtime_ns(self.path) != active[2]
+            except OSError:
+                continue  # the file is being replaced; check again next tick
+            if changed:
+                self._reload(self.path)
+
+
+__all__ = ["ModelRegistry", "model_version", "read_model"]
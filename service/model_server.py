@@ -1,105 +1,537 @@
+import hashlib
+import hmac
 import os
-import pickle
-from typing import Dict, List, Tuple
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, has_request_context, jsonify, request
 from flask_cors import CORS
 
-from board_rules import DIRECTION_NAMES, simulate_move, valid_moves
+from board_rules import analyze_board, pack_board, valid_moves_exponents
+from features import exponent_features, preprocess_board, preprocess_boards, uses_extra_features
+from metrics import MetricsRegistry
+from micro_batcher import MicroBatcher
+from model_registry import ModelRegistry, read_model
+from prediction import build_prediction, build_predictions, run_search, successors
+from prediction_cache import PredictionCache
+from replay_store import FLAG_PREDICTED_INVALID, FLAG_TRACE, SOURCE_TRACE, ReplayWriter, make_records, new_game_id
+from sampling_profiler import SamplingProfiler
+from server_config import allowed_origins, resolve_model_path
+from sessions import GameSession, SessionStore, SpawnMismatch
+from wire import (
+    BINARY_REQUEST_TYPES,
+    PREDICTION_MEDIA_TYPE,
+    cache_keys,
+    decode_boards,
+    encode_predictions,
+)
 
-NAME_TO_INDEX = {name: idx for idx, name in enumerate(DIRECTION_NAMES)}
 
+MODEL_PATH = resolve_model_path()
+# Micro-batching is off unless a batching window is configured.
+BATCH_WINDOW_MS = float(os.environ.get("RF_BATCH_WINDOW_MS", "0"))
+BATCH_MAX_SIZE = int(os.environ.get("RF_BATCH_MAX_SIZE", "64"))
+# How long a request waits for its micro-batch before answering 503 (0 waits forever).
+BATCH_TIMEOUT_MS = float(os.environ.get("RF_BATCH_TIMEOUT_MS", "1000"))
+# Prediction caching is off unless a cache size is configured.
+CACHE_SIZE = int(os.environ.get("RF_PREDICTION_CACHE_SIZE", "0"))
+CACHE_FOLD_SYMMETRY = bool(os.environ.get("RF_PREDICTION_CACHE_SYMMETRY"))
+SESSION_MAX = int(os.environ.get("RF_SESSION_MAX", "10000"))
+SESSION_TTL_SECONDS = float(os.environ.get("RF_SESSION_TTL_SECONDS", "1800"))
+# Prediction tracing is off unless a replay store path is configured.
+REPLAY_TRACE_PATH = os.environ.get("RF_REPLAY_TRACE_PATH")
 
-def resolve_model_path() -> str:
-    env_path = os.environ.get("RF_MODEL_PATH")
-    if env_path:
-        return os.path.abspath(env_path)
+app = Flask(__name__)
+origins = allowed_origins()
+CORS(app, resources={r"/predict": {"origins": origins}, r"/session": {"origins": origins}})
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
 
-    here = os.path.dirname(__file__)
-    candidates = [
-        os.path.abspath(os.path.join(here, "..", "random_forest_2048.pkl")),
-        os.path.abspath(os.path.join(here, "random_forest_2048.pkl")),
-    ]
 
-    for path in candidates:
-        if os.path.exists(path):
-            return path
+registry = ModelRegistry(MODEL_PATH, read_model)
+# A WSGI wrapper can serve this app from another registry by setting this environ key (see benchmarks.py).
+REGISTRY_ENVIRON_KEY = "rf.model_registry"
+# Admin routes that change server state are disabled unless a token is configured.
+ADMIN_TOKEN = os.environ.get("RF_ADMIN_TOKEN")
+# /admin/reload only loads models from under this directory.
+MODEL_DIR = os.path.realpath(os.environ.get("RF_MODEL_DIR") or os.path.dirname(MODEL_PATH))
+prediction_cache = PredictionCache(CACHE_SIZE, CACHE_FOLD_SYMMETRY) if CACHE_SIZE > 0 else None
+sessions = SessionStore(SESSION_MAX, SESSION_TTL_SECONDS)
+metrics = MetricsRegistry("rf")
+profiler = SamplingProfiler()
+# Shorter sampling intervals would keep the profiler thread spinning.
+PROFILER_MIN_INTERVAL_MS = 1
+PROFILER_MAX_INTERVAL_MS = 1000
+trace_writer = ReplayWriter(REPLAY_TRACE_PATH) if REPLAY_TRACE_PATH else None
 
-    # Fall back to first candidate so we still raise a helpful error later
-    return candidates[0]
 
+def record_predictions(total: int, invalid: int) -> None:
+    metrics.inc("predictions_total", "Boards scored by the model.", total)
+    metrics.inc("predicted_invalid_total", "Boards whose most probable move was not legal.", invalid)
 
-MODEL_PATH = resolve_model_path()
 
-app = Flask(__name__)
-allowed_origins = os.environ.get("RF_ALLOWED_ORIGINS", "*")
-CORS(app, resources={r"/predict": {"origins": allowed_origins}})
-_model = None
+def trace_predictions(
+    grids: List[List[List[int]]], predictions: List[Dict], session: Optional[GameSession] = None
+) -> None:
+    """Append served moves to the replay trace; sessions keep their game id and move index.
+
+    Rewards and scores are unknown when a move is served, so both are stored as
+    0 and the records are flagged ``FLAG_TRACE``. A move outside a session is
+    its own one-move game.
+    """
+
+    if trace_writer is None:
+        return
+    boards, moves, flags = [], [], []
+    for grid, prediction in zip(grids, predictions):
+        board = pack_board(grid)
+        if board is not None:
+            boards.append(board)
+            moves.append(prediction["move_index"])
+            flags.append(FLAG_TRACE | (FLAG_PREDICTED_INVALID if prediction["predicted_invalid"] else 0))
+    if not boards:
+        return
+    zeros = [0] * len(boards)
+    if session is not None:
+        game_id = int.from_bytes(hashlib.sha1(session.session_id.encode()).digest()[:8], "little") >> 1
+        records = make_records(boards, moves, zeros, zeros, game_id, SOURCE_TRACE, flags, first_move=session.moves)
+    else:
+        records = make_records(boards, moves, zeros, zeros, 0, SOURCE_TRACE, flags)
+        records["game_id"] = [new_game_id() for _ in boards]
+        records["move_index"] = 0
+    trace_writer.append(records)
+
+
+def _batcher_stat(key: str):
+    return lambda: _batcher.stats()[key] if _batcher is not None else None
+
+
+def _cache_stat(key: str):
+    return lambda: prediction_cache.stats()[key] if prediction_cache is not None else None
+
+
+metrics.collect("model_load_seconds", "Duration of the last model load.", lambda: registry.last_load_seconds)
+metrics.collect("model_loaded", "Whether a model is loaded.", lambda: float(registry.version is not None))
+metrics.collect("cache_hits_total", "Prediction cache hits.", _cache_stat("hits"), kind="counter")
+metrics.collect("cache_misses_total", "Prediction cache misses.", _cache_stat("misses"), kind="counter")
+metrics.collect("cache_entries", "Boards held in the prediction cache.", _cache_stat("entries"))
+metrics.collect("batches_total", "Micro-batches sent to predict_proba.", _batcher_stat("batches"), kind="counter")
+metrics.collect("batched_items_total", "Boards scored through micro-batches.", _batcher_stat("items"), kind="counter")
+metrics.collect("batch_size_mean", "Mean micro-batch size.", _batcher_stat("mean_batch_size"))
+metrics.collect("sessions_active", "Live game sessions.", lambda: sessions.stats()["active"])
+metrics.collect("profiler_running", "Whether the sampling profiler is on.", lambda: float(profiler.running))
+
+
+@app.errorhandler(FutureTimeout)
+def _batch_timeout(exc):
+    return jsonify({"error": "Prediction timed out; retry later"}), 503
+
+
+@app.before_request
+def _start_timer() -> None:
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _count_request(response):
+    endpoint = request.endpoint or "unmatched"
+    metrics.inc("requests_total", "HTTP requests served.", endpoint=endpoint, status=str(response.status_code))
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe(
+            "request_seconds", "End-to-end request latency.", time.perf_counter() - started, endpoint=endpoint
+        )
+    return response
+
+
+def active_registry() -> ModelRegistry:
+    """The registry serving this request: ``registry`` unless a WSGI wrapper set ``REGISTRY_ENVIRON_KEY``."""
+
+    if has_request_context():
+        return request.environ.get(REGISTRY_ENVIRON_KEY, registry)
+    return registry
 
 
 def load_model():
-    global _model
-    if _model is None:
-        if not os.path.exists(MODEL_PATH):
-            raise FileNotFoundError(f"Model file not found at {MODEL_PATH}")
-        with open(MODEL_PATH, "rb") as fh:
-            _model = pickle.load(fh)
-    return _model
+    return active_registry().get()
+
+
+def load_model_snapshot() -> Tuple[Any, Optional[str]]:
+    """The active model and its version, read together so a reload cannot split them."""
+
+    return active_registry().snapshot()
+
 
+def get_batcher() -> Optional[MicroBatcher]:
+    global _batcher
+    if BATCH_WINDOW_MS <= 0:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    lambda model, features: model.predict_proba(features),
+                    max_batch_size=BATCH_MAX_SIZE,
+                    max_delay=BATCH_WINDOW_MS / 1000.0,
+                )
+    return _batcher
 
-def preprocess_board(grid: List[List[int]]) -> np.ndarray:
-    board = np.array(grid, dtype=np.int64)
-    if board.shape != (4, 4):
-        raise ValueError(f"Expected 4x4 grid, received shape {board.shape}")
-    board[board == 0] = 1
-    normalized = np.log2(board) / 16.0
-    return normalized.flatten().astype(np.float32)
+
+def predict_probabilities(features: np.ndarray, model: Any) -> np.ndarray:
+    batcher = get_batcher()
+    if batcher is None:
+        return model.predict_proba([features])[0]
+    return batcher.submit(features, model, timeout=BATCH_TIMEOUT_MS / 1000.0 if BATCH_TIMEOUT_MS > 0 else None)
+
+
+def cached_probabilities(
+    grid: List[List[int]], features: np.ndarray, model: Any, version: Optional[str]
+) -> np.ndarray:
+    packed = pack_board(grid) if prediction_cache is not None else None
+    if packed is None:
+        return predict_probabilities(features, model)
+
+    cached = prediction_cache.get(packed, version)
+    if cached is not None:
+        return cached
+    probabilities = predict_probabilities(features, model)
+    prediction_cache.put(packed, probabilities, version)
+    return probabilities
+
+
+def cached_batch_probabilities(
+    grids: List[List[List[int]]], features: np.ndarray, model: Any, version: Optional[str]
+) -> np.ndarray:
+    if prediction_cache is None:
+        return np.asarray(model.predict_proba(features))
+    return cached_packed_probabilities([pack_board(grid) for grid in grids], features, model, version)
+
+
+def cached_packed_probabilities(
+    packed: List[Optional[int]], features: np.ndarray, model: Any, version: Optional[str]
+) -> np.ndarray:
+    if prediction_cache is None:
+        return np.asarray(model.predict_proba(features))
+
+    results: List[Optional[np.ndarray]] = [None] * len(packed)
+    missing = []
+    for idx, board in enumerate(packed):
+        if board is not None:
+            results[idx] = prediction_cache.get(board, version)
+        if results[idx] is None:
+            missing.append(idx)
+
+    if missing:
+        computed = np.asarray(model.predict_proba(features[missing]))
+        for idx, row in zip(missing, computed):
+            results[idx] = row
+            if packed[idx] is not None:
+                prediction_cache.put(packed[idx], row, version)
+    return np.array(results)
+
+
+def predict_grid(
+    grid: List[List[int]], search_options, include_next_grid: bool, include_successors: bool = False
+) -> Dict:
+    """Build the /predict response for one grid; ``ValueError`` carries the client-facing error."""
+
+    with metrics.stage("load_model"):
+        model, version = load_model_snapshot()
+    try:
+        with metrics.stage("preprocess"):
+            features = preprocess_board(grid, extra=uses_extra_features(model))
+    except Exception as exc:  # pragma: no cover - defensive for malformed payloads
+        raise ValueError(str(exc)) from exc
+
+    with metrics.stage("predict_proba"):
+        probabilities = cached_probabilities(grid, features, model, version)
+    with metrics.stage("valid_moves"):
+        # All four moves at once: the mask, fallback and next_grid share this pass.
+        analysis = analyze_board(grid)
+
+    search_move = None
+    search_stats = None
+    if search_options:
+        try:
+            with metrics.stage("search"):
+                search_move, search_stats = run_search(grid, probabilities, search_options)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"Invalid search options: {exc}") from exc
+
+    response = build_prediction(grid, probabilities, analysis.valid_moves, False, search_move, analysis)
+    record_predictions(1, int(response["predicted_invalid"]))
+    if include_next_grid or include_successors:
+        with metrics.stage("simulate_move"):
+            if include_next_grid:
+                response["next_grid"] = analysis.successor(response["move"]).tolist()
+            if include_successors:
+                response["successors"] = successors(analysis)
+    if search_stats is not None:
+        response["search"] = search_stats
+    response["model_version"] = version
+    return response
+
+
+def predict_binary():
+    """Score a binary batch of boards (see ``wire.py``) and answer in kind."""
+
+    # Without an Accept header the binary response is the default.
+    if request.accept_mimetypes and not request.accept_mimetypes[PREDICTION_MEDIA_TYPE]:
+        return jsonify({"error": f"Binary requests are answered with {PREDICTION_MEDIA_TYPE}"}), 406
+    try:
+        with metrics.stage("parse"):
+            exponents = decode_boards(request.get_data(cache=False), request.mimetype)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    with metrics.stage("load_model"):
+        model, version = load_model_snapshot()
+    with metrics.stage("preprocess"):
+        features = exponent_features(exponents, extra=uses_extra_features(model))
+    with metrics.stage("predict_proba"):
+        if len(exponents) == 1 and prediction_cache is None:
+            # Single boards go through the micro-batcher like JSON /predict requests.
+            probabilities = np.asarray(predict_probabilities(features[0], model))[None]
+        else:
+            probabilities = cached_packed_probabilities(cache_keys(exponents), features, model, version)
+    with metrics.stage("valid_moves"):
+        valid = valid_moves_exponents(exponents.reshape(-1, 4, 4))
+    record_predictions(len(valid), int((~valid[np.arange(len(valid)), probabilities.argmax(axis=1)]).sum()))
+    with metrics.stage("serialize"):
+        body = encode_predictions(probabilities, valid)
+    return Response(body, mimetype=PREDICTION_MEDIA_TYPE, headers={"X-Model-Version": version or ""})
 
 
 @app.post("/predict")
 def predict():
-    payload: Dict = request.get_json(force=True, silent=False) or {}
+    if request.mimetype in BINARY_REQUEST_TYPES:
+        return predict_binary()
+    with metrics.stage("parse"):
+        payload: Dict = request.get_json(force=True, silent=False) or {}
     grid = payload.get("grid")
     if grid is None:
         return jsonify({"error": "Payload must include 'grid' key"}), 400
 
     try:
-        features = preprocess_board(grid)
+        response = predict_grid(
+            grid,
+            payload.get("search"),
+            payload.get("include_next_grid", False),
+            payload.get("include_successors", False),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    trace_predictions([grid], [response])
+    with metrics.stage("serialize"):
+        return jsonify(response)
+
+
+@app.post("/predict_batch")
+def predict_batch():
+    if request.mimetype in BINARY_REQUEST_TYPES:
+        return predict_binary()
+    with metrics.stage("parse"):
+        payload: Dict = request.get_json(force=True, silent=False) or {}
+    grids = payload.get("grids")
+    if not isinstance(grids, list) or not grids:
+        return jsonify({"error": "Payload must include a non-empty 'grids' list"}), 400
+
+    with metrics.stage("load_model"):
+        model, version = load_model_snapshot()
+    try:
+        with metrics.stage("preprocess"):
+            features = preprocess_boards(grids, extra=uses_extra_features(model))
     except Exception as exc:  # pragma: no cover - defensive for malformed payloads
         return jsonify({"error": str(exc)}), 400
 
-    model = load_model()
-    probabilities = model.predict_proba([features])[0]
-    predicted_idx = int(np.argmax(probabilities))
-    predicted_move = DIRECTION_NAMES[predicted_idx]
-
-    allowed = valid_moves(grid)
-    invalid_prediction = predicted_move not in allowed
-
-    if invalid_prediction and allowed:
-        allowed_indices = [NAME_TO_INDEX[name] for name in allowed]
-        best_idx = max(allowed_indices, key=lambda i: probabilities[i])
-        predicted_idx = int(best_idx)
-        predicted_move = DIRECTION_NAMES[predicted_idx]
-
-    response = {
-        "move": predicted_move,
-        "move_index": predicted_idx,
-        "predicted_invalid": invalid_prediction,
-        "valid_moves": allowed,
-        "probabilities": {
-            DIRECTION_NAMES[i]: float(probabilities[i]) for i in range(len(DIRECTION_NAMES))
-        },
-    }
-
-    if payload.get("include_next_grid", False):
-        next_grid, _ = simulate_move(grid, predicted_move)
-        response["next_grid"] = next_grid.tolist()
+    with metrics.stage("predict_proba"):
+        probabilities = cached_batch_probabilities(grids, features, model, version)
+    # Includes the valid-move pass, and successor boards when they are requested.
+    with metrics.stage("build_predictions"):
+        predictions = build_predictions(
+            grids,
+            probabilities,
+            payload.get("include_next_grid", False),
+            payload.get("include_successors", False),
+        )
+    record_predictions(len(predictions), sum(p["predicted_invalid"] for p in predictions))
+    trace_predictions(grids, predictions)
+    with metrics.stage("serialize"):
+        return jsonify({"predictions": predictions, "model_version": version})
+
+
+def session_step(session: GameSession, grid: List[List[int]], payload: Dict) -> Dict:
+    """Predict for ``grid`` and remember the board the returned move leads to."""
 
+    response = predict_grid(grid, payload.get("search"), include_next_grid=True)
+    trace_predictions([grid], [response], session)
+    session.board = response["next_grid"]
+    session.moves += 1
+    if not payload.get("include_next_grid", False):
+        del response["next_grid"]
+    response["session_id"] = session.session_id
+    return response
+
+
+@app.post("/session")
+def session_start():
+    payload: Dict = request.get_json(force=True, silent=False) or {}
+    grid = payload.get("grid")
+    if grid is None:
+        return jsonify({"error": "Payload must include 'grid' key"}), 400
+
+    session = sessions.create(grid)
+    try:
+        with session.lock:
+            response = session_step(session, grid, payload)
+    except ValueError as exc:
+        sessions.remove(session.session_id)
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(response), 201
+
+
+@app.post("/session/<session_id>/step")
+def session_continue(session_id: str):
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session; start a new one with the full grid"}), 404
+
+    payload: Dict = request.get_json(force=True, silent=False) or {}
+    with session.lock:
+        if payload.get("grid") is not None:
+            # Resynchronise, e.g. after the client played a different move.
+            grid = payload["grid"]
+        else:
+            try:
+                grid = session.apply_spawn(payload.get("spawn"))
+            except SpawnMismatch as exc:
+                return jsonify({"error": f"{exc}; resend the full grid"}), 409
+        try:
+            response = session_step(session, grid, payload)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
     return jsonify(response)
 
 
+@app.delete("/session/<session_id>")
+def session_end(session_id: str):
+    if not sessions.remove(session_id):
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return "", 204
+
+
+def admin_denied():
+    """A 403 response unless the request carries the configured admin token."""
+
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Invalid admin token"}), 403
+    return None
+
+
+def resolve_reload_path(path: str) -> Optional[str]:
+    """``path`` resolved against ``MODEL_DIR``, or ``None`` if it points outside it."""
+
+    resolved = os.path.realpath(os.path.join(MODEL_DIR, path))
+    if os.path.commonpath([resolved, MODEL_DIR]) != MODEL_DIR:
+        return None
+    return resolved
+
+
+@app.post("/admin/reload")
+def admin_reload():
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+
+    payload: Dict = request.get_json(silent=True) or {}
+    path = payload.get("path")
+    if path:
+        if not isinstance(path, str):
+            return jsonify({"error": "'path' must be a string"}), 400
+        resolved = resolve_reload_path(path)
+        if resolved is None:
+            return jsonify({"error": f"Model path must be inside {MODEL_DIR}"}), 400
+        if not os.path.exists(resolved):
+            return jsonify({"error": f"Model file not found at {path}"}), 400
+        path = resolved
+
+    # The new model loads in the background; /predict keeps serving the old one until the swap.
+    registry.reload(path)
+    return jsonify({"status": "reloading", **registry.status()}), 202
+
+
+@app.get("/admin/model")
+def admin_model():
+    return jsonify(registry.status())
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.get("/admin/profiler")
+def admin_profiler():
+    """Folded stacks sampled so far (flamegraph input), most frequent first."""
+
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+    limit = request.args.get("limit", type=int)
+    return Response(profiler.folded(limit), mimetype="text/plain")
+
+
+@app.post("/admin/profiler")
+def admin_profiler_toggle():
+    denied = admin_denied()
+    if denied is not None:
+        return denied
+
+    payload: Dict = request.get_json(silent=True) or {}
+    interval_ms = payload.get("interval_ms")
+    if interval_ms is not None:
+        try:
+            interval_ms = float(interval_ms)
+        except (TypeError, ValueError):
+            interval_ms = None
+        if interval_ms is None or not PROFILER_MIN_INTERVAL_MS <= interval_ms <= PROFILER_MAX_INTERVAL_MS:
+            return jsonify(
+                {"error": f"interval_ms must be between {PROFILER_MIN_INTERVAL_MS} and {PROFILER_MAX_INTERVAL_MS}"}
+            ), 400
+
+    if payload.get("reset"):
+        profiler.reset()
+    if payload.get("enabled") is True:
+        profiler.start(interval_ms / 1000.0 if interval_ms is not None else None)
+    elif payload.get("enabled") is False:
+        profiler.stop()
+    return jsonify(profiler.status())
+
+
+@app.get("/admin/sessions")
+def admin_sessions():
+    return jsonify(sessions.stats())
+
+
+@app.get("/admin/cache")
+def admin_cache():
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **prediction_cache.stats()})
+
+
+if os.environ.get("RF_EAGER_LOAD"):
+    # Warm the model at boot instead of on the first /predict request.
+    load_model()
+
+if float(os.environ.get("RF_MODEL_WATCH_SECONDS", "0")) > 0:
+    registry.start_watching(float(os.environ["RF_MODEL_WATCH_SECONDS"]))
+
+
 if __name__ == "__main__":
     # Use 0.0.0.0 so the web app can reach it from another process on the same machine.
     port = int(os.environ.get("PORT", 5050))
@@ -0,0 +1,157 @@
+"""Model-independent pieces of a ``/predict`` response.
+
+Shared by the Flask service (``model_server.py``) and the ASGI front end's
+inference workers (``asgi_server.py``): turning probabilities into the chosen
+move, listing valid moves for a batch of grids and running the optional
+expectimax search under the server's budget limits. Responses that need
+successor boards take them from one ``analyze_board`` pass instead of
+simulating the chosen move again.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, BoardAnalysis, analyze_board, pack_board, valid_moves, valid_moves_batch
+from search import ExpectimaxSearch
+
+NAME_TO_INDEX = {name: idx for idx, name in enumerate(DIRECTION_NAMES)}
+
+# Upper bounds applied to the per-request expectimax budget.
+SEARCH_DEFAULT_DEPTH = int(os.environ.get("RF_SEARCH_DEFAULT_DEPTH", "3"))
+SEARCH_MAX_DEPTH = int(os.environ.get("RF_SEARCH_MAX_DEPTH", "5"))
+SEARCH_MAX_TIME_MS = float(os.environ.get("RF_SEARCH_MAX_TIME_MS", "100"))
+SEARCH_MAX_NODES = int(os.environ.get("RF_SEARCH_MAX_NODES", "200000"))
+
+
+def _positive_limit(value, cap: float, name: str) -> float:
+    """``value`` clamped to ``cap``; zero, negative and non-finite values are rejected."""
+
+    value = float(value)
+    if not 0 < value < float("inf"):
+        raise ValueError(f"{name} must be a positive number")
+    return min(value, cap)
+
+
+def run_search(grid: List[List[int]], probabilities: np.ndarray, options) -> Tuple[Optional[str], Dict]:
+    """Pick a move by expectimax, clamping the requested budget to the server limits."""
+
+    options = options if isinstance(options, dict) else {}
+    packed = pack_board(grid)
+    if packed is None:
+        return None, {"error": "Board cannot be searched"}
+
+    engine = ExpectimaxSearch(
+        max_depth=max(1, min(int(options.get("depth", SEARCH_DEFAULT_DEPTH)), SEARCH_MAX_DEPTH)),
+        time_budget=_positive_limit(options.get("time_ms", SEARCH_MAX_TIME_MS), SEARCH_MAX_TIME_MS, "time_ms") / 1000.0,
+        node_budget=max(1, int(_positive_limit(options.get("nodes", SEARCH_MAX_NODES), SEARCH_MAX_NODES, "nodes"))),
+        prior_prune=float(options.get("prior_prune", 0.0)),
+    )
+    return engine.search(packed, prior=probabilities)
+
+
+def build_prediction(
+    grid: List[List[int]],
+    probabilities: np.ndarray,
+    allowed: List[str],
+    include_next_grid: bool,
+    chosen_move: Optional[str] = None,
+    analysis: Optional[BoardAnalysis] = None,
+    include_successors: bool = False,
+) -> Dict:
+    """The /predict response for one board.
+
+    ``analysis`` supplies successor boards; without it one is computed when
+    ``include_next_grid`` or ``include_successors`` asks for them.
+    """
+
+    predicted_idx = int(np.argmax(probabilities))
+    predicted_move = DIRECTION_NAMES[predicted_idx]
+
+    invalid_prediction = predicted_move not in allowed
+
+    if chosen_move is not None:
+        predicted_idx = NAME_TO_INDEX[chosen_move]
+        predicted_move = chosen_move
+    elif invalid_prediction and allowed:
+        allowed_indices = [NAME_TO_INDEX[name] for name in allowed]
+        best_idx = max(allowed_indices, key=lambda i: probabilities[i])
+        predicted_idx = int(best_idx)
+        predicted_move = DIRECTION_NAMES[predicted_idx]
+
+    response = {
+        "move": predicted_move,
+        "move_index": predicted_idx,
+        "predicted_invalid": invalid_prediction,
+        "valid_moves": allowed,
+        "probabilities": {
+            DIRECTION_NAMES[i]: float(probabilities[i]) for i in range(len(DIRECTION_NAMES))
+        },
+    }
+
+    if (include_next_grid or include_successors) and analysis is None:
+        analysis = analyze_board(grid)
+    if include_next_grid:
+        response["next_grid"] = analysis.successor(predicted_move).tolist()
+    if include_successors:
+        response["successors"] = successors(analysis)
+
+    return response
+
+
+def successors(analysis: BoardAnalysis) -> Dict[str, Dict]:
+    """Each legal move's resulting board (before the spawn) and merge reward."""
+
+    return {
+        name: {"grid": analysis.successor(name).tolist(), "reward": int(score)}
+        for name, changed, score in zip(DIRECTION_NAMES, analysis.changed, analysis.scores)
+        if changed
+    }
+
+
+def build_predictions(
+    grids: List[List[List[int]]],
+    probabilities: np.ndarray,
+    include_next_grid: bool,
+    include_successors: bool = False,
+) -> List[Dict]:
+    """``build_prediction`` for a batch, sharing one valid-move pass per board."""
+
+    if include_next_grid or include_successors:
+        predictions = []
+        for grid, probs in zip(grids, probabilities):
+            analysis = analyze_board(grid)
+            predictions.append(
+                build_prediction(
+                    grid, probs, analysis.valid_moves, include_next_grid, None, analysis, include_successors
+                )
+            )
+        return predictions
+    return [
+        build_prediction(grid, probs, allowed, False)
+        for grid, probs, allowed in zip(grids, probabilities, batch_valid_moves(grids))
+    ]
+
+
+def batch_valid_moves(grids: List[List[List[int]]]) -> List[List[str]]:
+    try:
+        mask = valid_moves_batch(np.array(grids, dtype=np.int64))
+    except ValueError:
+        # Tiles beyond the packed engine's range take the per-board path.
+        return [valid_moves(grid) for grid in grids]
+    return [[name for name, ok in zip(DIRECTION_NAMES, row) if ok] for row in mask]
+
+
+__all__ = [
+    "NAME_TO_INDEX",
+    "SEARCH_DEFAULT_DEPTH",
+    "SEARCH_MAX_DEPTH",
+    "SEARCH_MAX_NODES",
+    "SEARCH_MAX_TIME_MS",
+    "batch_valid_moves",
+    "build_prediction",
+    "build_predictions",
+    "run_search",
+    "successors",
+]
@@ -0,0 +1,82 @@
+"""Size-bounded LRU cache of move probabilities keyed on packed boards.
+
+With ``fold_symmetry`` enabled every board is first mapped to its canonical
+form under the eight rotations/reflections of the square, so all symmetric
+positions share one entry. Probabilities are stored in canonical move order and
+permuted back to the caller's orientation on lookup. Folding assumes the model
+treats symmetric boards alike, which a RandomForest only approximates, so it is
+optional.
+
+Entries are keyed on the model version as well as the board, so a lookup never
+returns another version's probabilities. Entries of a retired version are not
+wiped; they stop being hit and age out of the LRU like any other entry, which
+keeps workers that briefly serve different versions from clearing each other's
+entries.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from board_rules import SYMMETRY_MOVES, canonical_board
+
+
+class PredictionCache:
+    """Thread-safe LRU mapping packed boards to probability vectors."""
+
+    def __init__(self, max_entries: int, fold_symmetry: bool = False) -> None:
+        self.max_entries = max_entries
+        self.fold_symmetry = fold_symmetry
+        self._entries: "OrderedDict[Tuple[Optional[str], int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, packed: int, version: Optional[str]) -> Tuple[Tuple[Optional[str], int], Tuple[int, ...]]:
+        if not self.fold_symmetry:
+            return (version, packed), SYMMETRY_MOVES[0]
+        canonical, symmetry = canonical_board(packed)
+        return (version, canonical), SYMMETRY_MOVES[symmetry]
+
+    def get(self, packed: int, version: Optional[str] = None) -> Optional[np.ndarray]:
+        key, moves = self._key(packed, version)
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # stored[moves[m]] is the canonical-board probability of our move m
+        return stored[list(moves)]
+
+    def put(self, packed: int, probabilities: np.ndarray, version: Optional[str] = None) -> None:
+        key, moves = self._key(packed, version)
+        stored = np.empty(len(moves), dtype=np.float64)
+        stored[list(moves)] = probabilities
+        with self._lock:
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "fold_symmetry": self.fold_symmetry,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+__all__ = ["PredictionCache"]
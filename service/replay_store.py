@@ -0,0 +1,399 @@
+"""Append-only binary store of moves with O(1) random access.
+
+A store is one file: a 32-byte header followed by fixed-size
+``RECORD_DTYPE`` records, one per move. Each record holds the packed board
+before the move (``board_rules.pack_board`` layout), the direction index, the
+score gained (reward), the score before the move, a 64-bit game id and the
+move's index in that game. Record ``i`` starts at ``HEADER_SIZE + i *
+RECORD_DTYPE.itemsize``, so the offset index is implicit: any move is one seek
+(or one memory-map lookup) away, and random minibatches over millions of moves
+are a fancy index into a ``np.memmap``.
+
+Writers open the file with ``O_APPEND`` and write whole batches of records in
+one ``os.write`` under an exclusive ``flock``. Several processes can therefore
+append to the same store at once (self-play workers, the model server's
+prediction trace) without interleaving partial records. Readers only count
+complete records, so a writer that dies mid-write never corrupts what has been
+read, and the next append first truncates the torn tail back to a record
+boundary. Game ids are random 63-bit numbers, so writers never need to
+coordinate.
+
+Moves traced by the model server carry ``FLAG_TRACE``: their outcome is
+unknown, so ``sample()`` and ``move_arrays()`` leave them out of training data.
+
+The converter turns browser logs (``exportGameLogs`` JSON) into records::
+
+    python service/replay_store.py convert training_data/*.json --output replay.bin
+    python service/replay_store.py info replay.bin
+"""
+
+import argparse
+import glob
+import hashlib
+import multiprocessing
+import os
+import secrets
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from board_rules import pack_board
+from features import packed_exponents
+from log_ingest import DIRECTION_MAP, iter_log_events
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; O_APPEND alone orders whole writes
+    fcntl = None
+
+MAGIC = b"RPLY2048"
+VERSION = 1
+HEADER_SIZE = 32
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("board", "<u8"),
+        ("game_id", "<u8"),
+        ("score", "<u4"),
+        ("reward", "<u4"),
+        ("move_index", "<u4"),
+        ("action", "u1"),
+        ("source", "u1"),
+        ("flags", "u1"),
+        ("reserved", "u1"),
+    ]
+)
+
+SOURCE_LOG = 0
+SOURCE_SELFPLAY = 1
+SOURCE_TRACE = 2
+SOURCE_NAMES = ("log", "selfplay", "trace")
+
+# The move did not change the board.
+FLAG_INVALID = 1
+# A move served by the model server; reward and score are not known.
+FLAG_TRACE = 2
+# A traced move where the model's argmax was illegal.
+FLAG_PREDICTED_INVALID = 4
+# Records with any of these flags are not training examples.
+_EXCLUDED_FLAGS = FLAG_INVALID | FLAG_TRACE
+
+
+def _header() -> bytes:
+    version = np.array([VERSION, RECORD_DTYPE.itemsize], dtype="<u4").tobytes()
+    return (MAGIC + version).ljust(HEADER_SIZE, b"\0")
+
+
+def _check_header(data: bytes, path: str) -> None:
+    if len(data) < HEADER_SIZE or data[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a replay store")
+    version, record_size = np.frombuffer(data[len(MAGIC) : len(MAGIC) + 8], dtype="<u4")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path}: unsupported replay store version {version} (record size {record_size})")
+
+
+def new_game_id() -> int:
+    return secrets.randbits(63)
+
+
+def make_records(
+    boards: Sequence[int],
+    actions: Sequence[int],
+    rewards: Sequence[int],
+    scores: Sequence[int],
+    game_id: int,
+    source: int,
+    flags: Optional[Sequence[int]] = None,
+    first_move: int = 0,
+) -> np.ndarray:
+    """Build the records of one game's moves."""
+
+    records = np.zeros(len(boards), dtype=RECORD_DTYPE)
+    records["board"] = np.asarray(boards, dtype=np.uint64)
+    records["action"] = actions
+    records["reward"] = rewards
+    records["score"] = scores
+    records["game_id"] = game_id
+    records["move_index"] = np.arange(first_move, first_move + len(boards))
+    records["source"] = source
+    if flags is not None:
+        records["flags"] = flags
+    return records
+
+
+class _FileLock:
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def __enter__(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+class ReplayWriter:
+    """Appends records to a store; safe to use from several processes at once."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        with _FileLock(self._fd):
+            if os.fstat(self._fd).st_size == 0:
+                os.write(self._fd, _header())
+        with open(path, "rb") as fh:
+            _check_header(fh.read(HEADER_SIZE), path)
+
+    def append(self, records: np.ndarray) -> None:
+        """Write ``records`` as one contiguous block."""
+
+        if records.dtype != RECORD_DTYPE:
+            raise TypeError(f"Expected {RECORD_DTYPE} records, received {records.dtype}")
+        data = memoryview(np.ascontiguousarray(records).tobytes())
+        with _FileLock(self._fd):
+            size = os.fstat(self._fd).st_size
+            torn = (size - HEADER_SIZE) % RECORD_DTYPE.itemsize
+            if torn:
+                # A writer died mid-record; drop the fragment so records stay aligned.
+                size -= torn
+                os.ftruncate(self._fd, size)
+            try:
+                while data:
+                    written = os.write(self._fd, data)
+                    if written <= 0:
+                        raise OSError(f"Short write to {self.path}")
+                    data = data[written:]
+            except BaseException:
+                os.ftruncate(self._fd, size)
+                raise
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "ReplayWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ReplayStore:
+    """Memory-mapped, read-only view of a store's complete records."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as fh:
+            _check_header(fh.read(HEADER_SIZE), path)
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._game_index: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._valid: Optional[np.ndarray] = None
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Pick up records appended since the last refresh; return the record count."""
+
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if count != len(self.records):
+            self.records = (
+                np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+                if count
+                else np.zeros(0, dtype=RECORD_DTYPE)
+            )
+            self._game_index = None
+            self._valid = None
+        return count
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None, valid_only: bool = True) -> np.ndarray:
+        """A uniform random minibatch of records (with replacement).
+
+        ``valid_only`` leaves out invalid moves and traced predictions.
+        """
+
+        rng = rng or np.random.default_rng()
+        if not valid_only:
+            return self.records[rng.integers(0, len(self.records), size=batch_size)]
+        if self._valid is None:
+            self._valid = np.flatnonzero((self.records["flags"] & _EXCLUDED_FLAGS) == 0)
+        return self.records[self._valid[rng.integers(0, len(self._valid), size=batch_size)]]
+
+    def _games(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._game_index is None:
+            # Concurrent writers interleave whole games, so group by id rather than position.
+            order = np.lexsort((self.records["move_index"], self.records["game_id"]))
+            ids, starts = np.unique(self.records["game_id"][order], return_index=True)
+            self._game_index = (ids, starts, order)
+        return self._game_index
+
+    def game_ids(self) -> np.ndarray:
+        return self._games()[0]
+
+    def game(self, game_id: int) -> np.ndarray:
+        """Every record of one game, in move order."""
+
+        ids, starts, order = self._games()
+        slot = int(np.searchsorted(ids, np.uint64(game_id)))
+        if slot == len(ids) or ids[slot] != game_id:
+            raise KeyError(game_id)
+        end = starts[slot + 1] if slot + 1 < len(ids) else len(order)
+        return self.records[order[starts[slot] : end]]
+
+    def move_arrays(self, valid_only: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(exponents, actions, rewards)`` in the layout of ``log_ingest.load_move_arrays``."""
+
+        records = self.records
+        if valid_only:
+            records = records[(records["flags"] & _EXCLUDED_FLAGS) == 0]
+        return (
+            packed_exponents(records["board"]),
+            records["action"].astype(np.int8),
+            records["reward"].astype(np.int32),
+        )
+
+    def stats(self) -> Dict[str, object]:
+        sources = np.bincount(self.records["source"], minlength=len(SOURCE_NAMES))
+        return {
+            "records": len(self.records),
+            "games": len(self.game_ids()),
+            "invalid": int(((self.records["flags"] & FLAG_INVALID) != 0).sum()),
+            "traced": int(((self.records["flags"] & FLAG_TRACE) != 0).sum()),
+            "by_source": {name: int(count) for name, count in zip(SOURCE_NAMES, sources)},
+        }
+
+
+def log_records(path: str) -> Tuple[str, Optional[np.ndarray], int, Optional[str]]:
+    """Records for every move event of a browser log file.
+
+    Returns ``(path, records, skipped, error)``. Each game in the file gets a
+    stable id derived from the file's absolute path, so converting the same
+    file twice gives the same ids. Boards the packed layout cannot hold are
+    skipped and counted.
+    """
+
+    salt = hashlib.sha1(os.path.abspath(path).encode("utf-8")).digest()
+    games: List[np.ndarray] = []
+    columns: Dict[str, List[int]] = {key: [] for key in ("board", "action", "reward", "score", "flags")}
+    skipped = 0
+    ordinal = 0
+
+    def finish_game() -> None:
+        nonlocal ordinal
+        if columns["board"]:
+            game_id = int.from_bytes(hashlib.sha1(salt + ordinal.to_bytes(4, "little")).digest()[:8], "little") >> 1
+            games.append(
+                make_records(
+                    columns["board"],
+                    columns["action"],
+                    columns["reward"],
+                    columns["score"],
+                    game_id,
+                    SOURCE_LOG,
+                    columns["flags"],
+                )
+            )
+        ordinal += 1
+        for values in columns.values():
+            values.clear()
+
+    try:
+        for event in iter_log_events(path):
+            if event.get("type") == "gameEnd":
+                finish_game()
+                continue
+            if event.get("type") != "move":
+                continue
+            board = pack_board(event["prev"]["grid"])
+            if board is None:
+                skipped += 1
+                continue
+            columns["board"].append(board)
+            columns["action"].append(DIRECTION_MAP[event["direction"]])
+            columns["reward"].append(event["next"]["score"] - event["prev"]["score"])
+            columns["score"].append(event["prev"]["score"])
+            columns["flags"].append(0 if event.get("valid") else FLAG_INVALID)
+        finish_game()
+    except Exception as exc:  # reported per file, like log_ingest.parse_log_file
+        return path, None, skipped, str(exc)
+    records = np.concatenate(games) if games else np.zeros(0, dtype=RECORD_DTYPE)
+    return path, records, skipped, None
+
+
+def convert_logs(
+    paths: Sequence[str], store_path: str, processes: Optional[int] = None, verbose: bool = True
+) -> int:
+    """Append the moves of browser log files to a store; return the records written."""
+
+    written = 0
+    with ReplayWriter(store_path) as writer:
+        if processes == 1 or len(paths) <= 1:
+            parsed: Iterable = map(log_records, paths)
+            written = _write_parsed(writer, parsed, verbose)
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                written = _write_parsed(writer, pool.imap(log_records, paths), verbose)
+    return written
+
+
+def _write_parsed(writer: ReplayWriter, parsed: Iterable, verbose: bool) -> int:
+    written = 0
+    for path, records, skipped, error in parsed:
+        if error is not None:
+            if verbose:
+                print(f"  - Error reading {path}: {error}")
+            continue
+        writer.append(records)
+        written += len(records)
+        if verbose:
+            note = f" ({skipped} unpackable boards skipped)" if skipped else ""
+            print(f"  - Stored {len(records)} moves from {path}{note}")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="append browser JSON logs to a store")
+    convert.add_argument("logs", nargs="+", help="log files or glob patterns")
+    convert.add_argument("--output", required=True)
+    convert.add_argument("--processes", type=int, default=None)
+    info = commands.add_parser("info", help="print record and game counts")
+    info.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        paths = sorted({path for pattern in args.logs for path in (glob.glob(pattern) or [pattern])})
+        written = convert_logs(paths, args.output, processes=args.processes)
+        print(f"Wrote {written} records to {args.output}")
+    else:
+        print(ReplayStore(args.store).stats())
+
+
+__all__ = [
+    "FLAG_INVALID",
+    "FLAG_PREDICTED_INVALID",
+    "FLAG_TRACE",
+    "HEADER_SIZE",
+    "RECORD_DTYPE",
+    "ReplayStore",
+    "ReplayWriter",
+    "SOURCE_LOG",
+    "SOURCE_SELFPLAY",
+    "SOURCE_TRACE",
+    "convert_logs",
+    "log_records",
+    "make_records",
+    "new_game_id",
+]
+
+
+if __name__ == "__main__":
+    main()
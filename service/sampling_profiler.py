@@ -0,0 +1,103 @@
+"""Low-overhead sampling profiler that can be switched on in a live server.
+
+While running, a daemon thread wakes every ``interval`` seconds, snapshots the
+stack of every other thread with ``sys._current_frames()`` and counts each
+stack. ``folded`` returns the counts in the collapsed-stack format read by
+flamegraph tools (``outer;inner;leaf count``). Nothing is sampled while the
+profiler is stopped.
+
+Memory stays bounded on a long run: stacks are cut at ``max_depth`` frames and
+at most ``max_stacks`` distinct stacks are kept. Samples of stacks first seen
+after that are not stored; ``status`` reports how many were dropped.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """Count thread stacks at a fixed interval until stopped."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, max_stacks: int = 10000) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        if interval is not None:
+            self.interval = interval
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+            self.dropped = 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                labels: List[str] = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                sampled.append(";".join(reversed(labels)))
+            with self._lock:
+                for stack in sampled:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        """Collapsed stacks, most frequent first."""
+
+        with self._lock:
+            top = self._stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in top)
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000.0,
+                "samples": self.samples,
+                "distinct_stacks": len(self._stacks),
+                "dropped_stacks": self.dropped,
+            }
+
+
+__all__ = ["SamplingProfiler"]
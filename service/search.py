@@ -0,0 +1,194 @@
+"""Depth-limited expectimax search over packed boards.
+
+Max nodes try every legal move; chance nodes average over every empty cell
+receiving a 2 (90%) or a 4 (10%), the same spawn rule as ``js/game_manager.js``.
+Leaves are scored with a row heuristic (empty cells, merge opportunities,
+monotonicity and a penalty on large unsorted tiles) precomputed for all 65,536
+rows, like the move tables in ``board_rules``.
+
+The model's probabilities act as a policy prior at the root: moves are searched
+in prior order and moves whose prior falls below ``prior_prune`` are skipped.
+Search deepens iteratively until ``max_depth`` or until the node or time budget
+runs out, and a transposition table shares chance-node values across move
+orders that reach the same board.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, move_packed, transpose_board
+
+SPAWN_PROBABILITIES: Sequence[Tuple[int, float]] = ((1, 0.9), (2, 0.1))
+
+_EMPTY_WEIGHT = 270.0
+_MERGE_WEIGHT = 700.0
+_MONOTONICITY_WEIGHT = 47.0
+_SUM_WEIGHT = 11.0
+_BASE_SCORE = 200000.0
+
+
+def _build_heuristic_table() -> np.ndarray:
+    codes = np.arange(1 << 16, dtype=np.uint32)
+    cells = ((codes[:, None] >> (4 * np.arange(4, dtype=np.uint32))) & 0xF).astype(np.float64)
+
+    empty = (cells == 0).sum(axis=1)
+
+    # Count equal neighbours once empty cells are squeezed out of the row.
+    order = np.argsort(cells == 0, axis=1, kind="stable")
+    compressed = np.take_along_axis(cells, order, axis=1)
+    merges = ((compressed[:, :-1] == compressed[:, 1:]) & (compressed[:, :-1] != 0)).sum(axis=1)
+
+    powered = cells**4
+    steps = powered[:, :-1] - powered[:, 1:]
+    decreasing = np.where(cells[:, :-1] > cells[:, 1:], steps, 0.0).sum(axis=1)
+    increasing = np.where(cells[:, :-1] < cells[:, 1:], -steps, 0.0).sum(axis=1)
+    monotonicity = np.minimum(decreasing, increasing)
+
+    sum_penalty = (cells**3.5).sum(axis=1)
+
+    return (
+        _BASE_SCORE
+        + _EMPTY_WEIGHT * empty
+        + _MERGE_WEIGHT * merges
+        - _MONOTONICITY_WEIGHT * monotonicity
+        - _SUM_WEIGHT * sum_penalty
+    )
+
+
+ROW_HEURISTIC = _build_heuristic_table()
+_ROW_HEURISTIC_LIST: List[float] = ROW_HEURISTIC.tolist()
+
+
+def evaluate_board(packed: int) -> float:
+    """Heuristic value of a packed board: row scores plus column scores."""
+
+    table = _ROW_HEURISTIC_LIST
+    columns = transpose_board(packed)
+    return (
+        table[packed & 0xFFFF]
+        + table[(packed >> 16) & 0xFFFF]
+        + table[(packed >> 32) & 0xFFFF]
+        + table[(packed >> 48) & 0xFFFF]
+        + table[columns & 0xFFFF]
+        + table[(columns >> 16) & 0xFFFF]
+        + table[(columns >> 32) & 0xFFFF]
+        + table[(columns >> 48) & 0xFFFF]
+    )
+
+
+def _empty_shifts(packed: int) -> List[int]:
+    return [shift for shift in range(0, 64, 4) if not (packed >> shift) & 0xF]
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class ExpectimaxSearch:
+    """Expectimax with iterative deepening, node/time budgets and a transposition table."""
+
+    def __init__(
+        self,
+        max_depth: int = 3,
+        time_budget: Optional[float] = 0.05,
+        node_budget: Optional[int] = None,
+        probability_cutoff: float = 1e-4,
+        prior_prune: float = 0.0,
+    ) -> None:
+        if max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.probability_cutoff = probability_cutoff
+        self.prior_prune = prior_prune
+
+    def search(
+        self, packed: int, prior: Optional[Sequence[float]] = None
+    ) -> Tuple[Optional[str], Dict[str, float]]:
+        """Return the best move name for ``packed`` (``None`` if no move is legal) and search stats."""
+
+        started = time.perf_counter()
+        self._deadline = started + self.time_budget if self.time_budget is not None else None
+        self._nodes = 0
+        self._tt_hits = 0
+        self._table: Dict[int, Tuple[int, float]] = {}
+
+        candidates = []
+        for idx, direction in enumerate(DIRECTION_NAMES):
+            moved = move_packed(packed, direction)
+            if moved != packed:
+                candidates.append((idx, moved))
+        if prior is not None:
+            candidates.sort(key=lambda item: prior[item[0]], reverse=True)
+            candidates = [
+                item for rank, item in enumerate(candidates) if rank == 0 or prior[item[0]] >= self.prior_prune
+            ]
+
+        best_idx = candidates[0][0] if candidates else None
+        best_value = None
+        depth_reached = 0
+        for depth in range(1, self.max_depth + 1):
+            try:
+                values = [
+                    (self._chance(moved, depth - 1, 1.0), idx) for idx, moved in candidates
+                ]
+            except _BudgetExceeded:
+                break
+            if values:
+                best_value, best_idx = max(values, key=lambda item: item[0])
+            depth_reached = depth
+
+        elapsed = time.perf_counter() - started
+        stats = {
+            "depth": depth_reached,
+            "nodes": self._nodes,
+            "transposition_hits": self._tt_hits,
+            "elapsed_ms": elapsed * 1000.0,
+            "nodes_per_second": self._nodes / elapsed if elapsed > 0 else 0.0,
+            "value": best_value,
+        }
+        return (DIRECTION_NAMES[best_idx] if best_idx is not None else None), stats
+
+    def _tick(self) -> None:
+        self._nodes += 1
+        if self.node_budget is not None and self._nodes > self.node_budget:
+            raise _BudgetExceeded
+        if self._deadline is not None and self._nodes & 0xFF == 0 and time.perf_counter() > self._deadline:
+            raise _BudgetExceeded
+
+    def _max(self, packed: int, depth: int, probability: float) -> float:
+        self._tick()
+        best = 0.0
+        for direction in DIRECTION_NAMES:
+            moved = move_packed(packed, direction)
+            if moved != packed:
+                best = max(best, self._chance(moved, depth, probability))
+        return best
+
+    def _chance(self, packed: int, depth: int, probability: float) -> float:
+        self._tick()
+        if depth == 0 or probability < self.probability_cutoff:
+            return evaluate_board(packed)
+
+        cached = self._table.get(packed)
+        if cached is not None and cached[0] >= depth:
+            self._tt_hits += 1
+            return cached[1]
+
+        empties = _empty_shifts(packed)
+        cell_probability = probability / len(empties)
+        total = 0.0
+        for shift in empties:
+            for exponent, spawn_probability in SPAWN_PROBABILITIES:
+                total += spawn_probability * self._max(
+                    packed | exponent << shift, depth - 1, cell_probability * spawn_probability
+                )
+        value = total / len(empties)
+        self._table[packed] = (depth, value)
+        return value
+
+
+__all__ = ["ExpectimaxSearch", "SPAWN_PROBABILITIES", "evaluate_board"]
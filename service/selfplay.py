@@ -0,0 +1,256 @@
+"""Parallel self-play on the headless game engine.
+
+Each worker process builds its policy once, then plays its share of the seeded
+games in lockstep so a model policy scores every active board with a single
+``predict_proba`` call per turn. The runner reports score and max-tile
+distributions, and can write every game's log in the browser logger's JSON
+format or append every move to a replay store (``replay_store.py``); workers
+append to the same store concurrently.
+
+Usage::
+
+    python service/selfplay.py --games 1000 --processes 8 --policy model \\
+        --model random_forest_2048.pkl --log-dir training_data/selfplay \\
+        --replay-store replay.bin
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, move_packed
+from features import packed_features, uses_extra_features
+from headless_game import HeadlessGame
+from model_registry import read_model
+from replay_store import SOURCE_SELFPLAY, ReplayWriter, make_records, new_game_id
+from search import ExpectimaxSearch
+
+
+def _legal_indices(packed: int) -> List[int]:
+    return [idx for idx, d in enumerate(DIRECTION_NAMES) if move_packed(packed, d) != packed]
+
+
+class RandomPolicy:
+    """Uniformly random legal moves."""
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.rng = random.Random(seed)
+
+    def reset(self, seed: int) -> None:
+        self.rng.seed(seed)
+
+    def choose(self, boards: Sequence[int]) -> List[Optional[str]]:
+        moves: List[Optional[str]] = []
+        for packed in boards:
+            legal = _legal_indices(packed)
+            moves.append(DIRECTION_NAMES[self.rng.choice(legal)] if legal else None)
+        return moves
+
+
+class ModelPolicy:
+    """The highest-probability legal move, as served by ``/predict``."""
+
+    def __init__(self, model: Any) -> None:
+        self.model = model
+        self.extra = uses_extra_features(model)
+        self.predictions = 0
+        self.invalid_predictions = 0
+
+    def choose(self, boards: Sequence[int]) -> List[Optional[str]]:
+        probabilities = np.asarray(self.model.predict_proba(packed_features(boards, extra=self.extra)))
+        moves: List[Optional[str]] = []
+        for packed, row in zip(boards, probabilities):
+            legal = _legal_indices(packed)
+            self.predictions += 1
+            if int(np.argmax(row)) not in legal:
+                self.invalid_predictions += 1
+            moves.append(DIRECTION_NAMES[max(legal, key=lambda i: row[i])] if legal else None)
+        return moves
+
+
+class SearchPolicy:
+    """Expectimax lookahead, optionally ordered by a model prior."""
+
+    def __init__(self, search: ExpectimaxSearch, model: Any = None) -> None:
+        self.search = search
+        self.model = model
+
+    def choose(self, boards: Sequence[int]) -> List[Optional[str]]:
+        priors: Iterable = [None] * len(boards)
+        if self.model is not None:
+            features = packed_features(boards, extra=uses_extra_features(self.model))
+            priors = np.asarray(self.model.predict_proba(features))
+        return [self.search.search(packed, prior=prior)[0] for packed, prior in zip(boards, priors)]
+
+
+def play_games(
+    policy: Any,
+    seeds: Sequence[int],
+    max_moves: Optional[int] = None,
+    log_dir: Optional[str] = None,
+    replay: Optional[ReplayWriter] = None,
+) -> List[Dict]:
+    """Play one game per seed in lockstep and return per-game summaries."""
+
+    games = [HeadlessGame(seed=seed, record_log=log_dir is not None) for seed in seeds]
+    # (board, action, reward, score) per move, only kept for the replay store.
+    moves: Dict[HeadlessGame, List] = {game: [] for game in games} if replay is not None else {}
+    active = [game for game in games if not game.over]
+    while active:
+        for game, move in zip(active, policy.choose([game.board for game in active])):
+            if move is None:
+                game.over = True
+            else:
+                board, score = game.board, game.score
+                game.move(move)
+                if replay is not None:
+                    moves[game].append((board, DIRECTION_NAMES.index(move), game.score - score, score))
+        active = [g for g in active if not g.over and (max_moves is None or g.turn < max_moves)]
+
+    results = []
+    for seed, game in zip(seeds, games):
+        if log_dir is not None:
+            with open(os.path.join(log_dir, f"selfplay_{seed}.json"), "w") as fh:
+                fh.write(game.export_log())
+        if replay is not None and moves[game]:
+            boards, actions, rewards, scores = zip(*moves[game])
+            replay.append(make_records(boards, actions, rewards, scores, new_game_id(), SOURCE_SELFPLAY))
+        results.append(
+            {
+                "seed": seed,
+                "score": game.score,
+                "highest_tile": game.highest_tile,
+                "moves": game.turn,
+                "won": game.won,
+            }
+        )
+    return results
+
+
+def make_policy(name: str, model_path: Optional[str] = None, seed: Optional[int] = None, **search_options):
+    model = read_model(model_path) if model_path else None
+    if name == "random":
+        return RandomPolicy(seed)
+    if name == "model":
+        if model is None:
+            raise ValueError("The model policy needs a model path")
+        return ModelPolicy(model)
+    if name == "search":
+        return SearchPolicy(ExpectimaxSearch(**search_options), model)
+    raise ValueError(f"Unknown policy: {name}")
+
+
+_worker_policy: Any = None
+
+
+def _init_worker(policy_args: Dict) -> None:
+    global _worker_policy
+    _worker_policy = make_policy(**policy_args)
+
+
+def _play_chunk(task: Dict) -> Dict:
+    if hasattr(_worker_policy, "reset"):
+        # Reseed per chunk so results do not depend on how chunks land on workers.
+        _worker_policy.reset(task["seeds"][0])
+    predictions = getattr(_worker_policy, "predictions", 0)
+    invalid = getattr(_worker_policy, "invalid_predictions", 0)
+    if task["replay_store"] is not None:
+        with ReplayWriter(task["replay_store"]) as replay:
+            results = play_games(_worker_policy, task["seeds"], task["max_moves"], task["log_dir"], replay)
+    else:
+        results = play_games(_worker_policy, task["seeds"], task["max_moves"], task["log_dir"])
+    return {
+        "results": results,
+        "predictions": getattr(_worker_policy, "predictions", 0) - predictions,
+        "invalid_predictions": getattr(_worker_policy, "invalid_predictions", 0) - invalid,
+    }
+
+
+def summarize(results: List[Dict], elapsed: float, predictions: int = 0, invalid: int = 0) -> Dict:
+    scores = [r["score"] for r in results]
+    moves = sum(r["moves"] for r in results)
+    tiles = Counter(r["highest_tile"] for r in results)
+    return {
+        "games": len(results),
+        "mean_score": statistics.fmean(scores) if scores else 0.0,
+        "median_score": statistics.median(scores) if scores else 0.0,
+        "max_score": max(scores, default=0),
+        "max_tile_counts": {str(tile): tiles[tile] for tile in sorted(tiles)},
+        "win_rate": sum(r["won"] for r in results) / len(results) if results else 0.0,
+        "total_moves": moves,
+        "moves_per_second": moves / elapsed if elapsed > 0 else 0.0,
+        "elapsed_seconds": elapsed,
+        "invalid_prediction_rate": invalid / predictions if predictions else 0.0,
+    }
+
+
+def run_selfplay(
+    policy_args: Dict,
+    games: int,
+    processes: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = 64,
+    max_moves: Optional[int] = None,
+    log_dir: Optional[str] = None,
+    replay_store: Optional[str] = None,
+) -> Dict:
+    """Play ``games`` seeded games across a process pool and summarize them."""
+
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+    seeds = list(range(seed, seed + games))
+    tasks = [
+        {"seeds": seeds[i : i + chunk_size], "max_moves": max_moves, "log_dir": log_dir, "replay_store": replay_store}
+        for i in range(0, len(seeds), chunk_size)
+    ]
+
+    started = time.perf_counter()
+    results: List[Dict] = []
+    predictions = invalid = 0
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(policy_args,)) as pool:
+        for chunk in pool.imap_unordered(_play_chunk, tasks):
+            results.extend(chunk["results"])
+            predictions += chunk["predictions"]
+            invalid += chunk["invalid_predictions"]
+    results.sort(key=lambda r: r["seed"])
+    return {"summary": summarize(results, time.perf_counter() - started, predictions, invalid), "games": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--policy", choices=("model", "random", "search"), default="model")
+    parser.add_argument("--model", default=None, help="model artifact (.pkl, .npz or model directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=2, help="search depth for --policy search")
+    parser.add_argument("--log-dir", default=None, help="write each game's log here")
+    parser.add_argument("--replay-store", default=None, help="append every move to this replay store")
+    args = parser.parse_args()
+
+    policy_args: Dict = {"name": args.policy, "model_path": args.model, "seed": args.seed}
+    if args.policy == "search":
+        policy_args.update(max_depth=args.depth, time_budget=None)
+    report = run_selfplay(
+        policy_args,
+        games=args.games,
+        processes=args.processes,
+        seed=args.seed,
+        max_moves=args.max_moves,
+        log_dir=args.log_dir,
+        replay_store=args.replay_store,
+    )
+    print(json.dumps(report["summary"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
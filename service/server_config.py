@@ -0,0 +1,40 @@
+"""Environment settings shared by the Flask service and the ASGI front end.
+
+``model_server.py`` and ``asgi_server.py`` read the model location and the
+CORS origins the same way, so both entry points serve the same model to the
+same clients for a given environment.
+"""
+
+import os
+from typing import List, Optional
+
+
+def resolve_model_path() -> str:
+    env_path = os.environ.get("RF_MODEL_PATH")
+    if env_path:
+        return os.path.abspath(env_path)
+
+    here = os.path.dirname(__file__)
+    candidates = [
+        os.path.abspath(os.path.join(here, "..", "random_forest_2048.pkl")),
+        os.path.abspath(os.path.join(here, "random_forest_2048.pkl")),
+    ]
+
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+
+    # Fall back to first candidate so we still raise a helpful error later
+    return candidates[0]
+
+
+def allowed_origins(value: Optional[str] = None) -> List[str]:
+    """``RF_ALLOWED_ORIGINS`` (or ``value``) as a list; comma-separated, ``*`` by default."""
+
+    if value is None:
+        value = os.environ.get("RF_ALLOWED_ORIGINS", "*")
+    origins = [origin.strip() for origin in value.split(",") if origin.strip()]
+    return origins or ["*"]
+
+
+__all__ = ["allowed_origins", "resolve_model_path"]
@@ -0,0 +1,113 @@
+"""Server-side game boards for the ``/session`` API.
+
+A session holds the board the client will see once it has played the last
+returned move, before the game spawns its random tile. The client then only
+reports the spawned tile (``{"row", "col", "value"}``, as in the browser
+logger's ``spawnedTile``), and the server rebuilds the full board itself.
+Sessions are kept in an LRU bounded by ``max_sessions`` and expire after
+``ttl_seconds`` without a request.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+SPAWN_VALUES = (2, 4)
+
+Grid = List[List[int]]
+
+
+class SpawnMismatch(ValueError):
+    """The reported spawn cannot be applied to the stored board."""
+
+
+class GameSession:
+    __slots__ = ("session_id", "board", "moves", "last_used", "lock")
+
+    def __init__(self, session_id: str, board: Grid) -> None:
+        self.session_id = session_id
+        self.board = board
+        self.moves = 0
+        self.last_used = time.monotonic()
+        # Held across a whole step so concurrent requests for one game apply in order.
+        self.lock = threading.Lock()
+
+    def apply_spawn(self, spawn: Optional[Dict]) -> Grid:
+        """Return the current board: the stored board plus the spawned tile, if any."""
+
+        if spawn is None:
+            return [list(row) for row in self.board]
+        try:
+            row, col, value = int(spawn["row"]), int(spawn["col"]), int(spawn["value"])
+        except (KeyError, TypeError, ValueError) as exc:
+            raise SpawnMismatch(f"Spawn must have integer 'row', 'col' and 'value': {exc}") from exc
+        if value not in SPAWN_VALUES:
+            raise SpawnMismatch(f"Spawned tiles are 2 or 4, got {value}")
+        if not (0 <= row < len(self.board) and 0 <= col < len(self.board[row])):
+            raise SpawnMismatch(f"Spawn position ({row}, {col}) is off the board")
+        if self.board[row][col] != 0:
+            raise SpawnMismatch(f"Cell ({row}, {col}) is not empty on the session board")
+        grid = [list(line) for line in self.board]
+        grid[row][col] = value
+        return grid
+
+
+class SessionStore:
+    """Thread-safe LRU of game sessions with idle expiry."""
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 1800.0) -> None:
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+
+    def create(self, board: Grid) -> GameSession:
+        session = GameSession(uuid.uuid4().hex, board)
+        with self._lock:
+            self._expire(session.last_used)
+            self._sessions[session.session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.expired += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self, now: float) -> None:
+        # Least recently used sessions sit at the front.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "expired": self.expired,
+            }
+
+
+__all__ = ["GameSession", "SessionStore", "SpawnMismatch", "SPAWN_VALUES"]
@@ -0,0 +1,127 @@
+"""Tests for the ASGI front end and its inference worker pool."""
+
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+try:
+    from starlette.testclient import TestClient
+except ImportError:  # pragma: no cover - optional serving dependency
+    TestClient = None
+
+
+@unittest.skipIf(TestClient is None, "starlette is not installed")
+class AsgiServerTests(unittest.TestCase):
+    """The async front end must serve the Flask service's /predict contract."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        from sklearn.ensemble import RandomForestClassifier
+
+        from asgi_server import create_app
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(3)
+        model = RandomForestClassifier(n_estimators=4, random_state=0)
+        model.fit(rng.integers(0, 12, size=(200, 16)) / 16.0, rng.integers(0, 4, size=200))
+        cls.model_path = os.path.join(cls.tmp.name, "model.pkl")
+        with open(cls.model_path, "wb") as fh:
+            pickle.dump(model, fh)
+
+        app = create_app(cls.model_path, workers=1, allowed_origins="http://game.test")
+        cls.client_context = TestClient(app)
+        cls.client = cls.client_context.__enter__()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.client_context.__exit__(None, None, None)
+        cls.tmp.cleanup()
+
+    def test_predict_matches_flask_response_shape(self) -> None:
+        grid = [[2, 0, 0, 2], [4, 4, 0, 0], [0, 0, 8, 8], [16, 0, 16, 0]]
+        response = self.client.post("/predict", json={"grid": grid, "include_next_grid": True})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertIn(payload["move"], payload["valid_moves"])
+        self.assertEqual(set(payload["probabilities"]), {"UP", "RIGHT", "DOWN", "LEFT"})
+        self.assertEqual(len(payload["next_grid"]), 4)
+        self.assertTrue(payload["model_version"].startswith("model.pkl@"))
+
+    def test_predict_batch_and_errors(self) -> None:
+        grids = [[[2, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4], [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 0]]]
+        payload = self.client.post("/predict_batch", json={"grids": grids}).json()
+        self.assertEqual(len(payload["predictions"]), 2)
+        self.assertEqual(payload["predictions"][1]["valid_moves"], ["RIGHT", "DOWN"])
+
+        self.assertEqual(self.client.post("/predict", json={}).status_code, 400)
+        self.assertEqual(self.client.post("/predict", json={"grid": [[3, 0]]}).status_code, 400)
+
+    def test_cors_follows_allowed_origins(self) -> None:
+        response = self.client.options(
+            "/predict",
+            headers={"Origin": "http://game.test", "Access-Control-Request-Method": "POST"},
+        )
+        self.assertEqual(response.headers["access-control-allow-origin"], "http://game.test")
+
+        other = self.client.post("/predict_batch", json={"grids": []}, headers={"Origin": "http://elsewhere.test"})
+        self.assertNotIn("access-control-allow-origin", other.headers)
+
+    def test_websocket_stream_with_spawn_deltas(self) -> None:
+        grid = [[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        with self.client.websocket_connect("/ws") as ws:
+            ws.send_json({"id": 1, "grid": grid, "include_next_grid": True})
+            first = ws.receive_json()
+            self.assertEqual(first["id"], 1)
+            empty = [(r, c) for r in range(4) for c in range(4) if first["next_grid"][r][c] == 0]
+
+            row, col = empty[0]
+            ws.send_json({"id": 2, "spawn": {"row": row, "col": col, "value": 2}, "include_next_grid": True})
+            second = ws.receive_json()
+            self.assertEqual(second["id"], 2)
+            self.assertEqual(sum(map(sum, second["next_grid"])), 4)
+
+            ws.send_json({"id": 3, "spawn": {"row": 9, "col": 0, "value": 2}})
+            self.assertIn("error", ws.receive_json())
+
+    def test_pipelined_websocket_replies_in_order(self) -> None:
+        boards = [[[2 << (i % 3), 0, 0, 0], [0] * 4, [0] * 4, [0, 0, 0, 2]] for i in range(6)]
+        with self.client.websocket_connect("/ws?pipeline=1") as ws:
+            for i, grid in enumerate(boards):
+                ws.send_json({"id": i, "grid": grid})
+            self.assertEqual([ws.receive_json()["id"] for _ in boards], list(range(6)))
+
+    def test_websocket_worker_failure_becomes_error_reply(self) -> None:
+        pool = self.client.app.state.pool
+        real_run = pool.run
+        broken = [[4, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+
+        async def flaky_run(fn, grid, *args):
+            if grid == broken:
+                raise RuntimeError("worker died")
+            return await real_run(fn, grid, *args)
+
+        grid = [[2, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+        with patch.object(pool, "run", side_effect=flaky_run), self.client.websocket_connect("/ws?pipeline=1") as ws:
+            ws.send_json({"id": 1, "grid": broken})
+            ws.send_json({"id": 2, "grid": grid})
+            ws.send_json({"id": 3, "spawn": None})
+            replies = [ws.receive_json() for _ in range(3)]
+        self.assertEqual([reply["id"] for reply in replies], [1, 2, 3])
+        self.assertEqual(replies[0]["error"], "Prediction failed: RuntimeError")
+        self.assertIn(replies[1]["move"], replies[1]["valid_moves"])
+        self.assertNotIn("error", replies[2])
+
+    def test_websocket_rejects_other_origins(self) -> None:
+        from starlette.websockets import WebSocketDisconnect
+
+        with self.assertRaises(WebSocketDisconnect):
+            with self.client.websocket_connect("/ws", headers={"Origin": "http://elsewhere.test"}) as ws:
+                ws.receive_json()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
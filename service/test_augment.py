@@ -0,0 +1,55 @@
+"""Tests for dihedral data augmentation."""
+
+import unittest
+
+import numpy as np
+
+from augment import AugmentedDataset, dedupe_samples, symmetry_view
+from board_rules import DIRECTION_NAMES, simulate_move
+
+
+class AugmentTests(unittest.TestCase):
+    """Augmented samples must describe the same move on the transformed board."""
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(5)
+        self.exponents = rng.choice([0, 0, 1, 2, 3, 4], size=(40, 16)).astype(np.uint8)
+        self.actions = rng.integers(0, 4, size=40).astype(np.int8)
+
+    def test_remapped_moves_commute_with_symmetries(self) -> None:
+        dataset = AugmentedDataset(self.exponents, self.actions)
+        features, actions = dataset.materialize()
+        self.assertEqual(features.shape, (320, 16))
+
+        n = len(self.actions)
+        for symmetry in range(8):
+            for row in range(0, n, 7):
+                base = np.where(self.exponents[row] > 0, 1 << self.exponents[row].astype(int), 0).reshape(4, 4)
+                moved, _ = simulate_move(base.tolist(), DIRECTION_NAMES[self.actions[row]])
+                moved_exponents = np.where(moved > 0, np.log2(np.maximum(moved, 1)), 0).astype(np.uint8)
+
+                sample = symmetry * n + row
+                board = np.where(features[sample] > 0, 2 ** np.round(features[sample] * 16), 0).astype(int)
+                twin, _ = simulate_move(board.reshape(4, 4).tolist(), DIRECTION_NAMES[actions[sample]])
+                expected = symmetry_view(moved_exponents.reshape(1, 4, 4), symmetry)[0]
+                twin_exponents = np.where(twin > 0, np.log2(np.maximum(twin, 1)), 0).astype(np.uint8)
+                np.testing.assert_array_equal(twin_exponents, expected)
+
+    def test_batches_match_materialized(self) -> None:
+        dataset = AugmentedDataset(self.exponents, self.actions)
+        features, actions = dataset.materialize()
+        batched = list(dataset.iter_batches(33))
+        np.testing.assert_array_equal(np.concatenate([b[0] for b in batched]), features)
+        np.testing.assert_array_equal(np.concatenate([b[1] for b in batched]), actions)
+
+    def test_dedupe_keeps_first_occurrence(self) -> None:
+        exponents = np.vstack([self.exponents[:3], self.exponents[:1]])
+        actions = np.concatenate([self.actions[:3], self.actions[:1]])
+        rewards = np.arange(4)
+        kept_exponents, kept_actions, kept_rewards = dedupe_samples(exponents, actions, rewards)
+        self.assertEqual(len(kept_actions), 3)
+        np.testing.assert_array_equal(kept_rewards, [0, 1, 2])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
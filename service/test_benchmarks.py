@@ -0,0 +1,61 @@
+"""Smoke tests for the benchmark suite and its regression check."""
+
+import unittest
+from unittest.mock import patch
+
+import model_server
+from benchmarks import _load_test, board_corpus, compare, run_benchmarks
+
+
+class BenchmarkTests(unittest.TestCase):
+    """Benchmarks must be reproducible and flag slowdowns in either direction."""
+
+    def test_corpus_is_deterministic(self) -> None:
+        self.assertEqual(board_corpus(50, seed=3), board_corpus(50, seed=3))
+        self.assertNotEqual(board_corpus(50, seed=3), board_corpus(50, seed=4))
+
+    def test_run_reports_every_area(self) -> None:
+        served = model_server.registry
+
+        def load_test(app, *args):
+            # Requests straight to the service during the benchmark must still get the served model.
+            with model_server.app.test_request_context("/predict"):
+                self.assertIs(model_server.active_registry(), served)
+            return _load_test(app, *args)
+
+        # Every benchmark request must be answered by the benchmark's own registry.
+        with patch.object(served, "snapshot", side_effect=AssertionError("served registry used")), patch(
+            "benchmarks._load_test", side_effect=load_test
+        ):
+            report = run_benchmarks(
+                corpus_size=40, min_seconds=0.01, batch_sizes=(1, 4), repeats=2, requests=8, clients=2
+            )
+        results = report["results"]
+        for name in (
+            "board_rules.simulate_move",
+            "features.preprocess_boards",
+            "predict_proba.batch_4.p50_ms",
+            "predict.test_client.requests_per_s",
+            "predict.socket_2_clients.p95_ms",
+        ):
+            self.assertGreater(results[name]["value"], 0, name)
+        self.assertEqual(report["meta"]["model"], "synthetic")
+        # The temporary benchmark model must not stay loaded in the service's registry.
+        self.assertIs(model_server.registry, served)
+        self.assertNotIn("benchmark_model", served.path)
+
+    def test_compare_respects_direction_and_tolerance(self) -> None:
+        baseline = {
+            "ops": {"value": 100.0, "unit": "ops/s", "higher_is_better": True},
+            "latency": {"value": 10.0, "unit": "ms", "higher_is_better": False},
+        }
+        current = {
+            "ops": {"value": 90.0, "unit": "ops/s", "higher_is_better": True},
+            "latency": {"value": 13.0, "unit": "ms", "higher_is_better": False},
+        }
+        self.assertEqual([r["metric"] for r in compare(current, baseline, 0.2)], ["latency"])
+        self.assertEqual([r["metric"] for r in compare(current, baseline, 0.05)], ["latency", "ops"])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,129 @@
+"""Tests for the packed board engine in board_rules."""
+
+import random
+import unittest
+
+import numpy as np
+
+import board_rules
+from board_rules import (
+    DIRECTION_NAMES,
+    analyze_board,
+    move_boards,
+    move_packed_with_score,
+    pack_board,
+    simulate_move,
+    simulate_moves_batch,
+    unpack_board,
+    valid_moves,
+    valid_moves_batch,
+)
+
+
+def _random_grid(rng: random.Random, values) -> list:
+    return [[rng.choice(values) for _ in range(4)] for _ in range(4)]
+
+
+class PackedEngineTests(unittest.TestCase):
+    """The lookup-table engine must match the original array implementation."""
+
+    def test_matches_array_path_on_random_boards(self) -> None:
+        rng = random.Random(2048)
+        values = [0, 0, 0, 2, 2, 4, 8, 16, 32, 2**14]
+        for _ in range(2000):
+            grid = _random_grid(rng, values)
+            for direction in DIRECTION_NAMES:
+                expected, expected_changed = board_rules._simulate_move_array(grid, direction)
+                actual, changed = simulate_move(grid, direction)
+                np.testing.assert_array_equal(actual, expected)
+                self.assertEqual(bool(changed), bool(expected_changed))
+
+    def test_unpackable_grids_fall_back(self) -> None:
+        grid = [
+            [2, 4, 8, 16],
+            [32, 64, 128, 256],
+            [512, 1024, 2048, 4096],
+            [8192, 16384, 32768, 65536],
+        ]
+        self.assertIsNone(pack_board(grid))
+        self.assertEqual(valid_moves(grid), [])
+
+        odd = [[3, 3, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+        moved, changed = simulate_move(odd, "LEFT")
+        self.assertTrue(changed)
+        self.assertEqual(moved[0].tolist(), [6, 0, 0, 0])
+
+    def test_pack_round_trip(self) -> None:
+        grid = [[2, 0, 0, 2], [4, 4, 0, 0], [0, 0, 8, 8], [16, 0, 16, 0]]
+        packed = pack_board(grid)
+        self.assertIsNotNone(packed)
+        assert packed is not None
+        self.assertEqual(unpack_board(packed).tolist(), grid)
+        self.assertEqual(
+            unpack_board(board_rules.transpose_board(packed)).tolist(),
+            np.array(grid).T.tolist(),
+        )
+
+
+class BatchEngineTests(unittest.TestCase):
+    """Batched kernels must agree with the single-board API."""
+
+    def test_batch_matches_single_board(self) -> None:
+        rng = np.random.default_rng(7)
+        boards = rng.choice([0, 0, 2, 4, 8, 16, 2**14], size=(300, 4, 4))
+        mask = valid_moves_batch(boards)
+        for idx, direction in enumerate(DIRECTION_NAMES):
+            next_boards, changed, _ = simulate_moves_batch(boards, direction)
+            for board, expected_board, expected_changed in zip(boards, next_boards, changed):
+                actual, actual_changed = simulate_move(board.tolist(), direction)
+                np.testing.assert_array_equal(actual, expected_board)
+                self.assertEqual(actual_changed, bool(expected_changed))
+            np.testing.assert_array_equal(mask[:, idx], changed)
+
+    def test_batch_merge_score(self) -> None:
+        boards = np.array([[[2, 2, 2, 2], [0] * 4, [0] * 4, [4, 4, 0, 0]]])
+        _, changed, scores = simulate_moves_batch(boards, "LEFT")
+        self.assertTrue(changed[0])
+        self.assertEqual(int(scores[0]), 16)
+
+    def test_move_boards_matches_packed_moves(self) -> None:
+        rng = random.Random(5)
+        boards = [sum(rng.choice([0, 0, 1, 1, 2, 3, 15]) << (4 * i) for i in range(16)) for _ in range(500)]
+        successors, scores = move_boards(np.array(boards, dtype=np.uint64))
+        for board, row, row_scores in zip(boards, successors, scores):
+            for idx, direction in enumerate(DIRECTION_NAMES):
+                self.assertEqual((int(row[idx]), int(row_scores[idx])), move_packed_with_score(board, direction))
+
+    def test_batch_rejects_unsupported_tiles(self) -> None:
+        with self.assertRaises(ValueError):
+            valid_moves_batch(np.full((1, 4, 4), 3))
+
+
+class AnalyzeBoardTests(unittest.TestCase):
+    """analyze_board must agree with the per-direction functions."""
+
+    def test_matches_simulate_move_and_scores(self) -> None:
+        rng = random.Random(23)
+        values = [0, 0, 0, 2, 2, 4, 8, 16, 2**14]
+        for _ in range(500):
+            grid = _random_grid(rng, values)
+            analysis = analyze_board(grid)
+            self.assertEqual(analysis.valid_moves, valid_moves(grid))
+            packed = pack_board(grid)
+            for idx, direction in enumerate(DIRECTION_NAMES):
+                expected, changed = simulate_move(grid, direction)
+                np.testing.assert_array_equal(analysis.successor(direction), expected)
+                self.assertEqual(analysis.changed[idx], changed)
+                self.assertEqual(analysis.scores[idx], move_packed_with_score(packed, direction)[1])
+
+    def test_unpackable_grid_uses_array_path(self) -> None:
+        grid = [[3, 3, 0, 0], [65536, 65536, 0, 0], [0] * 4, [0] * 4]
+        analysis = analyze_board(grid)
+        self.assertEqual(analysis.valid_moves, ["RIGHT", "DOWN", "LEFT"])
+        self.assertEqual(analysis.successor("LEFT")[:2].tolist(), [[6, 0, 0, 0], [131072, 0, 0, 0]])
+        self.assertEqual(analysis.scores[DIRECTION_NAMES.index("LEFT")], 6 + 131072)
+        self.assertEqual(analysis.scores[DIRECTION_NAMES.index("UP")], 0)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Tests for the incremental preprocessed dataset cache."""
+
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from dataset_cache import DatasetCache
+from headless_game import HeadlessGame
+from log_ingest import load_move_arrays
+from selfplay import RandomPolicy
+
+
+def _write_game(path: str, seed: int) -> None:
+    game = HeadlessGame(seed=seed, record_log=True)
+    policy = RandomPolicy(seed)
+    while not game.over:
+        game.move(policy.choose([game.board])[0])
+    with open(path, "w") as fh:
+        fh.write(game.export_log())
+
+
+class DatasetCacheTests(unittest.TestCase):
+    """Only new or changed logs should be parsed again."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, ".cache")
+        self.paths = [os.path.join(self.tmp.name, f"game_{seed}.json") for seed in range(2)]
+        for seed, path in enumerate(self.paths):
+            _write_game(path, seed)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_incremental_update(self) -> None:
+        cache = DatasetCache(self.cache_dir)
+        self.assertEqual(cache.update(self.paths, processes=1, verbose=False), self.paths)
+
+        reopened = DatasetCache(self.cache_dir)
+        self.assertEqual(reopened.update(self.paths, processes=1, verbose=False), [])
+        cached = reopened.load_arrays(self.paths)
+        direct = load_move_arrays(self.paths, processes=1, verbose=False)
+        for cached_column, direct_column in zip(cached, direct):
+            np.testing.assert_array_equal(cached_column, direct_column)
+
+        _write_game(self.paths[1], seed=7)
+        later = time.time() + 5
+        os.utime(self.paths[1], (later, later))
+        self.assertEqual(reopened.update(self.paths, processes=1, verbose=False), [self.paths[1]])
+
+        reopened.update(self.paths[:1], processes=1, verbose=False)
+        self.assertEqual(len(reopened.index), 1)
+        self.assertIsInstance(next(reopened.iter_shards())[0], np.memmap)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for the model evaluation gates."""
+
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+
+import evaluate_models
+from benchmarks import board_corpus
+from evaluate_models import check_gates, paired_difference
+from features import preprocess_boards
+
+
+class EvaluateModelsTests(unittest.TestCase):
+    """Promotion gates and the paired comparison."""
+
+    def test_paired_difference_matches_seeds(self) -> None:
+        baseline = [{"seed": 1, "score": 100}, {"seed": 2, "score": 200}, {"seed": 3, "score": 300}]
+        candidate = [{"seed": 3, "score": 330}, {"seed": 1, "score": 110}, {"seed": 2, "score": 220}]
+        difference = paired_difference(candidate, baseline)
+        self.assertEqual(difference["games"], 3)
+        self.assertAlmostEqual(difference["mean"], 20.0)
+        self.assertLess(difference["ci95_low"], 20.0)
+        self.assertGreater(difference["ci95_high"], 20.0)
+
+    def test_gates(self) -> None:
+        baseline = {"mean_score": 1000.0, "invalid_prediction_rate": 0.01, "win_rate": 0.0}
+        candidate = {"mean_score": 970.0, "invalid_prediction_rate": 0.08, "win_rate": 0.0}
+        self.assertEqual(check_gates(candidate, baseline, max_score_drop=0.05), [])
+        failures = check_gates(candidate, baseline, max_score_drop=0.02, max_invalid_rate=0.05, min_mean_score=900)
+        self.assertEqual(len(failures), 2)
+        self.assertIn("invalid prediction rate", failures[0])
+        self.assertIn("below the baseline", failures[1])
+
+
+class EvaluateModelsCliTests(unittest.TestCase):
+    """The command plays both models and exits non-zero when a gate fails."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        from sklearn.ensemble import RandomForestClassifier
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        grids = board_corpus(200)
+        labels = np.random.default_rng(0).integers(0, 4, size=len(grids))
+        model = RandomForestClassifier(n_estimators=4, max_depth=6, random_state=0).fit(preprocess_boards(grids), labels)
+        cls.baseline = os.path.join(cls.tmp.name, "baseline.pkl")
+        cls.candidate = os.path.join(cls.tmp.name, "candidate.pkl")
+        with open(cls.baseline, "wb") as fh:
+            pickle.dump(model, fh)
+        # The same forest under another name plays identical games.
+        shutil.copy(cls.baseline, cls.candidate)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    def _run(self, *gates: str, games: int = 3):
+        output = os.path.join(self.tmp.name, "report.json")
+        argv = [
+            "evaluate_models.py", self.baseline, self.candidate,
+            "--games", str(games), "--processes", "1", "--max-moves", "40", "--output", output, *gates,
+        ]
+        with patch.object(sys, "argv", argv), redirect_stdout(StringIO()):
+            status = evaluate_models.main()
+        with open(output) as fh:
+            return status, json.load(fh)
+
+    def test_passing_candidate_exits_zero(self) -> None:
+        status, report = self._run("--max-score-drop", "0.0", "--max-invalid-rate", "1.0")
+        self.assertEqual(status, 0)
+        self.assertTrue(report["passed"])
+        candidate = report["models"][self.candidate]
+        self.assertEqual(candidate["failures"], [])
+        self.assertEqual(candidate["vs_baseline"]["mean"], 0.0)
+        self.assertEqual(candidate["vs_baseline"]["games"], 3)
+
+    def test_failing_gate_exits_one(self) -> None:
+        status, report = self._run("--min-mean-score", "1000000")
+        self.assertEqual(status, 1)
+        self.assertFalse(report["passed"])
+        self.assertIn("mean score", report["models"][self.candidate]["failures"][0])
+
+    def test_single_game_report_is_strict_json(self) -> None:
+        status, _ = self._run(games=1)
+        self.assertEqual(status, 0)
+        with open(os.path.join(self.tmp.name, "report.json")) as fh:
+            report = json.load(fh, parse_constant=lambda name: self.fail(f"non-standard JSON constant {name}"))
+        difference = report["models"][self.candidate]["vs_baseline"]
+        self.assertEqual(difference["games"], 1)
+        self.assertIsNone(difference["ci95_low"])
+        self.assertIsNone(difference["ci95_high"])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for the shared feature pipeline."""
+
+import unittest
+
+import numpy as np
+
+from board_rules import pack_board
+from features import (
+    engineered_features,
+    feature_count,
+    packed_features,
+    preprocess_board,
+    preprocess_boards,
+    uses_extra_features,
+)
+
+
+class FeatureTests(unittest.TestCase):
+    """Grids, packed boards and exponents must produce identical features."""
+
+    def setUp(self) -> None:
+        rng = np.random.default_rng(11)
+        exponents = rng.integers(0, 15, size=(32, 4, 4))
+        self.grids = np.where(exponents > 0, 1 << exponents, 0)
+
+    def test_matches_log2_formula(self) -> None:
+        expected = np.log2(np.maximum(self.grids, 1)).reshape(-1, 16) / 16.0
+        np.testing.assert_allclose(preprocess_boards(self.grids.tolist()), expected, rtol=1e-6)
+        np.testing.assert_allclose(preprocess_board(self.grids[0].tolist()), expected[0], rtol=1e-6)
+
+    def test_packed_boards_agree_with_grids(self) -> None:
+        packed = [pack_board(grid) for grid in self.grids]
+        np.testing.assert_array_equal(packed_features(packed, extra=True), preprocess_boards(self.grids, extra=True))
+
+    def test_writes_into_preallocated_buffer(self) -> None:
+        out = np.zeros((len(self.grids), feature_count(extra=True)), dtype=np.float32)
+        result = preprocess_boards(self.grids, out=out, extra=True)
+        self.assertIs(result, out)
+        with self.assertRaises(ValueError):
+            preprocess_boards(self.grids, out=np.zeros((1, 16), dtype=np.float32))
+
+    def test_engineered_features(self) -> None:
+        # Tiles 2, 2, _, 4 across the top row.
+        exponents = np.array([[1, 1, 0, 2] + [0] * 12], dtype=np.uint8)
+        empty, monotonicity, merges = engineered_features(exponents)[0]
+        self.assertAlmostEqual(empty, 13 / 16)
+        # The top row steps 1, 1, 0, 2: one unit down against a rising trend.
+        self.assertAlmostEqual(monotonicity, 1 - 1 / 192)
+        # 2, 2 and 4 slide together as 2, 2, 4: one merge.
+        self.assertAlmostEqual(merges, 1 / 24)
+
+    def test_rejects_values_that_are_not_tiles(self) -> None:
+        for value in (3, -2, 1 << 17):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                preprocess_board([[value, 0, 0, 0]] + [[0, 0, 0, 0]] * 3)
+
+    def test_detects_extra_feature_models(self) -> None:
+        class Model:
+            n_features_in_ = feature_count(extra=True)
+
+        self.assertTrue(uses_extra_features(Model()))
+        self.assertFalse(uses_extra_features(object()))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tests for the flattened RandomForest evaluator."""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from forest_engine import FlatForest, compile_forest, load_forest
+
+
+class FlatForestTests(unittest.TestCase):
+    """The flat evaluator must reproduce scikit-learn's probabilities."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        rng = np.random.default_rng(11)
+        cls.features = (rng.integers(0, 12, size=(600, 16)) / 16.0).astype(np.float32)
+        labels = rng.integers(0, 4, size=600)
+        cls.model = RandomForestClassifier(n_estimators=10, random_state=0).fit(cls.features, labels)
+
+    def test_predict_proba_matches_sklearn(self) -> None:
+        forest = compile_forest(self.model)
+        np.testing.assert_allclose(
+            forest.predict_proba(self.features),
+            self.model.predict_proba(self.features),
+            atol=1e-6,
+        )
+        np.testing.assert_array_equal(forest.classes_, self.model.classes_)
+
+    def test_save_and_load_round_trip(self) -> None:
+        forest = compile_forest(self.model)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "forest.npz")
+            forest.save(path)
+            loaded = FlatForest.load(path)
+        np.testing.assert_allclose(
+            loaded.predict_proba(self.features[:5]), forest.predict_proba(self.features[:5])
+        )
+
+    def test_model_directory_is_memory_mapped(self) -> None:
+        forest = compile_forest(self.model)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "forest.model")
+            forest.save_directory(path)
+            loaded = load_forest(path)
+            self.assertIsInstance(loaded.value, np.memmap)
+            np.testing.assert_allclose(
+                loaded.predict_proba(self.features[:5]), forest.predict_proba(self.features[:5])
+            )
+            del loaded
+
+    def test_export_over_live_directory_keeps_mapped_model(self) -> None:
+        first = compile_forest(self.model)
+        labels = np.random.default_rng(5).integers(0, 4, size=len(self.features))
+        other = RandomForestClassifier(n_estimators=3, max_depth=3, random_state=1).fit(self.features, labels)
+        second = compile_forest(other)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "forest.model")
+            first.save_directory(path)
+            served = load_forest(path)
+            before = served.predict_proba(self.features[:20])
+
+            # Two re-exports, so the files the served model maps are also cleaned up.
+            second.save_directory(path)
+            second.save_directory(path)
+            np.testing.assert_array_equal(served.predict_proba(self.features[:20]), before)
+
+            reloaded = load_forest(path)
+            np.testing.assert_allclose(
+                reloaded.predict_proba(self.features[:20]), other.predict_proba(self.features[:20]), atol=1e-6
+            )
+            self.assertEqual(len([name for name in os.listdir(path) if name.endswith(".npy")]), 14)
+            del served, reloaded
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Tests for streaming log ingestion."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from headless_game import HeadlessGame
+from log_ingest import DIRECTION_MAP, iter_log_events, load_move_arrays
+from selfplay import RandomPolicy
+
+
+class LogIngestTests(unittest.TestCase):
+    """Streaming must produce the same moves as loading files whole."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for seed in range(3):
+            game = HeadlessGame(seed=seed, record_log=True)
+            policy = RandomPolicy(seed)
+            while not game.over:
+                game.move(policy.choose([game.board])[0])
+            game.log.insert(1, {"type": "moveTile", "turn": 1, "value": 2})
+            path = os.path.join(self.tmp.name, f"game_{seed}.json")
+            with open(path, "w") as fh:
+                fh.write(game.export_log())
+            self.paths.append(path)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_streaming_matches_json_load(self) -> None:
+        for path in self.paths:
+            with open(path) as fh:
+                expected = json.load(fh)
+            self.assertEqual(list(iter_log_events(path, read_size=7)), expected)
+
+    def test_numbers_split_across_reads(self) -> None:
+        events = [1.25, 3.5e-07, 2e10, -0.125, 7, {"score": 1.5e3, "ratio": 0.333}, [10.75, -2E-3]]
+        path = os.path.join(self.tmp.name, "numbers.json")
+        with open(path, "w") as fh:
+            fh.write(" [ 1.25, 3.5e-07,2E+10 ,-0.125, 7, " + json.dumps(events[5]) + ", [10.75, -2E-3] ]")
+        for read_size in range(1, 65):
+            with self.subTest(read_size=read_size):
+                self.assertEqual(list(iter_log_events(path, read_size=read_size)), events)
+
+    def test_load_move_arrays(self) -> None:
+        exponents, actions, rewards = load_move_arrays(self.paths, processes=2, verbose=False)
+
+        expected_grids, expected_actions, expected_rewards = [], [], []
+        for path in self.paths:
+            with open(path) as fh:
+                for event in json.load(fh):
+                    if event.get("type") == "move" and event.get("valid"):
+                        expected_grids.append(event["prev"]["grid"])
+                        expected_actions.append(DIRECTION_MAP[event["direction"]])
+                        expected_rewards.append(event["next"]["score"] - event["prev"]["score"])
+
+        board = np.array(expected_grids).reshape(-1, 16)
+        board[board == 0] = 1
+        np.testing.assert_array_equal(exponents, np.log2(board))
+        np.testing.assert_array_equal(actions, expected_actions)
+        np.testing.assert_array_equal(rewards, expected_rewards)
+
+    def test_unreadable_files_are_skipped(self) -> None:
+        broken = os.path.join(self.tmp.name, "broken.json")
+        with open(broken, "w") as fh:
+            fh.write('[{"type": "move", ')
+        _, actions, _ = load_move_arrays([broken, self.paths[0]], processes=1, verbose=False)
+        _, expected, _ = load_move_arrays([self.paths[0]], processes=1, verbose=False)
+        self.assertEqual(len(actions), len(expected))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Tests for request metrics, the /metrics endpoint and the sampling profiler."""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import model_server
+from metrics import MetricsRegistry
+from sampling_profiler import SamplingProfiler
+
+
+class MetricsRegistryTests(unittest.TestCase):
+    """The exporter must emit valid Prometheus text."""
+
+    def test_render_counters_histograms_and_callbacks(self) -> None:
+        registry = MetricsRegistry("t", buckets=(0.1, 1.0))
+        registry.inc("hits_total", "Hits.", endpoint="a")
+        registry.inc("hits_total", "Hits.", 2, endpoint="a")
+        registry.observe("latency_seconds", "Latency.", 0.05, stage="x")
+        registry.observe("latency_seconds", "Latency.", 0.5, stage="x")
+        registry.collect("loaded", "Loaded.", lambda: 1.0)
+        registry.collect("missing", "Skipped when None.", lambda: None)
+
+        text = registry.render()
+        self.assertIn('t_hits_total{endpoint="a"} 3', text)
+        self.assertIn("# TYPE t_latency_seconds histogram", text)
+        self.assertIn('t_latency_seconds_bucket{stage="x",le="0.1"} 1', text)
+        self.assertIn('t_latency_seconds_bucket{stage="x",le="+Inf"} 2', text)
+        self.assertIn('t_latency_seconds_count{stage="x"} 2', text)
+        self.assertIn("t_loaded 1", text)
+        self.assertNotIn("t_missing", text)
+
+
+class MetricsEndpointTests(unittest.TestCase):
+    """/predict traffic must show up on /metrics."""
+
+    def test_predict_stages_and_invalid_rate(self) -> None:
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.9, 0.05, 0.03, 0.02]]
+
+        client = model_server.app.test_client()
+        before = model_server.metrics.counter_value("predicted_invalid_total")
+        # UP is impossible on this board, so the prediction counts as invalid.
+        grid = [[2, 4, 8, 16], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            self.assertEqual(client.post("/predict", json={"grid": grid, "include_next_grid": True}).status_code, 200)
+
+        text = client.get("/metrics").get_data(as_text=True)
+        for stage in ("parse", "preprocess", "predict_proba", "valid_moves", "simulate_move", "serialize"):
+            self.assertIn(f'rf_stage_seconds_count{{stage="{stage}"}}', text)
+        self.assertIn('rf_requests_total{endpoint="predict",status="200"}', text)
+        self.assertEqual(model_server.metrics.counter_value("predicted_invalid_total"), before + 1)
+
+
+class SamplingProfilerTests(unittest.TestCase):
+    """The profiler only samples while switched on."""
+
+    def test_start_stop_collects_folded_stacks(self) -> None:
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        profiler.stop()
+
+        status = profiler.status()
+        self.assertFalse(status["running"])
+        self.assertGreater(status["samples"], 0)
+        self.assertIn("test_start_stop_collects_folded_stacks", profiler.folded())
+
+        samples = status["samples"]
+        time.sleep(0.01)
+        self.assertEqual(profiler.status()["samples"], samples)
+        profiler.reset()
+        self.assertEqual(profiler.folded(), "")
+
+    def test_distinct_stacks_are_capped(self) -> None:
+        profiler = SamplingProfiler(interval=0.001, max_stacks=1)
+        profiler.start()
+        workers = [threading.Thread(target=time.sleep, args=(0.05,)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        profiler.stop()
+        for worker in workers:
+            worker.join()
+
+        status = profiler.status()
+        self.assertEqual(status["distinct_stacks"], 1)
+        self.assertGreater(status["dropped_stacks"], 0)
+        self.assertEqual(len(profiler.folded().splitlines()), 1)
+        profiler.reset()
+        self.assertEqual(profiler.status()["dropped_stacks"], 0)
+
+
+class ProfilerEndpointTests(unittest.TestCase):
+    """The profiler routes need the admin token and a sane sampling interval."""
+
+    def setUp(self) -> None:
+        self.client = model_server.app.test_client()
+        self.addCleanup(model_server.profiler.stop)
+
+    def test_requires_admin_token(self) -> None:
+        with patch("model_server.ADMIN_TOKEN", None):
+            self.assertEqual(self.client.get("/admin/profiler").status_code, 403)
+            self.assertEqual(self.client.post("/admin/profiler", json={"enabled": True}).status_code, 403)
+        with patch("model_server.ADMIN_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/admin/profiler", headers={"X-Admin-Token": "x"}).status_code, 403)
+            self.assertEqual(self.client.get("/admin/profiler", headers={"X-Admin-Token": "secret"}).status_code, 200)
+        self.assertFalse(model_server.profiler.status()["running"])
+
+    def test_rejects_bad_interval(self) -> None:
+        headers = {"X-Admin-Token": "secret"}
+        with patch("model_server.ADMIN_TOKEN", "secret"):
+            for interval_ms in (0, -5, 5000, "fast", [1]):
+                payload = {"enabled": True, "interval_ms": interval_ms}
+                response = self.client.post("/admin/profiler", headers=headers, json=payload)
+                self.assertEqual(response.status_code, 400, interval_ms)
+            self.assertFalse(model_server.profiler.status()["running"])
+            response = self.client.post("/admin/profiler", headers=headers, json={"enabled": True, "interval_ms": 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["interval_ms"], 5.0)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Tests for the MicroBatcher inference queue."""
+
+import threading
+import unittest
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+from micro_batcher import MicroBatcher
+
+
+class MicroBatcherTests(unittest.TestCase):
+    """Concurrent submissions should share batched model calls."""
+
+    def test_concurrent_requests_are_batched(self) -> None:
+        calls = []
+
+        def predict_batch(model, features: np.ndarray) -> np.ndarray:
+            calls.append(len(features))
+            return features[:, :4] * model
+
+        batcher = MicroBatcher(predict_batch, max_batch_size=8, max_delay=0.05)
+        results = {}
+
+        def worker(idx: int) -> None:
+            results[idx] = batcher.submit(np.full(16, idx, dtype=np.float32), 2)
+
+        threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        self.assertEqual(sum(calls), 8)
+        self.assertLess(len(calls), 8)
+        for idx in range(8):
+            np.testing.assert_array_equal(results[idx], np.full(4, idx * 2, dtype=np.float32))
+        self.assertEqual(batcher.stats()["items"], 8)
+
+    def test_model_errors_reach_callers(self) -> None:
+        def predict_batch(model, features: np.ndarray) -> np.ndarray:
+            raise RuntimeError("model exploded")
+
+        batcher = MicroBatcher(predict_batch, max_delay=0.0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit(np.zeros(16, dtype=np.float32), None)
+        batcher.close()
+
+    def test_submit_times_out_and_drops_the_row(self) -> None:
+        release = threading.Event()
+        scored = []
+
+        def predict_batch(model, features: np.ndarray) -> np.ndarray:
+            scored.append(len(features))
+            release.wait(5)
+            return np.zeros((len(features), 4))
+
+        batcher = MicroBatcher(predict_batch, max_delay=0.0)
+        # The first row stalls the flush thread; the second times out while queued behind it.
+        blocker = threading.Thread(target=batcher.submit, args=(np.zeros(16), None))
+        blocker.start()
+        while not scored:
+            release.wait(0.001)
+        with self.assertRaises(FutureTimeout):
+            batcher.submit(np.ones(16), None, timeout=0.02)
+        release.set()
+        blocker.join()
+        batcher.close()
+        self.assertEqual(scored, [1])
+
+    def test_reload_between_submit_and_flush(self) -> None:
+        """Rows featurized for different models in one window are each scored by their own model."""
+
+        class Model:
+            def __init__(self, width: int, move: int) -> None:
+                self.width, self.move = width, move
+
+            def predict_proba(self, features: np.ndarray) -> np.ndarray:
+                if features.shape[1] != self.width:
+                    raise ValueError(f"expected {self.width} features, got {features.shape[1]}")
+                return np.eye(4)[[self.move] * len(features)]
+
+        old, new = Model(16, 0), Model(19, 1)
+        batcher = MicroBatcher(lambda model, features: model.predict_proba(features), max_delay=0.2)
+        results = {}
+
+        def worker(name: str, model: Model) -> None:
+            results[name] = batcher.submit(np.zeros(model.width, dtype=np.float32), model)
+
+        # The second request arrives after a reload, inside the first one's batching window.
+        threads = [threading.Thread(target=worker, args=args) for args in (("old", old), ("new", new))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        np.testing.assert_array_equal(results["old"], [1, 0, 0, 0])
+        np.testing.assert_array_equal(results["new"], [0, 1, 0, 0])
+        self.assertEqual(batcher.stats()["items"], 2)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
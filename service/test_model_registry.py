@@ -0,0 +1,80 @@
+"""Tests for hot-swapping models through ModelRegistry."""
+
+import os
+import tempfile
+import time
+import unittest
+
+from model_registry import ModelRegistry
+
+
+def _read_text(path: str) -> str:
+    with open(path) as fh:
+        return fh.read()
+
+
+class ModelRegistryTests(unittest.TestCase):
+    """Reloads should swap the active model and version atomically."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "model.txt")
+        with open(self.path, "w") as fh:
+            fh.write("v1")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_lazy_load_and_synchronous_reload(self) -> None:
+        registry = ModelRegistry(self.path, _read_text)
+        self.assertIsNone(registry.version)
+        self.assertEqual(registry.get(), "v1")
+        self.assertTrue(registry.version.startswith("model.txt@"))
+
+        other = os.path.join(self.tmp.name, "other.txt")
+        with open(other, "w") as fh:
+            fh.write("v2")
+        registry.reload(other, background=False)
+        self.assertEqual(registry.get(), "v2")
+        self.assertTrue(registry.version.startswith("other.txt@"))
+
+    def test_version_changes_within_the_same_second(self) -> None:
+        registry = ModelRegistry(self.path, _read_text)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns // 10**9 * 10**9))
+        self.assertEqual(registry.snapshot()[0], "v1")
+        before = registry.version
+
+        with open(self.path, "w") as fh:
+            fh.write("v2")
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns // 10**9 * 10**9 + 1000))
+        registry.reload(background=False)
+        self.assertEqual(registry.snapshot(), ("v2", registry.version))
+        self.assertNotEqual(registry.version, before)
+
+    def test_failed_reload_keeps_previous_model(self) -> None:
+        registry = ModelRegistry(self.path, _read_text)
+        registry.get()
+        registry.reload(os.path.join(self.tmp.name, "missing.txt"), background=False)
+        self.assertEqual(registry.get(), "v1")
+        self.assertIsNotNone(registry.last_error)
+
+    def test_watcher_picks_up_new_file(self) -> None:
+        registry = ModelRegistry(self.path, _read_text)
+        registry.get()
+        registry.start_watching(0.01)
+        try:
+            with open(self.path, "w") as fh:
+                fh.write("v2")
+            future = time.time() + 10
+            os.utime(self.path, (future, future))
+            deadline = time.time() + 5
+            while registry.get() != "v2" and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            registry.stop_watching()
+        self.assertEqual(registry.get(), "v2")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
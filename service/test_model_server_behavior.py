@@ -1,10 +1,15 @@
 """Tests for the /predict endpoint behaviour."""
 
 import json
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch
 
 import model_server
+from board_rules import BoardAnalysis
+from micro_batcher import MicroBatcher
 
 
 class PredictEndpointTests(unittest.TestCase):
@@ -30,8 +35,9 @@ class PredictEndpointTests(unittest.TestCase):
 
         fake_model = FakeModel()
 
-        with patch("model_server.load_model", return_value=fake_model), patch(
-            "model_server.valid_moves", return_value=["UP", "LEFT"]
+        with patch("model_server.load_model_snapshot", return_value=(fake_model, "fake@1")), patch(
+            "model_server.analyze_board",
+            return_value=BoardAnalysis([True, False, False, True], [0] * 4, grids=[grid] * 4),
         ) as mocked_valid_moves:
             response = self.client.post(
                 "/predict",
@@ -51,6 +57,160 @@ class PredictEndpointTests(unittest.TestCase):
         self.assertEqual(fake_model.last_features[0].shape, (16,))
         mocked_valid_moves.assert_called_once_with(grid)
 
+    def test_predict_batch_scores_all_grids_in_one_call(self) -> None:
+        """/predict_batch should call predict_proba once for the whole request."""
+
+        grids = [
+            [[2, 0, 0, 2], [4, 4, 0, 0], [0, 0, 8, 8], [16, 0, 16, 0]],
+            [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 0]],
+        ]
+
+        class FakeModel:
+            calls = 0
+
+            def predict_proba(self, features):  # type: ignore[override]
+                self.calls += 1
+                self.last_features = features
+                return [[0.1, 0.2, 0.3, 0.4], [0.7, 0.1, 0.15, 0.05]]
+
+        fake_model = FakeModel()
+
+        with patch("model_server.load_model_snapshot", return_value=(fake_model, "fake@1")):
+            response = self.client.post(
+                "/predict_batch",
+                data=json.dumps({"grids": grids, "include_next_grid": True}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        payload = response.get_json()
+        assert payload is not None
+        predictions = payload["predictions"]
+
+        self.assertEqual(fake_model.calls, 1)
+        self.assertEqual(fake_model.last_features.shape, (2, 16))
+        self.assertEqual([p["move"] for p in predictions], ["LEFT", "DOWN"])
+        self.assertFalse(predictions[0]["predicted_invalid"])
+        self.assertTrue(predictions[1]["predicted_invalid"])
+        self.assertEqual(predictions[1]["valid_moves"], ["RIGHT", "DOWN"])
+        self.assertEqual(predictions[0]["next_grid"][0], [4, 0, 0, 0])
+
+    def test_predict_returns_successors_and_rewards(self) -> None:
+        """include_successors lists every legal move's board and merge reward."""
+
+        grid = [[2, 2, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.7, 0.1, 0.1, 0.1]]
+
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            response = self.client.post(
+                "/predict", json={"grid": grid, "include_next_grid": True, "include_successors": True}
+            )
+
+        payload = response.get_json()
+        self.assertEqual(payload["move"], "RIGHT")
+        self.assertEqual(sorted(payload["successors"]), ["DOWN", "LEFT", "RIGHT"])
+        self.assertEqual(payload["successors"]["LEFT"], {"grid": [[4, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4], "reward": 4})
+        self.assertEqual(payload["successors"]["DOWN"]["reward"], 0)
+        self.assertEqual(payload["next_grid"], payload["successors"]["RIGHT"]["grid"])
+
+    def test_search_rejects_non_positive_time_budget(self) -> None:
+        """time_ms 0 or below would otherwise switch off the RF_SEARCH_MAX_TIME_MS deadline."""
+
+        grid = [[2, 2, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.7, 0.1, 0.1, 0.1]]
+
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            for time_ms in (0, -10):
+                response = self.client.post("/predict", json={"grid": grid, "search": {"depth": 5, "time_ms": time_ms}})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("time_ms", response.get_json()["error"])
+
+    def test_grids_with_non_tile_values_are_rejected(self) -> None:
+        """Grids were once fed through log2 unchecked; values that are not tiles now get a 400."""
+
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.7, 0.1, 0.1, 0.1]] * len(features)
+
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            for value, status in ((3, 400), (-2, 400), (1 << 17, 400), (1, 200), (1 << 16, 200)):
+                grid = [[value, 2, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+                for route, payload in (("/predict", {"grid": grid}), ("/predict_batch", {"grids": [grid]})):
+                    with self.subTest(value=value, route=route):
+                        response = self.client.post(route, json=payload)
+                        self.assertEqual(response.status_code, status)
+                        if status == 400:
+                            self.assertIn("powers of two", response.get_json()["error"])
+
+    def test_stalled_micro_batch_returns_503(self) -> None:
+        grid = [[2, 2, 0, 0], [0] * 4, [0] * 4, [0] * 4]
+        release = threading.Event()
+
+        def stalled(model, features):
+            release.wait(5)
+            return model.predict_proba(features)
+
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.7, 0.1, 0.1, 0.1]] * len(features)
+
+        batcher = MicroBatcher(stalled, max_delay=0.0)
+        try:
+            with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")), patch(
+                "model_server.get_batcher", return_value=batcher
+            ), patch("model_server.BATCH_TIMEOUT_MS", 20):
+                response = self.client.post("/predict", json={"grid": grid})
+        finally:
+            release.set()
+            batcher.close()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("timed out", response.get_json()["error"])
+
+
+class AdminReloadTests(unittest.TestCase):
+    """/admin/reload must not load arbitrary pickles for anonymous callers."""
+
+    def setUp(self) -> None:
+        self.client = model_server.app.test_client()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model_dir = os.path.realpath(self.tmp.name)
+        with open(os.path.join(self.model_dir, "candidate.pkl"), "wb") as fh:
+            fh.write(b"model")
+
+    def test_reload_is_disabled_without_configured_token(self) -> None:
+        with patch("model_server.ADMIN_TOKEN", None), patch.object(model_server.registry, "reload") as reload:
+            response = self.client.post("/admin/reload", json={"path": "candidate.pkl"})
+            wrong = self.client.post("/admin/reload", headers={"X-Admin-Token": ""}, json={})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(wrong.status_code, 403)
+        reload.assert_not_called()
+
+    def test_reload_requires_matching_token(self) -> None:
+        with patch("model_server.ADMIN_TOKEN", "secret"), patch.object(model_server.registry, "reload") as reload:
+            response = self.client.post("/admin/reload", headers={"X-Admin-Token": "guess"}, json={})
+        self.assertEqual(response.status_code, 403)
+        reload.assert_not_called()
+
+    def test_reload_only_accepts_paths_under_model_dir(self) -> None:
+        headers = {"X-Admin-Token": "secret"}
+        with patch("model_server.ADMIN_TOKEN", "secret"), patch("model_server.MODEL_DIR", self.model_dir), patch.object(
+            model_server.registry, "reload"
+        ) as reload, patch.object(model_server.registry, "status", return_value={}):
+            outside = self.client.post("/admin/reload", headers=headers, json={"path": "/etc/passwd"})
+            escape = self.client.post("/admin/reload", headers=headers, json={"path": "../candidate.pkl"})
+            inside = self.client.post("/admin/reload", headers=headers, json={"path": "candidate.pkl"})
+        self.assertEqual(outside.status_code, 400)
+        self.assertEqual(escape.status_code, 400)
+        self.assertEqual(inside.status_code, 202)
+        reload.assert_called_once_with(os.path.join(self.model_dir, "candidate.pkl"))
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
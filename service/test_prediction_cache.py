@@ -0,0 +1,57 @@
+"""Tests for the symmetry-folding prediction cache."""
+
+import unittest
+
+import numpy as np
+
+from board_rules import apply_symmetry, pack_board
+from prediction_cache import PredictionCache
+
+
+class PredictionCacheTests(unittest.TestCase):
+    """Cached probabilities must come back in the caller's move order."""
+
+    GRID = [[2, 0, 0, 0], [4, 0, 0, 0], [8, 0, 0, 0], [16, 2, 0, 0]]
+
+    def test_symmetric_boards_share_an_entry(self) -> None:
+        cache = PredictionCache(16, fold_symmetry=True)
+        packed = pack_board(self.GRID)
+        assert packed is not None
+        # UP, RIGHT, DOWN, LEFT
+        cache.put(packed, np.array([0.1, 0.2, 0.6, 0.1]), "v1")
+
+        # Mirroring columns swaps LEFT and RIGHT.
+        mirrored = apply_symmetry(packed, 1)
+        np.testing.assert_allclose(cache.get(mirrored, "v1"), [0.1, 0.1, 0.6, 0.2])
+        # Transposing swaps UP with LEFT and DOWN with RIGHT.
+        transposed = apply_symmetry(packed, 4)
+        np.testing.assert_allclose(cache.get(transposed, "v1"), [0.1, 0.6, 0.2, 0.1])
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+    def test_lru_eviction_and_version_change(self) -> None:
+        cache = PredictionCache(2)
+        for board in (1, 2, 3):
+            cache.put(board, np.full(4, board / 10.0), "v1")
+        self.assertIsNone(cache.get(1, "v1"))
+        self.assertIsNotNone(cache.get(3, "v1"))
+        self.assertIsNone(cache.get(3, "v2"))
+        # Stale entries are left for the LRU to evict rather than wiped.
+        self.assertEqual(cache.stats()["entries"], 2)
+        cache.put(3, np.full(4, 0.9), "v2")
+        cache.put(4, np.full(4, 0.9), "v2")
+        self.assertIsNone(cache.get(3, "v1"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_alternating_versions_keep_their_entries(self) -> None:
+        cache = PredictionCache(8)
+        cache.put(1, np.full(4, 0.1), "v1")
+        cache.put(1, np.full(4, 0.2), "v2")
+        for _ in range(3):
+            np.testing.assert_allclose(cache.get(1, "v1"), np.full(4, 0.1))
+            np.testing.assert_allclose(cache.get(1, "v2"), np.full(4, 0.2))
+        self.assertEqual(cache.stats()["hits"], 6)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
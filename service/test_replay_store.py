@@ -0,0 +1,172 @@
+"""Tests for the append-only replay store."""
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from unittest.mock import patch
+
+import numpy as np
+
+import model_server
+from board_rules import DIRECTION_NAMES
+from headless_game import HeadlessGame
+from log_ingest import load_move_arrays
+from replay_store import (
+    FLAG_INVALID,
+    FLAG_PREDICTED_INVALID,
+    FLAG_TRACE,
+    HEADER_SIZE,
+    RECORD_DTYPE,
+    SOURCE_SELFPLAY,
+    SOURCE_TRACE,
+    ReplayStore,
+    ReplayWriter,
+    convert_logs,
+    make_records,
+)
+from selfplay import RandomPolicy
+
+
+def _append_games(path: str, writer_id: int) -> None:
+    with ReplayWriter(path) as writer:
+        for game in range(20):
+            boards = [writer_id << 8 | game] * 50
+            writer.append(make_records(boards, [writer_id % 4] * 50, [2] * 50, [0] * 50, writer_id * 1000 + game, 1))
+
+
+def _write_game(path: str, seed: int) -> None:
+    game = HeadlessGame(seed=seed, record_log=True)
+    policy = RandomPolicy(seed)
+    logged_invalid = False
+    while not game.over:
+        illegal = [d for d in DIRECTION_NAMES if d not in game.valid_moves()]
+        if illegal and not logged_invalid:
+            game.move(illegal[0])  # stored with FLAG_INVALID and left out of move_arrays()
+            logged_invalid = True
+        game.move(policy.choose([game.board])[0])
+    with open(path, "w") as fh:
+        fh.write(game.export_log())
+
+
+class ReplayStoreTests(unittest.TestCase):
+    """Records must round-trip and survive concurrent writers."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "replay.bin")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_append_read_and_refresh(self) -> None:
+        with ReplayWriter(self.path) as writer:
+            flags = [0, FLAG_INVALID, 0]
+            writer.append(make_records([1, 2, 3], [0, 1, 2], [0, 4, 8], [0, 0, 4], 7, SOURCE_SELFPLAY, flags))
+            store = ReplayStore(self.path)
+            self.assertEqual(len(store), 3)
+            self.assertEqual(int(store[1]["board"]), 2)
+            writer.append(make_records([4], [3], [16], [12], 7, SOURCE_SELFPLAY, first_move=3))
+
+        # A torn trailing record is ignored.
+        with open(self.path, "ab") as fh:
+            fh.write(b"\1" * (RECORD_DTYPE.itemsize // 2))
+        self.assertEqual(store.refresh(), 4)
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + 4.5 * RECORD_DTYPE.itemsize)
+        self.assertEqual(store.game(7)["move_index"].tolist(), [0, 1, 2, 3])
+        self.assertEqual(set(store.sample(50, np.random.default_rng(0))["board"].tolist()), {1, 3, 4})
+        exponents, actions, rewards = store.move_arrays()
+        self.assertEqual(actions.tolist(), [0, 2, 3])
+        self.assertEqual(rewards.tolist(), [0, 8, 16])
+        self.assertEqual(exponents.shape, (3, 16))
+
+    def test_append_after_torn_record_stays_aligned(self) -> None:
+        with ReplayWriter(self.path) as writer:
+            writer.append(make_records([1, 2], [0, 1], [0, 4], [0, 0], 7, SOURCE_SELFPLAY))
+            with open(self.path, "ab") as fh:
+                fh.write(b"\1" * (RECORD_DTYPE.itemsize // 2))
+            writer.append(make_records([3], [2], [8], [4], 7, SOURCE_SELFPLAY, first_move=2))
+
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + 3 * RECORD_DTYPE.itemsize)
+        store = ReplayStore(self.path)
+        self.assertEqual(store[:]["board"].tolist(), [1, 2, 3])
+        self.assertEqual(store.game(7)["move_index"].tolist(), [0, 1, 2])
+
+    def test_failed_write_leaves_no_partial_record(self) -> None:
+        with ReplayWriter(self.path) as writer:
+            writer.append(make_records([1], [0], [0], [0], 7, SOURCE_SELFPLAY))
+            real_write = os.write
+            # The first call lands part of a record, the second writes nothing.
+            partial = [lambda fd, data: real_write(fd, data[:10]), lambda fd, data: 0]
+            with patch("replay_store.os.write", side_effect=lambda fd, data: partial.pop(0)(fd, data)), self.assertRaises(
+                OSError
+            ):
+                writer.append(make_records([2], [1], [4], [0], 7, SOURCE_SELFPLAY, first_move=1))
+        self.assertEqual(os.path.getsize(self.path), HEADER_SIZE + RECORD_DTYPE.itemsize)
+
+    def test_concurrent_writers(self) -> None:
+        ReplayWriter(self.path).close()
+        processes = [multiprocessing.Process(target=_append_games, args=(self.path, i)) for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        store = ReplayStore(self.path)
+        self.assertEqual(len(store), 4 * 20 * 50)
+        self.assertEqual(len(store.game_ids()), 80)
+        for game_id in store.game_ids():
+            game = store.game(int(game_id))
+            writer_id, index = divmod(int(game_id), 1000)
+            self.assertEqual(game["board"].tolist(), [writer_id << 8 | index] * 50)
+            self.assertEqual(game["move_index"].tolist(), list(range(50)))
+
+    def test_convert_logs_matches_json_loader(self) -> None:
+        logs = [os.path.join(self.tmp.name, f"game_{seed}.json") for seed in range(2)]
+        for seed, path in enumerate(logs):
+            _write_game(path, seed)
+        written = convert_logs(logs, self.path, processes=1, verbose=False)
+
+        store = ReplayStore(self.path)
+        self.assertEqual(len(store), written)
+        self.assertEqual(len(store.game_ids()), 2)
+        self.assertEqual(store.stats()["invalid"], 2)
+        expected = load_move_arrays(logs, processes=1, verbose=False)
+        for actual, wanted in zip(store.move_arrays(), expected):
+            np.testing.assert_array_equal(np.sort(actual, axis=0), np.sort(wanted, axis=0))
+
+    def test_server_traces_served_moves(self) -> None:
+        class FakeModel:
+            def predict_proba(self, features):  # type: ignore[override]
+                return [[0.9, 0.05, 0.03, 0.02]] * len(features)
+
+        grid = [[2, 4, 8, 16], [0] * 4, [0] * 4, [0] * 4]
+        client = model_server.app.test_client()
+        with ReplayWriter(self.path) as writer, patch.object(model_server, "trace_writer", writer), patch(
+            "model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")
+        ):
+            client.post("/predict", json={"grid": grid})
+            started = client.post("/session", json={"grid": grid}).get_json()
+            client.post(f"/session/{started['session_id']}/step", json={"spawn": None})
+
+            client.post("/predict", json={"grid": grid})
+
+        store = ReplayStore(self.path)
+        self.assertEqual(len(store), 4)
+        self.assertTrue((store[:]["source"] == SOURCE_TRACE).all())
+        self.assertTrue((store[:]["flags"] & FLAG_TRACE).all())
+        self.assertEqual(store[0]["flags"], FLAG_TRACE | FLAG_PREDICTED_INVALID)  # UP is illegal on this board
+        session_moves = store[1:3]
+        self.assertEqual(len(set(session_moves["game_id"].tolist())), 1)
+        self.assertEqual(session_moves["move_index"].tolist(), [0, 1])
+        # Each move outside a session is its own game.
+        self.assertEqual(len(set(store[:]["game_id"].tolist()) - {0}), 3)
+        self.assertEqual(store[3]["move_index"], 0)
+        # Traces never reach training data.
+        self.assertEqual(len(store.move_arrays()[0]), 0)
+        self.assertEqual(store.stats()["traced"], 4)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
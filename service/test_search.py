@@ -0,0 +1,66 @@
+"""Tests for the expectimax search engine."""
+
+import unittest
+
+from unittest.mock import patch
+
+import numpy as np
+
+from board_rules import pack_board, valid_moves
+from prediction import run_search
+from search import ExpectimaxSearch
+
+
+class ExpectimaxSearchTests(unittest.TestCase):
+    """Search must stay legal and respect its budgets."""
+
+    GRID = [[2, 0, 0, 2], [4, 4, 0, 0], [0, 0, 8, 8], [16, 0, 16, 0]]
+
+    def test_returns_legal_move_with_stats(self) -> None:
+        move, stats = ExpectimaxSearch(max_depth=2, time_budget=None).search(pack_board(self.GRID))
+        self.assertIn(move, valid_moves(self.GRID))
+        self.assertEqual(stats["depth"], 2)
+        self.assertGreater(stats["nodes"], 0)
+
+    def test_node_budget_stops_deepening(self) -> None:
+        engine = ExpectimaxSearch(max_depth=6, time_budget=None, node_budget=500)
+        move, stats = engine.search(pack_board(self.GRID))
+        self.assertIn(move, valid_moves(self.GRID))
+        self.assertLess(stats["depth"], 6)
+
+    def test_prior_prunes_unlikely_moves(self) -> None:
+        engine = ExpectimaxSearch(max_depth=2, time_budget=None, prior_prune=0.5)
+        move, _ = engine.search(pack_board(self.GRID), prior=[0.05, 0.05, 0.1, 0.8])
+        self.assertEqual(move, "LEFT")
+
+    def test_no_legal_moves(self) -> None:
+        grid = [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]]
+        move, _ = ExpectimaxSearch(max_depth=2).search(pack_board(grid))
+        self.assertIsNone(move)
+
+
+class RunSearchLimitTests(unittest.TestCase):
+    """Per-request budgets cannot exceed or switch off the server limits."""
+
+    GRID = ExpectimaxSearchTests.GRID
+    PRIOR = np.full(4, 0.25)
+
+    def test_rejects_non_positive_budgets(self) -> None:
+        for options in ({"time_ms": 0}, {"time_ms": -5}, {"time_ms": "nan"}, {"nodes": 0}, {"nodes": -1}):
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                run_search(self.GRID, self.PRIOR, dict(options, depth=5))
+
+    def test_zero_time_budget_still_has_a_deadline(self) -> None:
+        _, stats = ExpectimaxSearch(max_depth=8, time_budget=0.0).search(pack_board(self.GRID))
+        self.assertLess(stats["depth"], 8)
+
+    def test_budgets_are_clamped_to_server_limits(self) -> None:
+        with patch("prediction.SEARCH_MAX_NODES", 300):
+            move, stats = run_search(self.GRID, self.PRIOR, {"depth": 5, "time_ms": 10**9, "nodes": 10**9})
+        self.assertIn(move, valid_moves(self.GRID))
+        self.assertLess(stats["depth"], 5)
+        self.assertLessEqual(stats["nodes"], 301)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
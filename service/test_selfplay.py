@@ -0,0 +1,55 @@
+"""Tests for the headless game and self-play runner."""
+
+import unittest
+
+import numpy as np
+
+from board_rules import pack_board
+from headless_game import HeadlessGame, merge_events
+from selfplay import ModelPolicy, RandomPolicy, packed_features, play_games
+
+
+class HeadlessGameTests(unittest.TestCase):
+    """The headless game should follow the browser rules and log format."""
+
+    def test_games_are_reproducible_and_logged(self) -> None:
+        first = play_games(RandomPolicy(1), [5, 6])
+        second = play_games(RandomPolicy(1), [5, 6])
+        self.assertEqual(first, second)
+
+        game = HeadlessGame(seed=3, record_log=True)
+        policy = RandomPolicy(0)
+        while not game.over:
+            game.move(policy.choose([game.board])[0])
+        moves = [entry for entry in game.log if entry["type"] == "move"]
+        self.assertEqual(game.log[-1]["type"], "gameEnd")
+        self.assertEqual(game.log[-1]["score"], game.score)
+        for entry in moves:
+            gained = entry["next"]["score"] - entry["prev"]["score"]
+            self.assertEqual(gained, sum(m["result"] for m in entry["merges"]))
+            self.assertTrue(entry["valid"])
+
+    def test_merge_events_match_game_manager(self) -> None:
+        grid = [[0, 2, 2, 0], [0] * 4, [0] * 4, [4, 0, 4, 4]]
+        self.assertEqual(
+            merge_events(grid, "LEFT"),
+            [
+                {"from": [0, 2], "into": [0, 0], "value": 2, "result": 4},
+                {"from": [3, 2], "into": [3, 0], "value": 4, "result": 8},
+            ],
+        )
+
+    def test_model_policy_masks_invalid_predictions(self) -> None:
+        class AlwaysUp:
+            def predict_proba(self, features):  # type: ignore[override]
+                return np.tile([0.7, 0.1, 0.15, 0.05], (len(features), 1))
+
+        board = pack_board([[2, 4, 8, 16], [0] * 4, [0] * 4, [0] * 4])
+        policy = ModelPolicy(AlwaysUp())
+        self.assertEqual(policy.choose([board]), ["DOWN"])
+        self.assertEqual(policy.invalid_predictions, 1)
+        np.testing.assert_allclose(packed_features([board])[0, :4], [1 / 16, 2 / 16, 3 / 16, 4 / 16])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
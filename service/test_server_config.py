@@ -0,0 +1,31 @@
+"""Tests for the settings shared by the Flask and ASGI services."""
+
+import os
+import unittest
+from unittest.mock import patch
+
+from server_config import allowed_origins, resolve_model_path
+
+
+class ServerConfigTests(unittest.TestCase):
+    """Both services must read the environment the same way."""
+
+    def test_allowed_origins_splits_and_strips(self) -> None:
+        self.assertEqual(allowed_origins("http://a.test, http://b.test ,"), ["http://a.test", "http://b.test"])
+        self.assertEqual(allowed_origins(""), ["*"])
+        with patch.dict(os.environ, {"RF_ALLOWED_ORIGINS": " http://game.test "}):
+            self.assertEqual(allowed_origins(), ["http://game.test"])
+        with patch.dict(os.environ):
+            os.environ.pop("RF_ALLOWED_ORIGINS", None)
+            self.assertEqual(allowed_origins(), ["*"])
+
+    def test_model_path_prefers_environment(self) -> None:
+        with patch.dict(os.environ, {"RF_MODEL_PATH": "models/candidate"}):
+            self.assertEqual(resolve_model_path(), os.path.abspath("models/candidate"))
+        with patch.dict(os.environ):
+            os.environ.pop("RF_MODEL_PATH", None)
+            self.assertTrue(resolve_model_path().endswith("random_forest_2048.pkl"))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
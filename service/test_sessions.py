@@ -0,0 +1,84 @@
+"""Tests for server-side game sessions and the /session endpoints."""
+
+import time
+import unittest
+from unittest.mock import patch
+
+import model_server
+from sessions import SessionStore, SpawnMismatch
+
+
+class FakeModel:
+    def predict_proba(self, features):  # type: ignore[override]
+        return [[0.05, 0.9, 0.03, 0.02] for _ in features]
+
+
+class SessionEndpointTests(unittest.TestCase):
+    """Delta requests must rebuild the same board the client sees."""
+
+    def setUp(self) -> None:
+        self.client = model_server.app.test_client()
+        self.patcher = patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1"))
+        self.patcher.start()
+
+    def tearDown(self) -> None:
+        self.patcher.stop()
+
+    def test_spawn_deltas_track_the_board(self) -> None:
+        grid = [[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2]]
+        response = self.client.post("/session", json={"grid": grid})
+        self.assertEqual(response.status_code, 201)
+        started = response.get_json()
+        self.assertEqual(started["move"], "RIGHT")
+        self.assertNotIn("next_grid", started)
+        session_id = started["session_id"]
+
+        step = self.client.post(
+            f"/session/{session_id}/step",
+            json={"spawn": {"row": 1, "col": 0, "value": 4}, "include_next_grid": True},
+        ).get_json()
+        # The server played RIGHT on its copy and added the reported 4 ...
+        self.assertEqual(step["valid_moves"], ["UP", "RIGHT", "DOWN", "LEFT"])
+        # ... so this RIGHT slides that 4 across to join the column of 2s.
+        self.assertEqual(step["next_grid"], [[0, 0, 0, 2], [0, 0, 0, 4], [0, 0, 0, 0], [0, 0, 0, 2]])
+        self.assertEqual(model_server.sessions.get(session_id).board, step["next_grid"])
+
+    def test_mismatched_spawn_and_unknown_sessions(self) -> None:
+        grid = [[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        session_id = self.client.post("/session", json={"grid": grid}).get_json()["session_id"]
+
+        occupied = self.client.post(f"/session/{session_id}/step", json={"spawn": {"row": 0, "col": 3, "value": 2}})
+        self.assertEqual(occupied.status_code, 409)
+        resync = self.client.post(f"/session/{session_id}/step", json={"grid": grid})
+        self.assertEqual(resync.status_code, 200)
+
+        self.assertEqual(self.client.delete(f"/session/{session_id}").status_code, 204)
+        missing = self.client.post(f"/session/{session_id}/step", json={"spawn": None})
+        self.assertEqual(missing.status_code, 404)
+
+
+class SessionStoreTests(unittest.TestCase):
+    """The store evicts idle and least recently used sessions."""
+
+    def test_expiry_and_capacity(self) -> None:
+        store = SessionStore(max_sessions=2, ttl_seconds=60)
+        first, second = store.create([[0] * 4] * 4), store.create([[0] * 4] * 4)
+        store.get(first.session_id)
+        store.create([[0] * 4] * 4)
+        self.assertIsNone(store.get(second.session_id))
+        self.assertIsNotNone(store.get(first.session_id))
+
+        store.ttl_seconds = 0.0
+        time.sleep(0.01)
+        self.assertIsNone(store.get(first.session_id))
+        self.assertEqual(store.stats()["active"], 0)
+
+    def test_spawn_validation(self) -> None:
+        session = SessionStore().create([[2, 0, 0, 0], [0] * 4, [0] * 4, [0] * 4])
+        for spawn in ({"row": 0, "col": 0, "value": 2}, {"row": 4, "col": 0, "value": 2}, {"row": 1, "col": 1, "value": 8}):
+            with self.subTest(spawn=spawn), self.assertRaises(SpawnMismatch):
+                session.apply_spawn(spawn)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
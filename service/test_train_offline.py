@@ -0,0 +1,109 @@
+"""Tests for incremental and resumed training in train_offline.py."""
+
+import importlib.util
+import json
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from headless_game import HeadlessGame
+from selfplay import RandomPolicy
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _write_game(path: str, seed: int, moves=None) -> int:
+    """Log one seeded random game, optionally restricted to ``moves``; return the moves played."""
+
+    game = HeadlessGame(seed=seed, record_log=True)
+    policy = RandomPolicy(seed)
+    played = 0
+    while not game.over:
+        if moves is None:
+            move = policy.choose([game.board])[0]
+        else:
+            legal = [move for move in moves if move in game.valid_moves()]
+            if not legal:
+                break
+            move = legal[0]
+        game.move(move)
+        played += 1
+    with open(path, "w") as fh:
+        fh.write(game.export_log())
+    return played
+
+
+@unittest.skipIf(importlib.util.find_spec("stable_baselines3") is None, "stable_baselines3 is not installed")
+class IncrementalTrainingTests(unittest.TestCase):
+    """Each chunk must add trees over all four moves, and --resume only the new logs."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_dir = os.path.join(self.tmp.name, "logs")
+        os.makedirs(self.data_dir)
+        self.output = os.path.join(self.tmp.name, "model.pkl")
+        self.metrics_file = os.path.join(self.tmp.name, "runs.jsonl")
+        if REPO_ROOT not in sys.path:
+            sys.path.insert(0, REPO_ROOT)
+        import train_offline
+
+        self.train_offline = train_offline
+
+    def _train(self, *extra: str):
+        argv = [
+            "train_offline.py",
+            "--data-dir", self.data_dir,
+            "--output", self.output,
+            "--metrics-file", self.metrics_file,
+            "--incremental",
+            "--chunk-rows", "1",
+            "--trees-per-chunk", "2",
+            "--n-jobs", "1",
+            *extra,
+        ]
+        with patch.object(sys, "argv", argv):
+            self.train_offline.main()
+        with open(self.output, "rb") as fh:
+            model = pickle.load(fh)
+        with open(self.metrics_file) as fh:
+            metrics = json.loads(fh.readlines()[-1])
+        return model, metrics
+
+    def test_incremental_adds_trees_per_chunk(self) -> None:
+        moves = sum(_write_game(os.path.join(self.data_dir, f"game{seed}.json"), seed) for seed in range(2))
+        model, metrics = self._train()
+        self.assertEqual(len(model.estimators_), 4)
+        self.assertEqual(model.classes_.tolist(), [0, 1, 2, 3])
+        self.assertEqual(metrics["samples"], moves)
+        self.assertEqual(metrics["trees_trained"], 4)
+
+    def test_resume_trains_only_new_files(self) -> None:
+        _write_game(os.path.join(self.data_dir, "game0.json"), 0)
+        self._train()
+        new_moves = _write_game(os.path.join(self.data_dir, "game1.json"), 1)
+
+        model, metrics = self._train("--resume")
+        self.assertEqual(len(model.estimators_), 4)
+        self.assertEqual(metrics["trees_trained"], 2)
+        self.assertEqual(metrics["samples"], new_moves)
+
+    def test_chunk_missing_moves_is_still_trained(self) -> None:
+        # The first chunk never plays UP or RIGHT; it must neither be skipped nor narrow the forest's classes.
+        partial = _write_game(os.path.join(self.data_dir, "game0.json"), 0, moves=["LEFT", "DOWN"])
+        full = _write_game(os.path.join(self.data_dir, "game1.json"), 1)
+        model, metrics = self._train()
+        self.assertEqual(len(model.estimators_), 4)
+        self.assertEqual(model.classes_.tolist(), [0, 1, 2, 3])
+        self.assertEqual(metrics["samples"], partial + full)
+        probabilities = model.predict_proba(np.zeros((1, model.n_features_in_)))
+        self.assertEqual(probabilities.shape, (1, 4))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Tests for the vectorized RL environment."""
+
+import unittest
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, move_packed_with_score
+from features import packed_exponents
+from vector_env import VectorGame2048, gymnasium
+
+
+def _random_legal_actions(rng: np.random.Generator, mask: np.ndarray) -> np.ndarray:
+    return np.where(mask, rng.random(mask.shape), -1.0).argmax(axis=1)
+
+
+class VectorGameTests(unittest.TestCase):
+    """The batched environment must follow the HeadlessGame rules."""
+
+    def test_steps_follow_the_game_rules(self) -> None:
+        env = VectorGame2048(64, seed=1)
+        obs, info = env.reset()
+        self.assertEqual(obs.shape, (64, 16))
+        self.assertTrue(((obs > 0).sum(axis=1) == 2).all())
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            before = [int(board) for board in env.boards]
+            mask = info["action_mask"]
+            actions = _random_legal_actions(rng, mask)
+            obs, rewards, terminated, truncated, info = env.step(actions)
+            self.assertFalse(truncated.any())
+            for idx, board in enumerate(before):
+                moved, gained = move_packed_with_score(board, DIRECTION_NAMES[actions[idx]])
+                self.assertEqual(rewards[idx], gained)
+                source = info["final_obs"][idx] if terminated[idx] else obs[idx]
+                added = source.astype(int) - packed_exponents([moved])[0]
+                # Exactly one new tile, a 2 or a 4, on a cell that was empty.
+                self.assertEqual(int((added != 0).sum()), 1)
+                self.assertIn(int(added.max()), (1, 2))
+
+    def test_invalid_actions_and_truncation(self) -> None:
+        env = VectorGame2048(8, seed=2, max_steps=3, invalid_action_reward=-1.0)
+        env.reset()
+        illegal = (~env.action_masks()).argmax(axis=1)
+        has_illegal = (~env.action_masks()).any(axis=1)
+        boards = env.boards.copy()
+        _, rewards, _, truncated, _ = env.step(illegal)
+        np.testing.assert_array_equal(rewards[has_illegal], -1.0)
+        np.testing.assert_array_equal(env.boards[has_illegal], boards[has_illegal])
+        self.assertFalse(truncated.any())
+
+        for _ in range(2):
+            _, _, terminated, truncated, info = env.step(env.action_masks().argmax(axis=1))
+        self.assertTrue((truncated | terminated).all())
+        self.assertIn("final_score", info)
+        self.assertTrue((env.steps == 0).all())
+
+    def test_seeded_runs_are_reproducible(self) -> None:
+        def play(seed: int) -> np.ndarray:
+            env = VectorGame2048(16, seed=seed)
+            _, info = env.reset()
+            rng = np.random.default_rng(seed)
+            total = np.zeros(16)
+            for _ in range(50):
+                _, rewards, _, _, info = env.step(_random_legal_actions(rng, info["action_mask"]))
+                total += rewards
+            return total
+
+        np.testing.assert_array_equal(play(3), play(3))
+
+    @unittest.skipIf(gymnasium is None, "gymnasium is not installed")
+    def test_gymnasium_spaces(self) -> None:  # pragma: no cover - optional dependency
+        env = VectorGame2048(4, seed=0)
+        obs, _ = env.reset()
+        self.assertTrue(env.observation_space.contains(obs))
+        self.assertTrue(env.single_action_space.contains(0))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Tests for the binary /predict wire format."""
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import model_server
+from board_rules import DIRECTION_NAMES, pack_board
+from features import MAX_EXPONENT, exponent_features, preprocess_boards
+from wire import (
+    BOARD_MEDIA_TYPE,
+    FLAG_PREDICTED_INVALID,
+    PACKED_MEDIA_TYPE,
+    PREDICTION_DTYPE,
+    PREDICTION_MEDIA_TYPE,
+    decode_boards,
+    decode_predictions,
+    exponents_to_packed,
+)
+
+
+class FakeModel:
+    def predict_proba(self, features):  # type: ignore[override]
+        self.last_features = np.asarray(features)
+        return np.tile([0.05, 0.9, 0.03, 0.02], (len(features), 1))
+
+
+class WireFormatTests(unittest.TestCase):
+    """Binary requests must describe the same boards as their JSON grids."""
+
+    def setUp(self) -> None:
+        self.grids = [
+            [[2, 4, 8, 16], [4, 8, 16, 32], [8, 16, 32, 64], [16, 32, 64, 128]],
+            [[2, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 2]],
+        ]
+        self.exponents = np.array(
+            [[int(v).bit_length() - 1 if v else 0 for row in grid for v in row] for grid in self.grids], dtype=np.uint8
+        )
+
+    def test_board_and_packed_encodings_agree(self) -> None:
+        packed = np.array([pack_board(grid) for grid in self.grids], dtype="<u8")
+        np.testing.assert_array_equal(exponents_to_packed(self.exponents), packed)
+        np.testing.assert_array_equal(decode_boards(packed.tobytes(), PACKED_MEDIA_TYPE), self.exponents)
+        decoded = decode_boards(self.exponents.tobytes(), BOARD_MEDIA_TYPE)
+        np.testing.assert_array_equal(decoded, self.exponents)
+        self.assertEqual(PREDICTION_DTYPE.itemsize, 20)
+        with self.assertRaises(ValueError):
+            decode_boards(b"\x00" * 15, BOARD_MEDIA_TYPE)
+
+    def test_binary_predict_round_trip(self) -> None:
+        client = model_server.app.test_client()
+        fake = FakeModel()
+        with patch("model_server.load_model_snapshot", return_value=(fake, "fake@1")):
+            response = client.post("/predict_batch", data=self.exponents.tobytes(), content_type=BOARD_MEDIA_TYPE)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, PREDICTION_MEDIA_TYPE)
+        records = decode_predictions(response.data)
+        self.assertEqual(len(records), 2)
+        np.testing.assert_allclose(fake.last_features[1, 0], 1 / 16)
+
+        # The full staircase board has no legal move: the argmax is kept and flagged.
+        self.assertEqual(records[0]["move"], 1)
+        self.assertEqual(records[0]["valid"], 0)
+        self.assertEqual(records[0]["flags"], FLAG_PREDICTED_INVALID)
+        self.assertEqual(records[1]["move"], 1)
+        self.assertEqual(records[1]["valid"], 0b1111)
+        self.assertEqual(records[1]["flags"], 0)
+        np.testing.assert_allclose(records[1]["probabilities"], [0.05, 0.9, 0.03, 0.02], rtol=1e-6)
+
+    def test_invalid_argmax_is_flagged_and_replaced(self) -> None:
+        grid = [[0, 0, 0, 2], [0, 0, 0, 4], [0, 0, 0, 8], [0, 0, 0, 16]]
+        exponents = np.array([[int(v).bit_length() - 1 if v else 0 for row in grid for v in row]], dtype=np.uint8)
+        client = model_server.app.test_client()
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            response = client.post("/predict", data=exponents.tobytes(), content_type=BOARD_MEDIA_TYPE)
+            refused = client.post(
+                "/predict",
+                data=exponents.tobytes(),
+                content_type=BOARD_MEDIA_TYPE,
+                headers={"Accept": "application/json"},
+            )
+        record = decode_predictions(response.data)[0]
+        self.assertEqual(record["flags"], FLAG_PREDICTED_INVALID)
+        self.assertEqual(record["move"], 3)  # LEFT: the best legal move
+        self.assertEqual(refused.status_code, 406)
+
+    def test_exponent_limit_matches_json_grids(self) -> None:
+        # A 65536 tile is the largest a JSON grid accepts; the board encoding must take it too.
+        grid = [[65536, 32768, 0, 0], [2, 2, 0, 0], [0] * 4, [0] * 4]
+        exponents = np.array([[int(v).bit_length() - 1 if v else 0 for row in grid for v in row]], dtype=np.uint8)
+        self.assertEqual(int(exponents.max()), MAX_EXPONENT)
+        np.testing.assert_array_equal(preprocess_boards([grid]), exponent_features(exponents))
+        too_large = exponents.copy()
+        too_large[0, 0] = MAX_EXPONENT + 1
+        with self.assertRaises(ValueError):
+            decode_boards(too_large.tobytes(), BOARD_MEDIA_TYPE)
+        with self.assertRaises(ValueError):
+            preprocess_boards([[[1 << (MAX_EXPONENT + 1), 0, 0, 0], [0] * 4, [0] * 4, [0] * 4]])
+
+        client = model_server.app.test_client()
+        with patch("model_server.load_model_snapshot", return_value=(FakeModel(), "fake@1")):
+            response = client.post("/predict", data=exponents.tobytes(), content_type=BOARD_MEDIA_TYPE)
+            expected = client.post("/predict", json={"grid": grid}).get_json()
+        self.assertEqual(response.status_code, 200)
+        record = decode_predictions(response.data)[0]
+        allowed = [name for bit, name in enumerate(DIRECTION_NAMES) if record["valid"] & (1 << bit)]
+        self.assertEqual(sorted(allowed), sorted(expected["valid_moves"]))
+        self.assertEqual(DIRECTION_NAMES[record["move"]], expected["move"])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
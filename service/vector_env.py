@@ -0,0 +1,163 @@
+"""Vectorized 2048 environment for reinforcement learning.
+
+``VectorGame2048`` steps ``num_envs`` games at once. All state lives in NumPy
+arrays: one ``uint64`` packed board per game (the ``board_rules`` layout),
+plus scores and step counts. Every step is a handful of table lookups over the
+whole batch (``board_rules.move_boards``). The rules follow ``HeadlessGame``
+and the browser: a move that changes the board spawns a 2 (90%) or a 4 (10%)
+on a random empty cell, and a game ends when no move is left.
+
+Observations are the ``(num_envs, 16)`` ``uint8`` tile exponents. The reward
+is the score gained from merges, the same ``next.score - prev.score`` that
+``train_offline.py`` reads from game logs. An illegal action leaves the board
+unchanged and earns ``invalid_action_reward`` (``0`` by default).
+``info["action_mask"]`` holds the ``(num_envs, 4)`` legal moves, ordered like
+``DIRECTION_NAMES``; ``action_masks()`` returns the same array, as masked
+policies such as ``sb3_contrib.MaskablePPO`` expect.
+
+When ``gymnasium`` is installed the class is a ``gymnasium.vector.VectorEnv``
+with ``Box``/``Discrete`` spaces. Finished games reset in the same step: the
+returned observation is already the next game's, and the last board and
+score are in ``info["final_obs"]`` and ``info["final_score"]``.
+
+Usage::
+
+    env = VectorGame2048(num_envs=1024, seed=0)
+    obs, info = env.reset()
+    while training:
+        actions = policy(obs, info["action_mask"])
+        obs, rewards, terminated, truncated, info = env.step(actions)
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, move_boards
+from features import packed_exponents
+
+try:
+    import gymnasium
+    from gymnasium import spaces
+except ImportError:  # pragma: no cover - gymnasium is optional
+    gymnasium = None
+
+_VectorEnvBase: Any = gymnasium.vector.VectorEnv if gymnasium is not None else object
+
+_NIBBLE_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+# Exponents stay below 16 (see board_rules.MAX_PACKED_EXPONENT).
+MAX_EXPONENT = 15
+
+
+class VectorGame2048(_VectorEnvBase):
+    """``num_envs`` independent 2048 games stepped together."""
+
+    metadata: Dict[str, Any] = {"render_modes": []}
+    if gymnasium is not None and hasattr(gymnasium.vector, "AutoresetMode"):
+        metadata["autoreset_mode"] = gymnasium.vector.AutoresetMode.SAME_STEP
+
+    def __init__(
+        self,
+        num_envs: int,
+        seed: Optional[int] = None,
+        max_steps: Optional[int] = None,
+        invalid_action_reward: float = 0.0,
+    ) -> None:
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.invalid_action_reward = invalid_action_reward
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.zeros(num_envs, dtype=np.uint64)
+        self.scores = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        # Successors of the current boards, shared by the action mask and step.
+        self._successors = np.zeros((num_envs, len(DIRECTION_NAMES)), dtype=np.uint64)
+        self._merge_scores = np.zeros((num_envs, len(DIRECTION_NAMES)), dtype=np.int64)
+        self._rows = np.arange(num_envs)
+
+        if gymnasium is not None:
+            self.single_observation_space = spaces.Box(0, MAX_EXPONENT, shape=(16,), dtype=np.uint8)
+            self.single_action_space = spaces.Discrete(len(DIRECTION_NAMES))
+            self.observation_space = spaces.Box(0, MAX_EXPONENT, shape=(num_envs, 16), dtype=np.uint8)
+            self.action_space = spaces.MultiDiscrete(np.full(num_envs, len(DIRECTION_NAMES)))
+
+    def _spawn(self, which: np.ndarray) -> None:
+        """Add a 2 (90%) or 4 (10%) on a random empty cell of the selected boards."""
+
+        if not which.any():
+            return
+        boards = self.boards[which]
+        empty = ((boards[:, None] >> _NIBBLE_SHIFTS) & np.uint64(0xF)) == 0
+        # The largest random key among the empty cells is a uniform choice.
+        keys = np.where(empty, self.rng.random(empty.shape), -1.0)
+        cells = keys.argmax(axis=1)
+        exponents = np.where(self.rng.random(len(boards)) < 0.9, 1, 2).astype(np.uint64)
+        has_room = empty.any(axis=1)
+        boards |= np.where(has_room, exponents << (cells.astype(np.uint64) * np.uint64(4)), np.uint64(0))
+        self.boards[which] = boards
+
+    def _reset_boards(self, which: np.ndarray) -> None:
+        self.boards[which] = 0
+        self.scores[which] = 0
+        self.steps[which] = 0
+        self._spawn(which)
+        self._spawn(which)
+
+    def _analyze(self) -> np.ndarray:
+        self._successors, self._merge_scores = move_boards(self.boards)
+        return self.action_masks()
+
+    def action_masks(self) -> np.ndarray:
+        """``(num_envs, 4)`` legal moves of the current boards."""
+
+        return self._successors != self.boards[:, None]
+
+    def observations(self) -> np.ndarray:
+        return packed_exponents(self.boards)
+
+    def reset(
+        self, *, seed: Optional[int] = None, options: Optional[Dict] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self._reset_boards(np.ones(self.num_envs, dtype=bool))
+        mask = self._analyze()
+        return self.observations(), {"action_mask": mask, "score": self.scores.copy()}
+
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Dict[str, Any]]:
+        actions = np.asarray(actions, dtype=np.intp)
+        chosen = self._successors[self._rows, actions]
+        moved = chosen != self.boards
+        gained = np.where(moved, self._merge_scores[self._rows, actions], 0)
+        rewards = np.where(moved, gained, self.invalid_action_reward).astype(np.float32)
+
+        self.boards = np.where(moved, chosen, self.boards)
+        self.scores += gained
+        self.steps += 1
+        self._spawn(moved)
+
+        mask = self._analyze()
+        terminated = ~mask.any(axis=1)
+        truncated = np.zeros(self.num_envs, dtype=bool)
+        if self.max_steps is not None:
+            truncated = ~terminated & (self.steps >= self.max_steps)
+
+        info: Dict[str, Any] = {}
+        done = terminated | truncated
+        if done.any():
+            info["final_obs"] = np.where(done[:, None], self.observations(), 0).astype(np.uint8)
+            info["final_score"] = np.where(done, self.scores, 0)
+            info["final_max_exponent"] = np.where(done, info["final_obs"].max(axis=1), 0)
+            self._reset_boards(done)
+            self._successors[done], self._merge_scores[done] = move_boards(self.boards[done])
+            mask = self.action_masks()
+        info["action_mask"] = mask
+        info["score"] = self.scores.copy()
+        return self.observations(), rewards, terminated, truncated, info
+
+    def close(self, **kwargs: Any) -> None:
+        pass
+
+
+__all__ = ["MAX_EXPONENT", "VectorGame2048"]
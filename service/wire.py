@@ -0,0 +1,120 @@
+"""Compact binary encoding for ``/predict`` requests and responses.
+
+JSON stays the default; clients opt in by content type. A request body is a
+batch of boards laid end to end in one of two forms:
+
+* ``application/vnd.2048.board`` - 16 ``uint8`` tile exponents per board,
+  row-major (``0`` for an empty cell, ``11`` for 2048), up to
+  ``features.MAX_EXPONENT`` like JSON grids;
+* ``application/vnd.2048.packed`` - one little-endian ``uint64`` per board,
+  packed like ``board_rules.pack_board`` (a nibble holds exponents up to 15).
+
+Either body is read with ``np.frombuffer``, so the payload is never copied
+into Python lists. The response (``application/vnd.2048.prediction``) holds one
+20-byte ``PREDICTION_DTYPE`` record per board: the move index, a valid-move
+bitmask (bit ``i`` is ``DIRECTION_NAMES[i]``), flags (bit 0: the model's
+argmax was not a legal move) and four little-endian ``float32`` probabilities.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from board_rules import DIRECTION_NAMES, MAX_PACKED_EXPONENT
+from features import MAX_EXPONENT, packed_exponents
+
+BOARD_MEDIA_TYPE = "application/vnd.2048.board"
+PACKED_MEDIA_TYPE = "application/vnd.2048.packed"
+PREDICTION_MEDIA_TYPE = "application/vnd.2048.prediction"
+BINARY_REQUEST_TYPES = (BOARD_MEDIA_TYPE, PACKED_MEDIA_TYPE)
+
+PREDICTION_DTYPE = np.dtype(
+    [
+        ("move", "u1"),
+        ("valid", "u1"),
+        ("flags", "u1"),
+        ("reserved", "u1"),
+        ("probabilities", "<f4", (len(DIRECTION_NAMES),)),
+    ]
+)
+FLAG_PREDICTED_INVALID = 1
+
+_BOARD_BYTES = 16
+_PACKED_DTYPE = np.dtype("<u8")
+_DIRECTION_BITS = (1 << np.arange(len(DIRECTION_NAMES))).astype(np.uint8)
+_NIBBLE_SHIFTS = np.arange(0, 64, 4, dtype=np.uint64)
+
+
+def decode_boards(body: bytes, media_type: Optional[str]) -> np.ndarray:
+    """Return the ``(N, 16)`` ``uint8`` exponents of a binary request body."""
+
+    if media_type == BOARD_MEDIA_TYPE:
+        if not body or len(body) % _BOARD_BYTES:
+            raise ValueError(f"Board payloads must be a non-empty multiple of {_BOARD_BYTES} bytes")
+        exponents = np.frombuffer(body, dtype=np.uint8).reshape(-1, _BOARD_BYTES)
+    elif media_type == PACKED_MEDIA_TYPE:
+        if not body or len(body) % _PACKED_DTYPE.itemsize:
+            raise ValueError(f"Packed payloads must be a non-empty multiple of {_PACKED_DTYPE.itemsize} bytes")
+        exponents = packed_exponents(np.frombuffer(body, dtype=_PACKED_DTYPE))
+    else:
+        raise ValueError(f"Unsupported board encoding: {media_type}")
+    if int(exponents.max()) > MAX_EXPONENT:
+        raise ValueError(f"Tile exponents above {MAX_EXPONENT} are not supported")
+    return exponents
+
+
+def exponents_to_packed(exponents: np.ndarray) -> np.ndarray:
+    """Pack ``(N, 16)`` exponents into ``uint64`` boards (``pack_board`` layout).
+
+    Exponents must fit a nibble; see ``cache_keys`` for batches that may not.
+    """
+
+    return np.bitwise_or.reduce(exponents.astype(np.uint64) << _NIBBLE_SHIFTS, axis=1)
+
+
+def cache_keys(exponents: np.ndarray) -> List[Optional[int]]:
+    """Packed boards for the prediction cache, ``None`` where ``pack_board`` would refuse the board."""
+
+    packed = exponents_to_packed(np.minimum(exponents, MAX_PACKED_EXPONENT)).tolist()
+    large = exponents.max(axis=1) > MAX_PACKED_EXPONENT
+    return [None if skip else board for board, skip in zip(packed, large.tolist())]
+
+
+def encode_predictions(probabilities: np.ndarray, valid: np.ndarray) -> bytes:
+    """Pack ``(N, 4)`` probabilities and valid-move masks into prediction records.
+
+    The move is the most probable legal move, as in ``build_prediction``; a
+    board without legal moves keeps the model's argmax.
+    """
+
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    records = np.zeros(len(probabilities), dtype=PREDICTION_DTYPE)
+    best = np.argmax(probabilities, axis=1)
+    best_legal = np.argmax(np.where(valid, probabilities, -np.inf), axis=1)
+    has_legal = valid.any(axis=1)
+    records["move"] = np.where(has_legal, best_legal, best)
+    records["valid"] = (valid * _DIRECTION_BITS).sum(axis=1)
+    records["flags"] = np.where(valid[np.arange(len(best)), best], 0, FLAG_PREDICTED_INVALID)
+    records["probabilities"] = probabilities
+    return records.tobytes()
+
+
+def decode_predictions(data: bytes) -> np.ndarray:
+    """Read a prediction response back into a ``PREDICTION_DTYPE`` record array."""
+
+    return np.frombuffer(data, dtype=PREDICTION_DTYPE)
+
+
+__all__ = [
+    "BINARY_REQUEST_TYPES",
+    "BOARD_MEDIA_TYPE",
+    "FLAG_PREDICTED_INVALID",
+    "PACKED_MEDIA_TYPE",
+    "PREDICTION_DTYPE",
+    "PREDICTION_MEDIA_TYPE",
+    "cache_keys",
+    "decode_boards",
+    "decode_predictions",
+    "encode_predictions",
+    "exponents_to_packed",
+]
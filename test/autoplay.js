@@ -15,29 +15,148 @@
     "LEFT": 3
   };
 
-  function fetchMove(gameManager) {
-    var state = gameManager.captureSimpleState();
-
-    return fetch(SERVER_URL, {
+  // With window.AUTOPLAY_USE_SESSION set, the server keeps the board and each
+  // step only reports the tile the game spawned after the previous move.
+  var USE_SESSION = !!window.AUTOPLAY_USE_SESSION;
+  var SESSION_URL = window.AUTOPLAY_SESSION_URL ||
+    SERVER_URL.replace(/\/predict$/, "/session");
+
+  function postJson(url, body) {
+    return fetch(url, {
       method: "POST",
       headers: {
         "Content-Type": "application/json"
       },
-      body: JSON.stringify({
-        grid: state.grid,
-        score: state.score
-      })
-    })
-      .then(function (response) {
-        if (!response.ok) {
-          throw new Error("Model server returned status " + response.status);
+      body: JSON.stringify(body)
+    });
+  }
+
+  function readMove(response) {
+    if (!response.ok) {
+      throw new Error("Model server returned status " + response.status);
+    }
+    return response.json().then(function (payload) {
+      if (!payload.move) {
+        throw new Error("Model server response missing 'move'");
+      }
+      return payload;
+    });
+  }
+
+  function fetchMove(gameManager) {
+    var state = gameManager.captureSimpleState();
+
+    return postJson(SERVER_URL, {
+      grid: state.grid,
+      score: state.score
+    }).then(readMove);
+  }
+
+  function fetchSessionMove(controller) {
+    var gameManager = controller.gameManager;
+
+    function startSession() {
+      var grid = gameManager.captureSimpleState().grid;
+      return postJson(SESSION_URL, { grid: grid })
+        .then(readMove)
+        .then(function (payload) {
+          controller.sessionId = payload.session_id;
+          return payload;
+        });
+    }
+
+    if (!controller.sessionId) {
+      return startSession();
+    }
+
+    return postJson(SESSION_URL + "/" + controller.sessionId + "/step", {
+      spawn: gameManager.lastSpawnedTile || null
+    }).then(function (response) {
+      if (response.status === 404 || response.status === 409) {
+        // Expired session or boards out of sync: start over from the full grid.
+        return startSession();
+      }
+      return readMove(response);
+    });
+  }
+
+  // With window.AUTOPLAY_WS_URL set (e.g. "ws://localhost:5050/ws" on the ASGI
+  // server), moves stream over one WebSocket; after the first board only the
+  // spawned tile is sent.
+  var WS_URL = window.AUTOPLAY_WS_URL || null;
+
+  function SocketClient(url) {
+    this.url = url;
+    this.ready = null;
+    this.waiting = [];
+    this.hasBoard = false;
+  }
+
+  SocketClient.prototype.open = function () {
+    var self = this;
+    if (this.ready) {
+      return this.ready;
+    }
+    this.ready = new Promise(function (resolve, reject) {
+      var socket = new WebSocket(self.url);
+      socket.onopen = function () {
+        resolve(socket);
+      };
+      socket.onerror = function () {
+        reject(new Error("WebSocket connection to " + self.url + " failed"));
+      };
+      socket.onclose = function () {
+        self.ready = null;
+        self.hasBoard = false;
+        while (self.waiting.length) {
+          self.waiting.shift().reject(new Error("WebSocket closed"));
+        }
+      };
+      socket.onmessage = function (event) {
+        var pending = self.waiting.shift();
+        if (pending) {
+          pending.resolve(JSON.parse(event.data));
         }
-        return response.json();
+      };
+    });
+    return this.ready;
+  };
+
+  SocketClient.prototype.request = function (message) {
+    var self = this;
+    return this.open().then(function (socket) {
+      return new Promise(function (resolve, reject) {
+        self.waiting.push({ resolve: resolve, reject: reject });
+        socket.send(JSON.stringify(message));
+      });
+    });
+  };
+
+  function fetchSocketMove(controller) {
+    if (!controller.socket) {
+      controller.socket = new SocketClient(WS_URL);
+    }
+    var client = controller.socket;
+    var gameManager = controller.gameManager;
+
+    function sendGrid() {
+      return client.request({ grid: gameManager.captureSimpleState().grid });
+    }
+
+    var reply = client.hasBoard ?
+      client.request({ spawn: gameManager.lastSpawnedTile || null }) :
+      sendGrid();
+    return reply
+      .then(function (payload) {
+        // A rejected spawn means the boards drifted apart: resend the grid.
+        return payload.error && client.hasBoard ? sendGrid() : payload;
       })
       .then(function (payload) {
-        if (!payload.move) {
-          throw new Error("Model server response missing 'move'");
+        if (payload.error || !payload.move) {
+          throw new Error("Model server error: " +
+            (payload.error || "response missing 'move'"));
         }
+        client.hasBoard = true;
         return payload;
       });
   }
@@ -46,6 +165,8 @@
     this.gameManager = gameManager;
     this.timer = null;
     this.running = false;
+    this.sessionId = null;
+    this.socket = null;
   }
 
   AutoplayController.prototype.start = function () {
@@ -53,6 +174,10 @@
       return;
     }
     this.running = true;
+    this.sessionId = null;
+    if (this.socket) {
+      this.socket.hasBoard = false;
+    }
     this.scheduleNext();
   };
 
@@ -81,7 +206,16 @@
       return;
     }
 
-    fetchMove(this.gameManager)
+    var request;
+    if (WS_URL) {
+      request = fetchSocketMove(this);
+    } else if (USE_SESSION) {
+      request = fetchSessionMove(this);
+    } else {
+      request = fetchMove(this.gameManager);
+    }
+
+    request
       .then(function (result) {
         var moveIndex = directionToIndex[result.move];
         if (typeof moveIndex !== "number") {
@@ -1,81 +1,235 @@
-import json
+import argparse
 import glob
+import json
+import os
+import pickle
+import sys
+import time
+
 import numpy as np
 from stable_baselines3 import PPO
 from stable_baselines3.common.buffers import RolloutBuffer
 from stable_baselines3.common.utils import get_device
 
-# 1. Load Logs
-all_moves = []
-
-# Find ALL .json files in the 'training_data' folder
-log_files = glob.glob("training_data/*.json")
-print(f"Found {len(log_files)} log files...")
-
-for filepath in log_files:
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "service"))
+from augment import AugmentedDataset, dedupe_samples  # noqa: E402
+from board_rules import DIRECTION_NAMES  # noqa: E402
+from dataset_cache import DatasetCache  # noqa: E402
+from features import exponent_features  # noqa: E402
+from log_ingest import load_move_arrays  # noqa: E402
+from replay_store import ReplayStore  # noqa: E402
+
+ALL_MOVES = np.arange(len(DIRECTION_NAMES))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the 2048 imitation model from game logs.")
+    parser.add_argument("--data-dir", default="training_data", help="folder with the JSON game logs")
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="preprocessed dataset cache (default: <data-dir>/.cache)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="re-parse every log file")
+    parser.add_argument(
+        "--replay-store",
+        default=None,
+        help="train on the valid moves of this replay store instead of --data-dir (see service/replay_store.py)",
+    )
+    parser.add_argument(
+        "--dedupe", action="store_true", help="drop repeated (board, move) samples across games"
+    )
+    parser.add_argument(
+        "--augment", action="store_true", help="train on all 8 rotations/reflections of every sample"
+    )
+    parser.add_argument(
+        "--extra-features",
+        action="store_true",
+        help="append empty-cell, monotonicity and merge features (the server detects them from the model)",
+    )
+    parser.add_argument("--output", default="random_forest_2048.pkl", help="where to pickle the model")
+    parser.add_argument("--trees", type=int, default=100, help="forest size for a full training run")
+    parser.add_argument(
+        "--n-jobs", type=int, default=-1, help="parallel tree-building jobs (-1 uses every core)"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="grow the forest with warm_start, one chunk of cached shards at a time",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="samples per incremental chunk")
+    parser.add_argument("--trees-per-chunk", type=int, default=10, help="trees added per incremental chunk")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="with --incremental, add trees to --output using only logs that are new since the last run",
+    )
+    parser.add_argument(
+        "--metrics-file", default="training_runs.jsonl", help="append per-run timing and memory stats here"
+    )
+    return parser.parse_args()
+
+
+def prepare_samples(exponents, actions, args):
+    """Turn cached exponents and direction indices into model features and labels."""
+
+    if args.dedupe:
+        exponents, actions = dedupe_samples(exponents, actions)
+    # log2 of each tile (empty cells count as 0), normalized to a 0..1 range approx;
+    # the same features module serves /predict.
+    if args.augment:
+        # Rotated/reflected boards with remapped directions; built from strided views
+        # and only copied here, where the learner needs the full matrix.
+        return AugmentedDataset(exponents, actions, args.extra_features).materialize()
+    return exponent_features(exponents, extra=args.extra_features), actions.astype(np.int64)
+
+
+def pad_missing_moves(states, labels):
+    """Add one zero-weight sample per direction missing from ``labels``.
+
+    Warm-started trees are averaged together, so every chunk is fitted against
+    all four directions even when a chunk never plays one of them. Returns the
+    states, labels and sample weights to fit on.
+    """
+
+    missing = np.setdiff1d(ALL_MOVES, labels)
+    weights = np.ones(len(labels))
+    if len(missing):
+        states = np.concatenate([states, np.zeros((len(missing), states.shape[1]), dtype=states.dtype)])
+        labels = np.concatenate([labels, missing.astype(labels.dtype)])
+        weights = np.concatenate([weights, np.zeros(len(missing))])
+    return states, labels, weights
+
+
+def iter_chunks(cache, paths, chunk_rows):
+    """Group memory-mapped shards into chunks of roughly ``chunk_rows`` moves."""
+
+    pending = []
+    rows = 0
+    for shard in cache.iter_shards(paths):
+        pending.append(shard)
+        rows += len(shard[1])
+        if rows >= chunk_rows:
+            yield tuple(np.concatenate(column) for column in zip(*pending))
+            pending, rows = [], 0
+    if rows:
+        yield tuple(np.concatenate(column) for column in zip(*pending))
+
+
+def peak_rss_mb():
     try:
-        with open(filepath, "r") as f:
-            logs = json.load(f)
-            # Filter valid moves from this specific file
-            valid_moves = [e for e in logs if e.get("type") == "move" and e.get("valid")]
-            all_moves.extend(valid_moves)
-            print(f"  - Loaded {len(valid_moves)} moves from {filepath}")
-    except Exception as e:
-        print(f"  - Error reading {filepath}: {e}")
-
-print(f"Total dataset size: {len(all_moves)} moves.")
-
-# ... (continue with preprocessing using 'all_moves')
-# Use the accumulated moves from all files
-game_moves = all_moves
-
-print(f"Loaded {len(game_moves)} valid moves for training.")
-
-# 2. Preprocess Data 
-# Convert 2048 grid to normalized numpy array (log base 2 helps normalization)
-def preprocess_board(grid):
-    board = np.array(grid)
-    board[board == 0] = 1 # Avoid log2(0)
-    return np.log2(board).flatten() / 16.0  # Normalize 0..1 range approx
-
-states = []
-actions = []
-rewards = []
-
-direction_map = {"UP": 0, "RIGHT": 1, "DOWN": 2, "LEFT": 3}
-
-for move in game_moves:
-    # State
-    current_state = preprocess_board(move["prev"]["grid"])
-    states.append(current_state)
-    
-    # Action (Discrete 0-3)
-    actions.append(direction_map[move["direction"]])
-    
-    # Reward (Change in score)
-    reward = move["next"]["score"] - move["prev"]["score"]
-    rewards.append(reward)
-
-# Convert to consistent numpy arrays
-states = np.array(states, dtype=np.float32)
-actions = np.array(actions, dtype=np.int64) 
-
-# 3. Create a Dummy Agent & Inject Data
-# Note: Real offline RL usually requires algorithms like CQL or BC. 
-# For simplicity, we can use Supervised Learning on this data 
-# OR use PPO to "pre-train" on this buffer if we had a proper Gym environment.
-
-from sklearn.ensemble import RandomForestClassifier
-
-# A simple "Imitation Bot" using Random Forest (easier than setting up full PPO for offline now)
-clf = RandomForestClassifier(n_estimators=100)
-clf.fit(states, actions)
-
-print("Training complete!")
-
-# 4. Save the "Brain"
-import pickle
-with open("random_forest_2048.pkl", "wb") as f:
-    pickle.dump(clf, f)
-    
-print("Saved model to random_forest_2048.pkl")
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+
+    # 1. Load Logs
+    # Find ALL .json files in the 'training_data' folder
+    log_files = sorted(glob.glob(os.path.join(args.data_dir, "*.json")))
+    print(f"Found {len(log_files)} log files...")
+
+    from sklearn.ensemble import RandomForestClassifier
+
+    if args.incremental:
+        if args.no_cache or args.replay_store:
+            sys.exit("--incremental reads dataset cache shards and cannot be combined with --no-cache/--replay-store")
+        cache = DatasetCache(args.cache_dir or os.path.join(args.data_dir, ".cache"))
+        new_files = cache.update(log_files)
+
+        if args.resume and os.path.exists(args.output):
+            with open(args.output, "rb") as f:
+                clf = pickle.load(f)
+            if not np.array_equal(clf.classes_, ALL_MOVES):
+                sys.exit(f"{args.output} predicts moves {clf.classes_}, not all four; retrain it without --resume")
+            clf.set_params(warm_start=True, n_jobs=args.n_jobs)
+            sources = new_files
+            print(f"Resuming {args.output} with {len(clf.estimators_)} trees on {len(sources)} new log files.")
+        else:
+            clf = RandomForestClassifier(n_estimators=args.trees_per_chunk, warm_start=True, n_jobs=args.n_jobs)
+            sources = log_files
+
+        # 2./3. Each chunk of shards trains a new batch of trees, so only one chunk is in memory.
+        start_trees = len(getattr(clf, "estimators_", []))
+        samples = 0
+        for exponents, actions, _ in iter_chunks(cache, sources, args.chunk_rows):
+            states, labels = prepare_samples(exponents, actions, args)
+            chunk_samples = len(labels)
+            states, labels, weights = pad_missing_moves(states, labels)
+            clf.n_estimators = len(getattr(clf, "estimators_", [])) + args.trees_per_chunk
+            clf.fit(states, labels, sample_weight=weights)
+            samples += chunk_samples
+            print(f"  - Forest has {len(clf.estimators_)} trees after a chunk of {chunk_samples} samples")
+        trained_trees = len(getattr(clf, "estimators_", [])) - start_trees
+        if not hasattr(clf, "estimators_"):
+            sys.exit("No training data found.")
+    else:
+        # Files are streamed event by event on a process pool; only valid moves are kept,
+        # as uint8 tile exponents plus the direction index and score change (reward).
+        if args.replay_store:
+            # Fixed-size records read through a memory map; no JSON parsing at all.
+            exponents, actions, rewards = ReplayStore(args.replay_store).move_arrays()
+        elif args.no_cache:
+            exponents, actions, rewards = load_move_arrays(log_files)
+        else:
+            # Only new or changed files are parsed; the rest comes from memory-mapped shards.
+            cache = DatasetCache(args.cache_dir or os.path.join(args.data_dir, ".cache"))
+            cache.update(log_files)
+            exponents, actions, rewards = cache.load_arrays(log_files)
+
+        print(f"Total dataset size: {len(actions)} moves.")
+        print(f"Loaded {len(actions)} valid moves for training.")
+
+        # 2. Preprocess Data
+        states, labels = prepare_samples(exponents, actions, args)
+        samples = len(labels)
+
+        # 3. Create a Dummy Agent & Inject Data
+        # Note: Real offline RL usually requires algorithms like CQL or BC.
+        # For simplicity, we can use Supervised Learning on this data
+        # OR use PPO to "pre-train" on this buffer; online PPO/DQN can train against
+        # service/vector_env.py (VectorGame2048), whose reward is this same score delta.
+
+        # A simple "Imitation Bot" using Random Forest (easier than setting up full PPO for offline now)
+        clf = RandomForestClassifier(n_estimators=args.trees, n_jobs=args.n_jobs)
+        clf.fit(states, labels)
+        trained_trees = args.trees
+
+    print("Training complete!")
+
+    # 4. Save the "Brain"
+    with open(args.output, "wb") as f:
+        pickle.dump(clf, f)
+
+    print(f"Saved model to {args.output}")
+
+    elapsed = time.perf_counter() - started
+    metrics = {
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": "incremental" if args.incremental else "full",
+        "samples": samples,
+        "trees_trained": trained_trees,
+        "total_trees": len(clf.estimators_),
+        "n_jobs": args.n_jobs,
+        "wall_seconds": round(elapsed, 3),
+        "trees_per_second": round(trained_trees / elapsed, 3) if elapsed > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(json.dumps(metrics))
+    if args.metrics_file:
+        with open(args.metrics_file, "a") as f:
+            f.write(json.dumps(metrics) + "\n")
+
+
+if __name__ == "__main__":
+    # The guard keeps process-pool workers from re-running training on spawn platforms.
+    main()